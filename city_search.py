@@ -0,0 +1,329 @@
+"""
+城市搜索
+首次使用时以只读方式读取城市数据库（citys 表）到内存，建立名称/拼音/首字母的 n-gram 倒排索引，
+之后的搜索均在内存中完成并按匹配程度排序、限制数量。
+全拼读自随程序附带的 config/data/city_pinyin.json（数据库中出现的所有汉字，地名中的多音字列出全部读音），
+表中没有的字在安装了 pypinyin 时由其补充，否则只有首字母（由 GB2312 编码推算）。
+"""
+import bisect
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from file import base_directory
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 可选依赖
+    Style = lazy_pinyin = None
+
+SEARCH_LIMIT = 50  # 搜索结果数量上限
+MAX_VARIANTS = 8  # 含多音字的名称最多索引几种读法
+PINYIN_TABLE_PATH = base_directory / 'config' / 'data' / 'city_pinyin.json'
+
+# GB2312 一级汉字按拼音排序，各声母首字的编码
+_GB2312_INITIALS: Tuple[Tuple[int, str], ...] = (
+    (0xB0A1, 'a'), (0xB0C5, 'b'), (0xB2C1, 'c'), (0xB4EE, 'd'), (0xB6EA, 'e'), (0xB7A2, 'f'),
+    (0xB8C1, 'g'), (0xB9FE, 'h'), (0xBBF7, 'j'), (0xBFA6, 'k'), (0xC0AC, 'l'), (0xC2E8, 'm'),
+    (0xC4C3, 'n'), (0xC5B6, 'o'), (0xC5BE, 'p'), (0xC6DA, 'q'), (0xC8BB, 'r'), (0xC8F6, 's'),
+    (0xCBFA, 't'), (0xCDDA, 'w'), (0xCEF4, 'x'), (0xD1B9, 'y'), (0xD4D1, 'z'),
+)
+_GB2312_STARTS = [start for start, _ in _GB2312_INITIALS]
+_GB2312_LEVEL1_END = 0xD7F9
+
+# 城市数据库中不在 GB2312 一级汉字内的字，以及地名读音与编码顺序不同的字
+_PLACE_INITIALS: Dict[str, str] = {
+    char: initial for initial, chars in {
+        'a': '庵',
+        'b': '亳坂埗濞灞璧碚鲅',
+        'c': '岑瀍禅茌重',
+        'd': '儋凼坻宕岱峒棣氹砀磴',
+        'f': '妃孚罘芙邡',
+        'g': '仡珙莞藁',
+        'h': '晖桦湟潢濠珲祜邗鄠骅',
+        'j': '伽旌暨泾稷筠绛缙莒蛟迦郏鄄鸠',
+        'k': '岢崆',
+        'l': '岚崂崃栾泸浏涞渌溧漯澧濂耒蒗蔺蠡赉醴阆麟',
+        'm': '仫勐岷汨沐渑湄谟闵',
+        'n': '讷',
+        'o': '瓯',
+        'p': '濮邳郫鄱陂',
+        'q': '岐朐杞淇犍硚箐綦耆荃蕲衢谯邛阡麒',
+        'r': '榕芮',
+        's': '佘嵊嵩歙沭泗浉淞濉畲睢莘鄯',
+        't': '洮滕潼覃郯',
+        'w': '佤圩婺汶涠',
+        'x': '岫浔浠淅溆猇盱芗荥陉隰',
+        'y': '偃兖埇峄弋攸晏沅猗琊眙禺蓥邕邺郓郾鄞鄢颍驿黟',
+        'z': '圳枞柘梓沚浈涿秭芷诏陟',
+    }.items() for char in chars
+}
+
+
+@lru_cache(maxsize=8192)
+def char_initial(char: str) -> str:
+    """单个字符的拼音首字母（字母数字原样返回，无法识别时为空）"""
+    if char.isascii():
+        return char.lower() if char.isalnum() else ''
+    if char in _PLACE_INITIALS:
+        return _PLACE_INITIALS[char]
+    try:
+        encoded = char.encode('gb2312')
+    except UnicodeEncodeError:
+        return ''
+    if len(encoded) != 2:
+        return ''
+    code = int.from_bytes(encoded, 'big')
+    if code < _GB2312_STARTS[0] or code > _GB2312_LEVEL1_END:
+        return ''
+    return _GB2312_INITIALS[bisect.bisect_right(_GB2312_STARTS, code) - 1][1]
+
+
+@lru_cache(maxsize=1)
+def _pinyin_table() -> Dict[str, Tuple[str, ...]]:
+    """汉字 -> 读音（多音字按地名中出现的次数排列）"""
+    try:
+        with open(PINYIN_TABLE_PATH, 'r', encoding='utf-8') as f:
+            return {char: tuple(readings.split()) for char, readings in json.load(f).items()}
+    except Exception as e:
+        logger.warning(f'读取拼音表失败，将只支持首字母搜索: {e}')
+        return {}
+
+
+@lru_cache(maxsize=8192)
+def char_pinyin(char: str) -> Tuple[str, ...]:
+    """单个字符的全拼读音（字母数字原样返回，无法识别时为空）"""
+    if char.isascii():
+        return (char.lower(),) if char.isalnum() else ('',)
+    readings = _pinyin_table().get(char)
+    if readings:
+        return readings
+    if lazy_pinyin is not None:
+        reading = lazy_pinyin(char)[0].lower()
+        return (reading,) if reading.isascii() and reading.isalpha() else ()
+    return ()
+
+
+def _variants(parts: Iterable[Tuple[str, ...]]) -> Tuple[str, ...]:
+    """各字读音的组合（去重，最多 MAX_VARIANTS 种）"""
+    combined = (''.join(p) for p in itertools.product(*parts))
+    return tuple(dict.fromkeys(itertools.islice(combined, MAX_VARIANTS)))
+
+
+def pinyin_keys(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """返回 (首字母, 全拼) 的各种读法，无法识别的字记为 '?'"""
+    initials, pinyin = [], []
+    for char in text:
+        readings = char_pinyin(char)
+        if readings:
+            pinyin.append(readings)
+            initials.append(tuple(dict.fromkeys(reading[:1] for reading in readings)))
+        else:
+            pinyin.append(('?',))
+            initials.append((char_initial(char) or '?',))
+    return _variants(initials), _variants(pinyin)
+
+
+def _grams(text: str) -> Set[str]:
+    """单字与相邻两字"""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def normalize_query(term: str) -> str:
+    return ''.join(term.split()).replace('.', '').lower()
+
+
+@dataclass(frozen=True)
+class CityRecord:
+    row_id: int
+    name: str  # 数据库中的名称，如 "北京.海淀"
+    code: str
+    plain: str  # 去掉分隔符，如 "北京海淀"
+    segments: Tuple[str, ...]
+    initials: Tuple[str, ...]
+    pinyin: Tuple[str, ...]
+
+
+class CitySearchIndex:
+    """单个城市数据库的内存索引（建立后只读，可在线程间共用）"""
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self.records: List[CityRecord] = []
+        self.by_name: Dict[str, CityRecord] = {}
+        self.by_code: Dict[str, CityRecord] = {}
+        self._text_grams: Dict[str, Set[int]] = {}  # 汉字 n-gram -> 记录下标
+        self._pinyin_grams: Dict[str, Set[int]] = {}  # 拼音/首字母 n-gram -> 记录下标
+        self._pinyin_keys: List[str] = []  # 全部拼音/首字母（排序后，用于二分查找前缀）
+        self._pinyin_positions: List[int] = []  # 与 _pinyin_keys 对应的记录下标
+        self._pinyin_joined: List[str] = []  # 各记录全部拼音/首字母以空格连接，用于包含匹配
+        self.build_time = 0.0
+
+    @staticmethod
+    def _read_rows(db_path: str) -> List[Tuple[int, str, str]]:
+        uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True)
+        try:
+            return conn.execute('SELECT _id, name, city_num FROM citys ORDER BY _id').fetchall()
+        finally:
+            conn.close()
+
+    def build(self) -> 'CitySearchIndex':
+        start = time.perf_counter()
+        keys: Set[Tuple[str, int]] = set()
+        for row_id, name, code in self._read_rows(self.db_path):
+            name = str(name or '')
+            plain = name.replace('.', '')
+            initials, pinyin = pinyin_keys(plain)
+            record = CityRecord(row_id, name, str(code), plain, tuple(name.split('.')), initials, pinyin)
+            position = len(self.records)
+            self.records.append(record)
+            self.by_name.setdefault(name, record)
+            self.by_code.setdefault(record.code, record)
+            for gram in _grams(plain):
+                self._text_grams.setdefault(gram, set()).add(position)
+            self._pinyin_joined.append(' '.join(initials + pinyin))
+            for key in initials + pinyin:
+                keys.add((key, position))
+                for gram in _grams(key):
+                    self._pinyin_grams.setdefault(gram, set()).add(position)
+        sorted_keys = sorted(keys)
+        self._pinyin_keys = [key for key, _ in sorted_keys]
+        self._pinyin_positions = [position for _, position in sorted_keys]
+        self.build_time = time.perf_counter() - start
+        logger.debug(f'城市索引 {os.path.basename(self.db_path)} 已建立：{len(self.records)} 条，'
+                     f'用时 {self.build_time * 1000:.1f} ms')
+        return self
+
+    def _candidates(self, query: str, postings: Dict[str, Set[int]]) -> Iterable[int]:
+        grams = {query} if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+        sets = sorted((postings.get(gram, set()) for gram in grams), key=len)
+        if not sets or not sets[0]:
+            return ()
+        return sets[0].intersection(*sets[1:])
+
+    @staticmethod
+    def _text_rank(record: CityRecord, query: str) -> Optional[int]:
+        if query == record.plain or query in record.segments:
+            return 0
+        if record.plain.startswith(query) or any(segment.startswith(query) for segment in record.segments):
+            return 1
+        if query in record.plain:
+            return 2
+        return None
+
+    def _pinyin_prefix_tiers(self, query: str) -> Dict[int, int]:
+        """拼音/首字母以 query 开头的记录：记录下标 -> 0（完全匹配）或 1（前缀匹配）"""
+        tiers: Dict[int, int] = {}
+        keys, positions = self._pinyin_keys, self._pinyin_positions
+        index = bisect.bisect_left(keys, query)
+        while index < len(keys) and keys[index].startswith(query):
+            position = positions[index]
+            tier = 0 if keys[index] == query else 1
+            if tiers.get(position, 2) > tier:
+                tiers[position] = tier
+            index += 1
+        return tiers
+
+    def _pinyin_matches(self, query: str, limit: Optional[int]) -> List[Tuple[int, int]]:
+        """
+        拼音/首字母匹配的 (匹配程度, 记录下标)
+        先从排序的键中二分查找前缀匹配，数量已够 limit 时不再逐条检查包含匹配
+        """
+        tiers = self._pinyin_prefix_tiers(query)
+        matches = [(tier, position) for position, tier in tiers.items()]
+        if limit is not None and len(matches) >= limit:
+            return matches
+        for position in self._candidates(query, self._pinyin_grams):
+            if position not in tiers and query in self._pinyin_joined[position]:
+                matches.append((2, position))
+        return matches
+
+    def search(self, term: str, limit: Optional[int] = SEARCH_LIMIT) -> List[CityRecord]:
+        """
+        按名称、拼音或首字母搜索，结果依次按 完全匹配 > 前缀匹配 > 包含 与名称长度排序
+        term 为空时按数据库顺序返回全部城市（不受 limit 限制）
+        """
+        query = normalize_query(term)
+        if not query:
+            return list(self.records)
+        ranked = []
+        if query.isascii():
+            for tier, position in self._pinyin_matches(query, limit):
+                record = self.records[position]
+                ranked.append((tier, len(record.plain), record.row_id, record))
+        else:
+            for position in self._candidates(query, self._text_grams):
+                record = self.records[position]
+                tier = self._text_rank(record, query)
+                if tier is not None:
+                    ranked.append((tier, len(record.plain), record.row_id, record))
+        if limit is not None and len(ranked) > limit:
+            ranked = heapq.nsmallest(limit, ranked)
+        else:
+            ranked.sort()
+        return [item[3] for item in ranked]
+
+    def first_containing(self, text: str) -> Optional[CityRecord]:
+        """名称包含 text 的第一条记录（数据库顺序，与 LIKE '%text%' 一致）"""
+        query = text.replace('.', '')
+        if not query:
+            return None
+        matches = [self.records[p] for p in self._candidates(query, self._text_grams)
+                   if text in self.records[p].name]
+        return min(matches, key=lambda r: r.row_id) if matches else None
+
+    def code_containing(self, code: str) -> Optional[CityRecord]:
+        """代码精确匹配，否则返回代码包含 code 的第一条记录"""
+        record = self.by_code.get(code)
+        if record is not None or not code:
+            return record
+        return next((r for r in self.records if code in r.code), None)
+
+
+class CitySearch:
+    """按数据库路径缓存索引，数据库文件变化后重新建立"""
+
+    def __init__(self) -> None:
+        self._indexes: Dict[str, Tuple[float, CitySearchIndex]] = {}
+        self._lock = threading.Lock()
+
+    def index(self, db_path: str) -> CitySearchIndex:
+        mtime = os.path.getmtime(db_path)
+        cached = self._indexes.get(db_path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with self._lock:
+            cached = self._indexes.get(db_path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, CitySearchIndex(db_path).build())
+                self._indexes = {**self._indexes, db_path: cached}
+        return cached[1]
+
+    def warm_up(self, db_path: str) -> None:
+        """在后台线程中预先建立索引"""
+        def build():
+            try:
+                self.index(db_path)
+            except Exception as e:
+                logger.warning(f'预建城市索引失败: {e}')
+        threading.Thread(target=build, name='city-index', daemon=True).start()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes = {}
+
+
+city_search = CitySearch()
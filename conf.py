@@ -14,9 +14,9 @@ from loguru import logger
 from PyQt5.QtCore import QCoreApplication
 
 import list_
-from basic_dirs import CW_HOME, THEME_DIRS
-from data_model import ThemeConfig, ThemeInfo
+from data_model import ThemeInfo
 from file import base_directory, config_center
+from theme_registry import theme_registry
 
 if os.name == 'nt':
     from win32com.client import Dispatch
@@ -38,33 +38,9 @@ update_countdown_custom_last = 0
 countdown_cnt = 0
 
 
-def __load_json(path: Path) -> ThemeConfig:
-    with open(path, 'r', encoding='utf-8') as file:
-        return ThemeConfig.model_validate_json(file.read())
-
-
-# 此函数在 i18n_manager.py 有重复定义，更新时需同步
 def load_theme_config(theme: str) -> ThemeInfo:
-    default_path = CW_HOME / 'ui' / 'default' / 'theme.json'
-    try:
-        config_path = next(
-            (
-                dir
-                for theme_dir in THEME_DIRS
-                if (dir := (theme_dir / theme / 'theme.json')).exists()
-            ),
-            default_path
-        )
-        return ThemeInfo(
-            path=config_path.parent,
-            config=__load_json(config_path)
-        )
-    except Exception as e:
-        logger.error(f"加载主题数据时出错: {repr(e)}，返回默认主题")
-        return ThemeInfo(
-            path=default_path.parent,
-            config=__load_json(default_path)
-        )
+    """获取主题配置（由主题注册表缓存，文件变化时自动重新加载）"""
+    return theme_registry.get(theme)
 
 
 def load_plugin_config() -> Dict[str, List[str]]:
@@ -195,18 +171,31 @@ def remove_from_startup() -> None:
     if os.path.exists(shortcut_path):
         os.remove(shortcut_path)
 
+def _countdown_rotation_due() -> bool:
+    """轮换模式下是否到了切换下一个倒计日的时间"""
+    if config_center.read_conf('Date', 'countdown_custom_mode') == '1':
+        return False
+    return time.time() - update_countdown_custom_last > int(config_center.read_conf('Date', 'countdown_upd_cd'))
+
+
+def next_countdown_index(cnt: int) -> int:
+    """update_countdown 将会使用的倒计日序号（不修改状态）"""
+    if (length:=len(config_center.read_conf('Date', 'cd_text_custom').split(','))) == 0:
+        return -1
+    if config_center.read_conf('Date', 'countdown_custom_mode') == '1':
+        return cnt
+    if _countdown_rotation_due():
+        return countdown_cnt + 1 if countdown_cnt + 1 < length else 0
+    return countdown_cnt
+
+
 def update_countdown(cnt: int) -> None:
     global update_countdown_custom_last
     global countdown_cnt
-    if (length:=len(config_center.read_conf('Date', 'cd_text_custom').split(','))) == 0:
-        countdown_cnt = -1
-    elif config_center.read_conf('Date', 'countdown_custom_mode') == '1':
-        countdown_cnt = cnt
-    elif (nowtime:=time.time()) - update_countdown_custom_last > int(config_center.read_conf('Date', 'countdown_upd_cd')):
-        update_countdown_custom_last = nowtime
-        countdown_cnt += 1
-        if countdown_cnt >= length:
-            countdown_cnt = 0 if length != 0 else -1
+    rotate = _countdown_rotation_due()
+    countdown_cnt = next_countdown_index(cnt)
+    if rotate:
+        update_countdown_custom_last = time.time()
 
 def get_cd_text_custom() -> str:
     global countdown_cnt
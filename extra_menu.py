@@ -16,7 +16,6 @@ import file
 from conf import base_directory
 import list_
 from file import config_center, schedule_center
-from menu import SettingsMenu
 from utils import TimeManagerFactory
 from loguru import logger
 
@@ -29,6 +28,7 @@ temp_schedule = {'schedule': {}, 'schedule_even': {}}
 def open_settings(main_window=None) -> None:
     global settings
     if settings is None or not settings.isVisible():
+        from menu import SettingsMenu  # 设置界面较大，首次打开时再加载
         settings = SettingsMenu(main_window=main_window)
         settings.closed.connect(cleanup_settings)
         settings.show()
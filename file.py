@@ -1,9 +1,14 @@
+import io
 import json
 import os
 import sys
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 from shutil import copy
-from typing import Dict, Any, Optional, Union, Callable, List
+from types import MappingProxyType
+from typing import Dict, Any, Optional, Union, Callable, List, Tuple, Mapping, Iterator
 
 from loguru import logger
 import configparser
@@ -20,8 +25,64 @@ if str(base_directory).endswith('MacOS'):
 '''
 config_path = base_directory / 'config.ini'
 
+_MISSING = object()
+ConfigListener = Callable[[str, str, Any, Any], None]  # (section, key, old_value, new_value)
 
 
+class ConfigSnapshot:
+    """
+    配置快照（只读）
+    在 write_conf / update_conf 后由 ConfigCenter 重建，读取时不再做查找、翻译和类型转换
+    键名与 configparser 一致，不区分大小写
+    """
+    __slots__ = ('version', '_values', '_typed')
+
+    def __init__(self, version: int, values: Dict[Tuple[str, str], Any]) -> None:
+        self.version = version
+        self._values = values
+        self._typed: Dict[Tuple[str, str, str], Any] = {}  # 类型化结果缓存
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        return (item[0], item[1].lower()) in self._values
+
+    def get(self, section: str, key: str, fallback: Any = None) -> Any:
+        value = self._values.get((section, key.lower()), _MISSING)
+        if value is _MISSING:
+            return fallback
+        if isinstance(value, (list, dict)):  # 防止调用方修改快照
+            return value.copy()
+        return value
+
+    def _get_typed(self, kind: str, section: str, key: str, convert: Callable[[Any], Any], default: Any) -> Any:
+        cache_key = (kind, section, key)
+        try:
+            return self._typed[cache_key]
+        except KeyError:
+            pass
+        value = self._values.get((section, key.lower()), _MISSING)
+        try:
+            result = default if value is _MISSING or value == '' else convert(value)
+        except (TypeError, ValueError):
+            result = default
+        self._typed[cache_key] = result
+        return result
+
+    def get_int(self, section: str, key: str, default: int = 0) -> int:
+        return self._get_typed('int', section, key, lambda v: int(float(v)), default)
+
+    def get_float(self, section: str, key: str, default: float = 0.0) -> float:
+        return self._get_typed('float', section, key, float, default)
+
+    def get_bool(self, section: str, key: str, default: bool = False) -> bool:
+        """'1' / 'true' 视为 True"""
+        return self._get_typed('bool', section, key, lambda v: str(v).strip().lower() in ('1', 'true'), default)
+
+    def section(self, section: str) -> Mapping[str, Any]:
+        return MappingProxyType({k: v for (s, k), v in self._values.items() if s == section})
+
+    def items(self) -> Mapping[Tuple[str, str], Any]:
+        return MappingProxyType(self._values)
+
 
 class ConfigCenter:
     """
@@ -37,12 +98,27 @@ class ConfigCenter:
         self.default_data: Dict[str, Any] = {}
         self.schedule_update_callback = schedule_update_callback
 
+        self.version = 0  # 配置版本，任意配置项变化时递增
+        self._key_versions: Dict[Tuple[str, str], int] = {}
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._listeners: List[Tuple[ConfigListener, Optional[str], Optional[str]]] = []
+
+        # 延迟写入：合并窗口内的多次 write_conf 只落盘一次
+        self.write_delay = 0.5  # 合并窗口(s)，0 表示立即写入
+        self._io_lock = threading.RLock()
+        self._dirty = False
+        self._flush_timer: Optional[threading.Timer] = None
+        self._transaction_depth = 0
+        self._pending_changes: List[Tuple[str, str, Any, Any]] = []
+        self._write_forwarder: Optional[Callable[[str, str, str], None]] = None  # 见 forward_writes
+
         self._load_default_config()
         self._load_user_config()
         self._check_and_migrate_config()
 
         self.schedule_name = self.read_conf('General', 'schedule')
         self.old_schedule_name = self.schedule_name
+        self.write_delay = max(0.0, self.snapshot.get_float('Other', 'config_write_delay', self.write_delay))
 
     def _load_default_config(self) -> None:
         """加载默认配置文件"""
@@ -74,6 +150,62 @@ class ConfigCenter:
             self.config.read(self.user_config_path, encoding='utf-8')
         except Exception as e:
             logger.error(f"加载配置文件失败: {e}")
+        self._snapshot = None
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """当前配置快照（配置变化后首次访问时重建）"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._snapshot = self._build_snapshot()
+        return snapshot
+
+    def _build_snapshot(self) -> ConfigSnapshot:
+        values: Dict[Tuple[str, str], Any] = {}
+        for section, options in self.default_data.items():
+            if not isinstance(options, dict):
+                continue
+            for key in options:
+                value = self._read_conf_uncached(section, key, _MISSING, warn=False)
+                if value is not _MISSING:
+                    values[(section, key.lower())] = value
+        for section in self.config.sections():
+            for key, value in self.config[section].items():
+                values[(section, key.lower())] = value
+        return ConfigSnapshot(self.version, values)
+
+    def invalidate_snapshot(self) -> None:
+        """丢弃快照（如切换语言后默认值的翻译变化）"""
+        self._snapshot = None
+
+    def key_version(self, section: str, key: str) -> int:
+        """配置项版本，未修改过时为 0"""
+        return self._key_versions.get((section, key.lower()), 0)
+
+    def subscribe(self, callback: ConfigListener, section: Optional[str] = None, key: Optional[str] = None) -> None:
+        """订阅配置变化，section/key 为空时表示全部"""
+        self._listeners.append((callback, section, key))
+
+    def unsubscribe(self, callback: ConfigListener) -> None:
+        self._listeners = [item for item in self._listeners if item[0] != callback]
+
+    def _notify_changes(self, changes: List[Tuple[str, str, Any, Any]]) -> None:
+        """更新版本号并通知订阅者"""
+        if not changes:
+            return
+        self.version += 1
+        for section, key, _, _ in changes:
+            self._key_versions[(section, key.lower())] = self.version
+        for callback, section_filter, key_filter in list(self._listeners):
+            for section, key, old_value, new_value in changes:
+                if section_filter is not None and section_filter != section:
+                    continue
+                if key_filter is not None and key_filter.lower() != key.lower():
+                    continue
+                try:
+                    callback(section, key, old_value, new_value)
+                except Exception as e:
+                    logger.error(f"配置变化回调执行失败 {section}.{key}: {e}")
 
     def _migrate_config(self) -> None:
         """迁移配置文件（当配置文件版本不一致时）"""
@@ -153,9 +285,98 @@ class ConfigCenter:
             logger.info("plugins_from_pp.json 文件不存在，已创建。")
 
     def _write_config_to_file(self) -> None:
-        """将当前配置写入文件"""
-        with open(self.user_config_path, 'w', encoding='utf-8') as configfile:
-            self.config.write(configfile)
+        """将当前配置写入文件（原子替换）"""
+        with self._io_lock:
+            self._snapshot = None
+            self._cancel_flush_timer()
+            buffer = io.StringIO()
+            self.config.write(buffer)
+            self._dirty = False
+            self._atomic_write(buffer.getvalue())
+
+    def _atomic_write(self, content: str) -> None:
+        """写入临时文件后重命名，避免断电等情况导致配置文件被截断"""
+        directory = self.user_config_path.parent
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{self.config_file_name}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as temp_file:
+                temp_file.write(content)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, self.user_config_path)
+        except Exception:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def _cancel_flush_timer(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+
+    def forward_writes(self, forwarder: Callable[[str, str, str], None]) -> None:
+        """
+        只读模式（插件宿主进程）：此后不再写入 config.ini，
+        write_conf 只修改内存中的值并交给 forwarder，由拥有配置文件的主进程写入
+        """
+        with self._io_lock:
+            self._write_forwarder = forwarder
+            self._dirty = False
+            self._cancel_flush_timer()
+
+    def _schedule_flush(self) -> None:
+        """标记待写入，合并窗口结束后在后台线程落盘"""
+        with self._io_lock:
+            if self._write_forwarder is not None:
+                return
+            self._dirty = True
+            if self._transaction_depth:
+                return
+            if self.write_delay <= 0:
+                self.flush()
+                return
+            self._cancel_flush_timer()
+            self._flush_timer = threading.Timer(self.write_delay, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def flush(self) -> None:
+        """立即写入尚未落盘的配置"""
+        with self._io_lock:
+            if not self._dirty or self._write_forwarder is not None:
+                self._cancel_flush_timer()
+                return
+            try:
+                self._write_config_to_file()
+            except Exception as e:
+                logger.error(f"写入配置文件失败: {e}")
+
+    @contextmanager
+    def transaction(self) -> Iterator['ConfigCenter']:
+        """
+        批量修改配置：期间的 write_conf 只在退出时统一落盘并通知
+
+        with config_center.transaction():
+            config_center.write_conf('Temp', 'set_week', '')
+            config_center.write_conf('Temp', 'set_schedule', '')
+        """
+        with self._io_lock:
+            self._transaction_depth += 1
+        try:
+            yield self
+        finally:
+            with self._io_lock:
+                self._transaction_depth -= 1
+                outermost = self._transaction_depth == 0
+                changes = []
+                if outermost:
+                    changes, self._pending_changes = self._pending_changes, []
+            if outermost:
+                if self._dirty:
+                    self._schedule_flush()
+                self._notify_changes(changes)
 
     def migrate_config_item(self, old_section: str, old_key: str, new_section: str, new_key: str, 
                            transform_func: Optional[Callable[[Any], Any]] = None, 
@@ -264,7 +485,15 @@ class ConfigCenter:
     def update_conf(self) -> None:
         """重新加载配置文件并更新相关状态"""
         try:
+            self.flush()  # 先写入未落盘的修改，避免被磁盘上的旧值覆盖
+            old_values = self.snapshot.items()
             self._load_user_config()
+            new_values = self.snapshot.items()
+            self._notify_changes([
+                (section, key, old_values.get((section, key)), value)
+                for (section, key), value in new_values.items()
+                if old_values.get((section, key), _MISSING) != value
+            ])
 
             new_schedule_name = self.read_conf('General', 'schedule')
             if new_schedule_name != self.old_schedule_name:
@@ -276,6 +505,14 @@ class ConfigCenter:
 
     def read_conf(self, section: str = 'General', key: str = '', fallback: Any = None) -> Union[str, Any]:
         """读取配置项，并根据默认配置中的类型信息进行转换"""
+        if key:
+            value = self.snapshot.get(section, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        return self._read_conf_uncached(section, key, fallback)
+
+    def _read_conf_uncached(self, section: str = 'General', key: str = '', fallback: Any = None,
+                            warn: bool = True) -> Union[str, Any]:
         if section not in self.config and section not in self.default_data:
             logger.warning(f"配置节未找到: Section='{section}'")
             if not key:
@@ -307,7 +544,8 @@ class ConfigCenter:
                     return self._convert_value(item_info["default"], item_info["type"])
                 else:
                     return item_info
-        logger.warning(f"配置项未找到: Section='{section}', Key='{key}'")
+        if warn:
+            logger.warning(f"配置项未找到: Section='{section}', Key='{key}'")
         return fallback
 
     def _convert_value(self, value: Any, value_type: str) -> Any:
@@ -354,12 +592,24 @@ class ConfigCenter:
                 return str(value) if value is not None else ""
 
     def write_conf(self, section: str, key: str, value: Any) -> None:
-        """写入配置项"""
-        if section not in self.config:
-            self.config.add_section(section)
-        self.config[section][key] = str(value)
-        with open(self.user_config_path, 'w', encoding='utf-8') as configfile:
-            self.config.write(configfile)
+        """写入配置项（延迟合并写入，见 write_delay / flush）"""
+        with self._io_lock:
+            old_value = self.snapshot.get(section, key)
+            if section not in self.config:
+                self.config.add_section(section)
+            self.config[section][key] = str(value)
+            self._snapshot = None
+            changed = old_value != str(value)
+            if changed and self._transaction_depth:
+                self._pending_changes.append((section, key, old_value, str(value)))
+                changed = False
+            forwarder = self._write_forwarder
+        if forwarder is not None:
+            forwarder(section, key, str(value))
+        else:
+            self._schedule_flush()
+        if changed:
+            self._notify_changes([(section, key, old_value, str(value))])
 
 
 class ScheduleCenter:
@@ -369,6 +619,7 @@ class ScheduleCenter:
     def __init__(self, config_center_instance: ConfigCenter) -> None:
         self.config_center = config_center_instance
         self.schedule_data: Dict[str, Any] = {}
+        self.version = 0  # 课程表数据版本，每次重新读取或修改时递增
         self.update_schedule()
         self.config_center.write_conf('General', 'schedule', self.config_center.read_conf('General', 'schedule'))
 
@@ -377,6 +628,7 @@ class ScheduleCenter:
         更新课程表
         """
         self.schedule_data = load_from_json(self.config_center.read_conf('General', 'schedule'))
+        self.version += 1
         if 'timeline' not in self.schedule_data:
             self.schedule_data['timeline'] = {}
         if self.schedule_data.get('url', None) is None:
@@ -388,6 +640,7 @@ class ScheduleCenter:
         更新课程表url
         """
         self.schedule_data['url'] = url
+        self.version += 1
         self.save_data(self.schedule_data, config_center.schedule_name)
 
     def save_data(self, new_data: Dict[str, Any], filename: str) -> Optional[str]:
@@ -401,6 +654,7 @@ class ScheduleCenter:
             self.schedule_data.update(temp_new_data)
         else:
             self.schedule_data.update(new_data)
+        self.version += 1
 
         # 将更新后的数据保存回文件
         try:
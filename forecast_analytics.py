@@ -0,0 +1,270 @@
+"""
+天气预报分析
+将各天气源格式不同的逐小时/多天预报统一整理为按列存储的结构（时间、气温、降水量、天气代码、是否降水），
+再一次遍历得出降水时段、连续长度、下次降水时间、气温变化以及当日上课期间的降水情况。
+每份预报只整理与分析一次，结果可在多次查询间复用。
+"""
+import datetime as dt
+import math
+import re
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from timeline import DayTimeline
+
+NAN = float('nan')
+_NUMBER_PATTERN = re.compile(r'-?\d+(?:\.\d+)?')
+
+# 各天气源预报中可能出现的字段名
+HOURLY_TIME_KEYS = ('time', 'fxTime')
+HOURLY_TEMP_KEYS = ('temperature', 'temp')
+HOURLY_CODE_KEYS = ('weather_code', 'icon')
+DAILY_DATE_KEYS = ('date', 'fxDate')
+DAILY_TEMP_KEYS = ('temp_high', 'temp_low', 'temp_max', 'temp_min', 'tempMax', 'tempMin', 'daytemp', 'nighttemp')
+DAILY_CODE_KEYS = ('weather_day', 'weather_day_icon', 'iconDay', 'weather_code')
+DAILY_NIGHT_CODE_KEYS = ('weather_night', 'weather_night_icon', 'iconNight')
+
+
+def to_float(value: Any) -> float:
+    """将 '23°C'、'0.0'、True 等值转为数字，无法识别时为 NaN"""
+    if value is None or value == '':
+        return NAN
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_PATTERN.search(str(value))
+    return float(match.group()) if match else NAN
+
+
+def _first(item: Dict[str, Any], keys: Sequence[str]) -> Any:
+    for key in keys:
+        value = item.get(key)
+        if value is not None and value != '':
+            return value
+    return None
+
+
+def _parse_time(value: Any) -> Optional[dt.datetime]:
+    """ISO 时间（带时区时转为本地时间）"""
+    if not value:
+        return None
+    try:
+        moment = dt.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def run_lengths(flags: Iterable[bool]) -> List[int]:
+    """连续相同状态的长度，如 [F, F, T, T, T, F] -> [2, 3, 1]"""
+    return [sum(1 for _ in group) for _, group in groupby(flags)]
+
+
+@dataclass(frozen=True)
+class HourlyColumns:
+    """逐小时预报（每列等长）"""
+    times: Tuple[dt.datetime, ...]  # 每小时的开始时刻（本地时间）
+    temperature: Tuple[float, ...]
+    precipitation: Tuple[float, ...]  # 降水量，未知时为 NaN
+    codes: Tuple[str, ...]
+    wet: Tuple[bool, ...]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+
+@dataclass(frozen=True)
+class DailyColumns:
+    """多天预报（第 0 项为今天）"""
+    dates: Tuple[Optional[dt.date], ...]
+    high: Tuple[float, ...]
+    low: Tuple[float, ...]
+    codes: Tuple[str, ...]
+    wet: Tuple[bool, ...]  # 白天或夜间有降水
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def _precipitation_checker(is_precipitation: Callable[[str], bool]) -> Callable[[str], bool]:
+    """同一份预报中天气代码大量重复，判断结果按代码缓存"""
+    results: Dict[str, bool] = {}
+
+    def check(code: str) -> bool:
+        if not code:
+            return False
+        result = results.get(code)
+        if result is None:
+            result = results[code] = bool(is_precipitation(code))
+        return result
+    return check
+
+
+def normalize_hourly(items: Sequence[Dict[str, Any]], is_precipitation: Callable[[str], bool],
+                     start: dt.datetime) -> HourlyColumns:
+    """
+    整理逐小时预报
+    没有时间字段的条目按顺序视为 start 所在整点起的第 n 小时；没有任何预报字段的条目（如统计信息）被忽略
+    """
+    check = _precipitation_checker(is_precipitation)
+    base = start.replace(minute=0, second=0, microsecond=0)
+    times, temperature, amounts, codes, wet = [], [], [], [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        temp, code, amount = _first(item, HOURLY_TEMP_KEYS), _first(item, HOURLY_CODE_KEYS), item.get('precipitation')
+        if temp is None and code is None and amount is None:
+            continue
+        code = str(code) if code is not None else ''
+        amount = to_float(amount)
+        flagged = item.get('is_precipitation')
+        times.append(_parse_time(_first(item, HOURLY_TIME_KEYS)) or base + dt.timedelta(hours=len(times)))
+        temperature.append(to_float(temp))
+        amounts.append(amount)
+        codes.append(code)
+        wet.append(bool(flagged) or amount > 0 or check(code))
+    return HourlyColumns(tuple(times), tuple(temperature), tuple(amounts), tuple(codes), tuple(wet))
+
+
+def normalize_daily(items: Sequence[Dict[str, Any]], is_precipitation: Callable[[str], bool]) -> DailyColumns:
+    """整理多天预报，最高/最低气温取各温度字段的最大/最小值（各天气源的字段含义不一致）"""
+    check = _precipitation_checker(is_precipitation)
+    dates, high, low, codes, wet = [], [], [], [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        temps = [t for t in (to_float(item.get(key)) for key in DAILY_TEMP_KEYS) if not math.isnan(t)]
+        code = _first(item, DAILY_CODE_KEYS)
+        if not temps and code is None:
+            continue
+        code = str(code) if code is not None else ''
+        if 'precipitation_day' in item:
+            is_wet = bool(item['precipitation_day'])
+        elif 'is_precipitation_day' in item:
+            is_wet = bool(item['is_precipitation_day'] or item.get('is_precipitation_night'))
+        else:
+            is_wet = check(code) or check(str(_first(item, DAILY_NIGHT_CODE_KEYS) or ''))
+        moment = _parse_time(_first(item, DAILY_DATE_KEYS))
+        dates.append(moment.date() if moment else None)
+        high.append(max(temps) if temps else NAN)
+        low.append(min(temps) if temps else NAN)
+        codes.append(code)
+        wet.append(is_wet)
+    return DailyColumns(tuple(dates), tuple(high), tuple(low), tuple(codes), tuple(wet))
+
+
+@dataclass(frozen=True)
+class ForecastAnalysis:
+    precipitation_now: bool = False
+    precipitation_time: Tuple[int, ...] = ()  # 逐小时降水状态的分组长度
+    first_hour_precip: bool = False
+    windows: Tuple[Tuple[dt.datetime, dt.datetime], ...] = ()  # 降水时段 [开始, 结束)
+    next_rain_in: Optional[float] = None  # 距下次降水开始的小时数，正在降水时为 0
+    rain_stop_in: Optional[float] = None  # 正在降水时，距降水结束的小时数
+    tomorrow_precipitation: bool = False
+    precipitation_day: int = 0  # 从今天起连续降水的天数
+    temp_change: float = 0.0  # 明日与今日最高气温之差
+    low_temp_change: float = 0.0  # 明日与今日最低气温之差
+    hourly_max: Optional[float] = None
+    hourly_min: Optional[float] = None
+    class_rain: Tuple[str, ...] = ()  # 今天尚未结束且与降水时段重叠的课程（时间线键名）
+    class_rain_start: Optional[dt.datetime] = None  # 上课期间最早开始降水的时刻
+
+    @property
+    def same_precipitation(self) -> bool:
+        return self.precipitation_now == self.first_hour_precip
+
+    def as_precipitation_info(self) -> Dict[str, Any]:
+        """WeatherManager.get_precipitation_info 的返回格式（并附带新增字段）"""
+        return {
+            'precipitation': self.precipitation_now,
+            'precipitation_time': list(self.precipitation_time),
+            'tomorrow_precipitation': self.tomorrow_precipitation,
+            'precipitation_day': self.precipitation_day,
+            'first_hour_precip': self.first_hour_precip,
+            'same_precipitation': self.same_precipitation,
+            'temp_change': self.temp_change,
+            'low_temp_change': self.low_temp_change,
+            'next_rain_in': self.next_rain_in,
+            'rain_stop_in': self.rain_stop_in,
+            'precipitation_windows': [(start.strftime('%H:%M'), end.strftime('%H:%M')) for start, end in self.windows],
+            'class_rain': list(self.class_rain),
+            'class_rain_start': self.class_rain_start.strftime('%H:%M') if self.class_rain_start else None,
+        }
+
+
+def precipitation_windows(hourly: HourlyColumns) -> List[Tuple[dt.datetime, dt.datetime]]:
+    """将连续的降水小时合并为时段"""
+    windows = []
+    index = 0
+    for is_wet, group in groupby(hourly.wet):
+        length = sum(1 for _ in group)
+        if is_wet:
+            windows.append((hourly.times[index], hourly.times[index + length - 1] + dt.timedelta(hours=1)))
+        index += length
+    return windows
+
+
+def rain_during_classes(windows: Sequence[Tuple[dt.datetime, dt.datetime]], timeline: Optional[DayTimeline],
+                        now: dt.datetime) -> Tuple[Tuple[str, ...], Optional[dt.datetime]]:
+    """今天尚未结束的课程与降水时段求交（两者均按时间排序，双指针一次遍历）"""
+    if timeline is None or not windows:
+        return (), None
+    midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    slots = [(midnight + dt.timedelta(seconds=slot.start), midnight + dt.timedelta(seconds=slot.end), slot.key)
+             for slot in timeline.slots if slot.is_class]
+    slots = [slot for slot in slots if slot[1] > now]
+    keys, first_start = [], None
+    i = j = 0
+    while i < len(windows) and j < len(slots):
+        window_start, window_end = windows[i]
+        slot_start, slot_end, key = slots[j]
+        overlap_start = max(window_start, slot_start, now)
+        if overlap_start < min(window_end, slot_end):
+            keys.append(key)
+            if first_start is None or overlap_start < first_start:
+                first_start = overlap_start
+        if window_end <= slot_end:
+            i += 1
+        else:
+            j += 1
+    return tuple(dict.fromkeys(keys)), first_start
+
+
+def analyze(hourly: HourlyColumns, daily: DailyColumns, precipitation_now: bool, now: dt.datetime,
+            timeline: Optional[DayTimeline] = None) -> ForecastAnalysis:
+    windows = precipitation_windows(hourly)
+    upcoming = [(start, end) for start, end in windows if end > now]
+    next_rain_in = rain_stop_in = None
+    if upcoming:
+        start, end = upcoming[0]
+        next_rain_in = max(0.0, (start - now).total_seconds() / 3600)
+        if next_rain_in == 0:
+            rain_stop_in = (end - now).total_seconds() / 3600
+
+    temps = [t for t in hourly.temperature if not math.isnan(t)]
+    class_rain, class_rain_start = rain_during_classes(upcoming, timeline, now)
+
+    def delta(column: Tuple[float, ...]) -> float:
+        if len(column) < 2 or math.isnan(column[0]) or math.isnan(column[1]):
+            return 0.0
+        return column[1] - column[0]
+
+    return ForecastAnalysis(
+        precipitation_now=precipitation_now,
+        precipitation_time=tuple(run_lengths(hourly.wet)),
+        first_hour_precip=hourly.wet[0] if hourly.wet else False,
+        windows=tuple(windows),
+        next_rain_in=next_rain_in,
+        rain_stop_in=rain_stop_in,
+        tomorrow_precipitation=daily.wet[1] if len(daily) > 1 else False,
+        precipitation_day=next((i for i, is_wet in enumerate(daily.wet) if not is_wet), len(daily.wet)),
+        temp_change=delta(daily.high),
+        low_temp_change=delta(daily.low),
+        hourly_max=max(temps) if temps else None,
+        hourly_min=min(temps) if temps else None,
+        class_rain=class_rain,
+        class_rain_start=class_rain_start,
+    )
@@ -11,36 +11,14 @@ from datetime import datetime
 
 import utils
 from file import config_center
-from basic_dirs import CW_HOME, THEME_DIRS
-from data_model import ThemeConfig, ThemeInfo
+from data_model import ThemeInfo
+from theme_registry import theme_registry
 
 base_directory = Path(os.path.dirname(os.path.abspath(__file__)))
 
-def __load_json(path: Path) -> ThemeConfig:
-    with open(path, 'r', encoding='utf-8') as file:
-        return ThemeConfig.model_validate_json(file.read())
-
 def load_theme_config(theme: str) -> ThemeInfo:
-    default_path = CW_HOME / 'ui' / 'default' / 'theme.json'
-    try:
-        config_path = next(
-            (
-                dir
-                for theme_dir in THEME_DIRS
-                if (dir := (theme_dir / theme / 'theme.json')).exists()
-            ),
-            default_path
-        )
-        return ThemeInfo(
-            path=config_path.parent,
-            config=__load_json(config_path)
-        )
-    except Exception as e:
-        logger.error(f"加载主题数据时出错: {repr(e)}，返回默认主题")
-        return ThemeInfo(
-            path=default_path.parent,
-            config=__load_json(default_path)
-        )
+    """获取主题配置（由主题注册表缓存，文件变化时自动重新加载）"""
+    return theme_registry.get(theme)
 
 
 class I18nManager:
@@ -195,6 +173,7 @@ class I18nManager:
             import list_
             import importlib
             importlib.reload(list_)
+            config_center.invalidate_snapshot()  # 默认配置值的翻译随语言变化
 
             if not utils.main_mgr is None:
                 utils.main_mgr.clear_widgets()
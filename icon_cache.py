@@ -0,0 +1,139 @@
+"""
+图标缓存
+缓存已渲染的 SVG 图标（学科图标、天气图标等），避免每秒重复解析与栅格化。
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from PyQt5.QtCore import QSize, Qt
+from PyQt5.QtGui import QColor, QIcon, QPainter, QPixmap
+from PyQt5.QtSvg import QSvgRenderer
+from loguru import logger
+
+import list_
+
+
+class IconCache:
+    """已渲染图标的 LRU 缓存（仅在 GUI 线程中使用）"""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _put(self, key: Hashable, value: Any) -> Any:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self, *_: Any) -> None:
+        """清空缓存（主题、深色模式变化时调用）"""
+        with self._lock:
+            self._entries.clear()
+        logger.debug('图标缓存已清空')
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+    @staticmethod
+    def _render(svg_path: str, size: Optional[QSize] = None, tint: Optional[str] = None,
+                dpr: float = 1.0) -> QPixmap:
+        """栅格化 SVG，可选整体着色"""
+        renderer = QSvgRenderer(svg_path)
+        if size is None or size.isEmpty():
+            size = renderer.defaultSize()
+        dpr = max(1.0, dpr)
+        pixmap = QPixmap(size * dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
+        renderer.render(painter)
+        if tint:
+            painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+            painter.fillRect(pixmap.rect(), QColor(tint))
+        painter.end()
+        pixmap.setDevicePixelRatio(dpr)
+        return pixmap
+
+    def subject_pixmap(self, subject: str, theme: Optional[str], dark: bool, dpr: float = 1.0) -> QPixmap:
+        """学科图标，dark 为 True 时渲染为白色（subject.json 修改后重新渲染）"""
+        key = ('subject', subject, theme, dark, dpr, list_.reload_subject_info())
+        pixmap = self._get(key)
+        if pixmap is None:
+            pixmap = self._put(key, self._render(list_.get_subject_icon(subject),
+                                                 tint='#FFFFFF' if dark else None, dpr=dpr))
+        return pixmap
+
+    def subject_icon(self, subject: str, theme: Optional[str], dark: bool, dpr: float = 1.0) -> QIcon:
+        key = ('subject_icon', subject, theme, dark, dpr, list_.reload_subject_info())
+        icon = self._get(key)
+        if icon is None:
+            icon = self._put(key, QIcon(self.subject_pixmap(subject, theme, dark, dpr)))
+        return icon
+
+    def svg_pixmap(self, svg_path: str, max_side: int = 100, supersample: int = 2) -> QPixmap:
+        """按比例缩放到 max_side 内的 SVG 图标（先以 supersample 倍渲染再平滑缩小）"""
+        key = ('svg', svg_path, max_side, supersample)
+        pixmap = self._get(key)
+        if pixmap is not None:
+            return pixmap
+
+        renderer = QSvgRenderer(svg_path)
+        if not renderer.isValid():
+            raise ValueError(f"无效的SVG文件: {svg_path}")
+        svg_size = renderer.defaultSize()
+        if svg_size.isEmpty():
+            svg_size = QSize(100, 100)  # 默认尺寸
+        aspect_ratio = svg_size.width() / svg_size.height()
+        if aspect_ratio > 1:
+            final_size = QSize(max_side, int(max_side / aspect_ratio))
+        else:
+            final_size = QSize(int(max_side * aspect_ratio), max_side)
+        high_res = self._render(svg_path, final_size * supersample)
+        pixmap = high_res.scaled(final_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        return self._put(key, pixmap)
+
+    def file_pixmap(self, path: str) -> QPixmap:
+        """直接由文件加载的图片（如天气图标）"""
+        key = ('file', path)
+        pixmap = self._get(key)
+        if pixmap is None:
+            pixmap = self._put(key, QPixmap(path))
+        return pixmap
+
+    def warm_subjects(self, theme: Optional[str], dark: bool, dpr: float = 1.0) -> int:
+        """预先渲染 subject.json 中的全部学科图标"""
+        count = 0
+        for subject in list(list_.subject_icon.keys()) + ['课间']:
+            try:
+                self.subject_icon(subject, theme, dark, dpr)
+                count += 1
+            except Exception as e:
+                logger.warning(f'预加载学科图标 {subject} 失败: {e}')
+        logger.debug(f'已预加载 {count} 个学科图标')
+        return count
+
+
+icon_cache = IconCache()
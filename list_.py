@@ -1,15 +1,13 @@
 import json
 import os
 from copy import deepcopy
-from pathlib import Path
 from shutil import copy
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Union
 
 from loguru import logger
 
-from basic_dirs import THEME_DIRS
-from data_model import ThemeConfig, ThemeInfo
 from file import base_directory, config_center, save_data_to_json
+from theme_registry import theme_registry
 
 from PyQt5.QtCore import QCoreApplication
 
@@ -123,40 +121,16 @@ except:
     logger.warning("读取数据库列表失败，重置为空。")
     schedule_dbs = {}
 
-def validate_theme(folder: Path) -> Optional[ThemeInfo]:
-    file_path = folder / 'theme.json'
-    if not file_path.exists():
-        return None
-    try:
-        with file_path.open('r', encoding='utf-8') as f:
-            return ThemeInfo(
-                path=folder,
-                config=ThemeConfig.model_validate_json(f.read())
-            )
-    except Exception as e:
-        logger.error(f'验证主题配置文件发生错误：{e}')
-        return None
-
-
-def __collect_themes(it: Iterable[Tuple[str, ThemeInfo]]) -> Dict[str, ThemeInfo]:
-    themes: Dict[str, ThemeInfo] = {}
-    for name, info in it:
-        if name in themes:
-            logger.warning(f'主题 {name} - {themes[name].path} 已存在，{info.path} 将覆盖原有配置')
-        themes[name] = info
-    return themes
 
+SUBJECT_INFO_PATH = base_directory / 'config' / 'data' / 'subject.json'
+subject_info_mtime = 0.0  # 已读取的 subject.json 的修改时间
 
 try:  # 加载课程/主题配置文件
-    subject_info = json.load(open(f'{base_directory}/config/data/subject.json', 'r', encoding='utf-8'))
+    subject_info_mtime = os.path.getmtime(SUBJECT_INFO_PATH)
+    subject_info = json.load(open(SUBJECT_INFO_PATH, 'r', encoding='utf-8'))
     subject_icon = subject_info['subject_icon']
     subject_abbreviation = subject_info['subject_abbreviation']
-    __theme = __collect_themes(
-        (dir.name, info)
-        for root_dir in reversed(THEME_DIRS)
-        for dir in root_dir.iterdir()
-        if (info := validate_theme(dir)) is not None
-    )
+    __theme = theme_registry.themes()
     theme_folder = list(folder.path.name for folder in __theme.values())
     theme_names = list(folder.config.name for folder in __theme.values())
 except Exception as e:
@@ -215,6 +189,36 @@ def get_current_theme_num() -> Union[str, int]:
             return i
 
 
+def refresh_themes() -> None:
+    """主题增删后刷新主题列表"""
+    global theme_folder, theme_names
+    themes = theme_registry.themes()
+    theme_folder = list(folder.path.name for folder in themes.values())
+    theme_names = list(folder.config.name for folder in themes.values())
+
+
+def reload_subject_info() -> float:
+    """subject.json 修改后重新读取学科图标与简称，返回其修改时间（可用作缓存键）"""
+    global subject_info_mtime
+    try:
+        mtime = os.path.getmtime(SUBJECT_INFO_PATH)
+    except OSError:
+        return subject_info_mtime
+    if mtime != subject_info_mtime:
+        subject_info_mtime = mtime
+        try:
+            with open(SUBJECT_INFO_PATH, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            subject_icon.clear()
+            subject_icon.update(info['subject_icon'])
+            subject_abbreviation.clear()
+            subject_abbreviation.update(info['subject_abbreviation'])
+            logger.info('学科配置已重新加载')
+        except Exception as e:
+            logger.error(f'重新加载学科配置失败：{e}')
+    return mtime
+
+
 def get_theme_ui_path(name: str) -> str:
     for i in range(len(theme_folder)):
         if theme_names[i] == name:
@@ -11,13 +11,19 @@ import psutil
 import signal
 import traceback
 from shutil import copy
-from typing import Optional, Dict, List, Any, Union, Tuple
+from typing import Optional, Dict, List, Any, Union, Tuple, Callable
+
+if __name__ == '__main__' and len(sys.argv) > 1 and sys.argv[1] == '--plugin-host':  # 插件宿主进程，不创建界面
+    import plugin_host
+    sys.exit(plugin_host.run_host(sys.argv[2:]))
+
+import startup
+if startup.PROFILE_FLAG in sys.argv:  # 统计各模块导入耗时
+    startup.import_profiler.enable()
 
-from PyQt5 import uic
 from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QRect, QEasingCurve, QSize, QPoint, QUrl, QObject, QParallelAnimationGroup
-from PyQt5.QtGui import QColor, QIcon, QPixmap, QPainter, QDesktopServices
+from PyQt5.QtGui import QColor, QIcon, QDesktopServices
 from PyQt5.QtGui import QFontDatabase
-from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QProgressBar, QGraphicsBlurEffect, QPushButton, \
     QGraphicsDropShadowEffect, QSystemTrayIcon, QFrame, QGraphicsOpacityEffect, QHBoxLayout
 from loguru import logger
@@ -35,22 +41,24 @@ import list_
 import tip_toast
 from tip_toast import active_windows
 import utils
-import menu
-import weather as db
 from conf import base_directory, load_theme_config
 from extra_menu import ExtraMenu, open_settings, settings
-from generate_speech import generate_speech_sync, list_pyttsx3_voices
-from menu import open_plaza
-from weather import WeatherReportThread as weatherReportThread
-from weather import get_unified_weather_alerts, get_alert_image, weather_manager
-from network_thread import check_update
+from icon_cache import icon_cache
+from ui_cache import ui_cache
+from theme_registry import theme_registry
 from plugin import p_loader
+from plugin_context import AppContext
+from timeline import DayTimeline, TimelinePart, at_seconds, seconds_of_day, sort_timeline_key
+from transition import TransitionEvent, TransitionScheduler, TransitionType
 from utils import restart, stop, update_timer, DarkModeWatcher, TimeManagerFactory
 from file import config_center, schedule_center
 
 if os.name == 'nt':
     import pygetwindow
 
+# 设置、插件广场、语音合成、音频与天气模块在首次使用或启动后空闲时再加载
+db = startup.LazyModule('weather')
+
 today = dt.date.today()
 
 # 存储窗口对象
@@ -73,6 +81,8 @@ notify_cooldown = 2  # 2秒内仅能触发一次通知(防止触发114514个通
 timeline_data = {}
 next_lessons = []
 parts_start_time = []
+day_timeline: Optional[DayTimeline] = None  # 预编译的当日时间线
+transition_scheduler: Optional[TransitionScheduler] = None  # 上下课切换调度
 
 temperature = QCoreApplication.translate("main", '未设置')
 weather_icon = 0
@@ -139,6 +149,42 @@ def handle_dark_mode_change(is_dark: bool) -> None:
         #      setThemeColor(f"#{config_center.read_conf('Color', 'finish_class')}")
 
 
+def handle_themes_changed(changed: set) -> None:
+    """主题文件变化（热更新主题，无需重启）"""
+    def apply() -> None:
+        list_.refresh_themes()
+        if theme in changed or config_center.read_conf('General', 'theme') in changed:
+            logger.info(f'当前主题 {theme} 已变化，重新加载组件')
+            icon_cache.clear()
+            if mgr:
+                mgr.clear_widgets()
+    QTimer.singleShot(0, apply)  # 避免在渲染过程中重建组件
+
+
+def open_plaza() -> None:
+    from menu import open_plaza as _open_plaza
+    _open_plaza()
+
+
+def check_update() -> None:
+    from network_thread import check_update as _check_update
+    _check_update()
+
+
+def report_startup() -> None:
+    """首次绘制后记录启动耗时（--profile-startup 时输出各模块导入耗时）"""
+    profiler = startup.import_profiler
+    elapsed = profiler.mark('首次绘制')
+    logger.info(f'启动完成，用时 {elapsed:.2f} s')
+    if profiler.enabled:
+        profiler.disable()
+        logger.info(f'启动导入耗时：\n{profiler.report(top=25)}')
+        try:
+            logger.info(f'完整统计已保存至 {profiler.dump(os.path.join(base_directory, "log"))}')
+        except OSError as e:
+            logger.error(f'保存启动耗时统计失败：{e}')
+
+
 def setTheme_() -> None:  # 设置主题
     global theme
     color_mode = config_center.read_conf('General', 'color_mode')
@@ -192,13 +238,22 @@ def get_timeline_data() -> Dict[str, Any]:
 
 # 获取Part开始时间
 def get_start_time() -> None:
-    global parts_start_time, timeline_data, loaded_data, order, parts_type
+    global parts_start_time, timeline_data, loaded_data, order, parts_type, day_timeline
     loaded_data = schedule_center.schedule_data
     timeline = get_timeline_data()
     part = loaded_data['part']
+
+    # 日期、星期、课程表文件与内容版本均未变化时沿用已编译的时间线
+    current_time_manager = TimeManagerFactory.get_instance()
+    signature = (current_time_manager.get_today(), str(current_week), config_center.schedule_name,
+                 schedule_center.version)
+    if day_timeline is not None and day_timeline.signature == signature:
+        return
+
     parts_start_time = []
     timeline_data = {}
     order = []
+    parts_type = []
 
     for item_name, item_value in part.items():
         try:
@@ -212,7 +267,6 @@ def get_start_time() -> None:
                 part_type = 'part'
 
             # 使用基础时间，不应用偏移（偏移在比较时统一处理）
-            current_time_manager = TimeManagerFactory.get_instance()
             base_time = dt.datetime.combine(current_time_manager.get_today(), dt.time(h, m))
             parts_start_time.append(base_time)
             order.append(item_name)
@@ -225,26 +279,6 @@ def get_start_time() -> None:
     if paired_sorted:
         parts_start_time, order = zip(*paired_sorted)
 
-    def sort_timeline_key(item):
-        item_name = item[0]
-        prefix = item_name[0]
-        if len(item_name) > 1:
-            try:
-                # 提取节点序数
-                part_num = int(item_name[1])
-                # 提取课程序数
-                class_num = 0
-                if len(item_name) > 2:
-                    class_num = int(item_name[2:])
-                if prefix == 'a':
-                    return part_num, class_num, 0
-                else:
-                    return part_num, class_num, 1
-            except ValueError:
-                # 如果转换失败，返回原始字符串
-                return item_name
-        return item_name
-    
     # 对timeline排序后添加到timeline_data
     sorted_timeline = sorted(timeline.items(), key=sort_timeline_key)
     for item_name, item_time in sorted_timeline:
@@ -253,49 +287,27 @@ def get_start_time() -> None:
         except Exception as e:
             logger.error(f'加载课程表文件[课程数据]出错：{e}')
 
+    day_timeline = DayTimeline.build(part, timeline, signature)
+    logger.debug(f'时间线已重新编译：{len(day_timeline.parts)} 个节点，{len(day_timeline.slots)} 个活动')
+    update_transition_timeline()
 
-def get_part() -> Optional[Tuple[dt.datetime, int]]:
-    if not parts_start_time:
-        return None
-
-    def return_data():
-        base_time = parts_start_time[i]
-        current_manager = TimeManagerFactory.get_instance()
-        c_time = current_manager.get_current_time().replace(
-            hour=base_time.hour,
-            minute=base_time.minute,
-            second=base_time.second,
-            microsecond=base_time.microsecond
-        )
-        return c_time, int(order[i])  # 返回开始时间、Part序号
-
-    current_dt = TimeManagerFactory.get_instance().get_current_time() # 当前时间
 
-    for i in range(len(parts_start_time)):  # 遍历每个Part
-        time_len = dt.timedelta(minutes=0)  # Part长度
+def get_current_part(current_dt: dt.datetime) -> Optional[TimelinePart]:
+    """当前所在节点"""
+    if not parts_start_time or day_timeline is None:
+        return None
+    return day_timeline.part_at(seconds_of_day(current_dt))
 
-        for item_name, item_time in timeline_data.items():
-            if item_name.startswith(f'a{str(order[i])}') or item_name.startswith(f'f{str(order[i])}'):
-                time_len += dt.timedelta(minutes=int(item_time))  # 累计Part的时间点总长度
-            time_len += dt.timedelta(seconds=1)
 
-        if time_len != dt.timedelta(seconds=1):  # 有课程
-            if i == len(parts_start_time) - 1:  # 最后一个Part
-                return return_data()
-            else:
-                # 将基础时间转换为当前时间基准进行比较
-                base_time = parts_start_time[i]
-                current_manager = TimeManagerFactory.get_instance()
-                adjusted_start_time = current_manager.get_current_time().replace(
-                    hour=base_time.hour,
-                    minute=base_time.minute,
-                    second=base_time.second,
-                    microsecond=base_time.microsecond
-                )
-                if current_dt <= adjusted_start_time + time_len:
-                    return return_data()
+def get_part() -> Optional[Tuple[dt.datetime, int]]:
+    if not parts_start_time or day_timeline is None:
+        return None
 
-    return parts_start_time[0], 0
+    current_dt = TimeManagerFactory.get_instance().get_current_time()  # 当前时间
+    part = get_current_part(current_dt)
+    if part is None:
+        return parts_start_time[0], 0
+    return at_seconds(current_dt, part.start), part.part  # 返回开始时间、Part序号
 
 def get_excluded_lessons() -> None:
     global excluded_lessons
@@ -340,106 +352,80 @@ def get_current_lessons() -> None:  # 获取当前课程
                 class_count += 1
 
 
-# 获取倒计时、弹窗提示
-def get_countdown(toast: bool = False) -> Optional[List[Union[str, int]]]:  # 重构好累aaaa
+# 获取倒计时
+def get_countdown() -> Optional[List[Union[str, int]]]:  # 重构好累aaaa
+    # 当前时间舍去毫秒
+    current_dt = TimeManagerFactory.get_instance().get_current_time_without_ms()
+    if not parts_start_time or day_timeline is None:
+        return None
+
+    now = int(seconds_of_day(current_dt))
+    part = get_current_part(current_dt)
+    if part is None:
+        return [QCoreApplication.translate('main', '目前课程已结束'), f'00:00', 100]
+
+    if now >= part.start:
+        slot = day_timeline.slot_in(part, now, inclusive_end=True)
+        if slot is None:
+            return [QCoreApplication.translate('main', '目前课程已结束'), f'00:00', 100]
+        # 根据所在时间段使用不同标语
+        if slot.is_class:
+            return_text = [QCoreApplication.translate('main', '当前活动结束还有')]
+        else:
+            return_text = [QCoreApplication.translate('main', '课间时长还有')]
+        # 返回倒计时、进度条
+        seconds = slot.end - now
+        minute, sec = divmod(seconds, 60)
+        return_text.append(f'{minute:02d}:{sec:02d}')
+        return_text.append(int(100 - seconds / slot.duration * 100) if slot.duration else 100)
+        return return_text
+
+    if f'a{part.part}1' in timeline_data:
+        minute, sec = divmod(part.start - now, 60)
+        return [QCoreApplication.translate('main', '距离上课还有'), f'{minute:02d}:{sec:02d}', 100]
+    return [QCoreApplication.translate('main', '目前课程已结束'), f'00:00', 100]
+
+
+def get_prepare_seconds() -> int:
+    prepare_minutes = config_center.read_conf('Toast', 'prepare_minutes')
+    return int(prepare_minutes) * 60 if str(prepare_minutes).isdigit() else 0
+
+
+def update_transition_timeline(*_: Any) -> None:
+    """时间线重新编译或预备铃提前量变化时更新切换调度（也作为配置订阅回调）"""
+    if transition_scheduler:
+        transition_scheduler.set_timeline(day_timeline, get_prepare_seconds())
+
+
+def on_clock_changed(*_: Any) -> None:
+    """时差偏移修改或 NTP 同步后时钟跳变，按新的时间重新设置切换定时器"""
+    if transition_scheduler:
+        transition_scheduler.poll()
+
+
+# 上下课切换，弹窗提示
+def on_lesson_transition(event: TransitionEvent) -> None:
     global last_notify_time
     current_dt = TimeManagerFactory.get_instance().get_current_time()
     if last_notify_time and (current_dt - last_notify_time).seconds < notify_cooldown:
         return
-    def after_school():  # 放学
-        if parts_type[part] == 'break':  # 休息段
-            notification.push_notification(0, current_lesson_name)  # 下课
-        else:
-            if config_center.read_conf('Toast', 'after_school') == '1':
-                notification.push_notification(2)  # 放学
-
-    # 当前时间舍去毫秒，否则后面判定时间相等始终是False
-    current_dt = TimeManagerFactory.get_instance().get_current_time_without_ms()  
-    return_text = []
-    got_return_data = False
-
-    if parts_start_time:
-        c_time, part = get_part()
-
-        if current_dt >= c_time:
-            for item_name, item_time in timeline_data.items():
-                if item_name.startswith(f'a{str(part)}') or item_name.startswith(f'f{str(part)}'):
-                    # 判断时间是否上下课，发送通知
-                    if current_dt == c_time and toast:
-                        if item_name.startswith('a'):
-                            notification.push_notification(1, next_lessons[0])  # 上课
-                            last_notify_time = current_dt
-                        else:
-                            if next_lessons:  # 下课/放学
-                                notification.push_notification(0, next_lessons[0])  # 下课
-                                last_notify_time = current_dt
-                            else:
-                                after_school()
-
-                    if (current_dt == c_time - dt.timedelta(
-                            minutes=int(config_center.read_conf('Toast', 'prepare_minutes')))
-                            and current_dt != last_notify_time):
-                        if (config_center.read_conf('Toast', 'prepare_minutes') != '0' and toast and item_name.startswith('a')):
-                            if not current_state:  # 课间
-                                notification.push_notification(3, next_lessons[0])  # 准备上课（预备铃）
-                                last_notify_time = current_dt
-
-                    # 放学
-                    if (c_time + dt.timedelta(minutes=int(item_time)) == current_dt 
-                        and not next_lessons and toast):
-                        after_school()
-                        last_notify_time = current_dt
-
-                    add_time = int(item_time)
-                    c_time += dt.timedelta(minutes=add_time)
-
-                    if got_return_data:
-                        break
-
-                    if c_time >= current_dt:
-                        # 根据所在时间段使用不同标语
-                        if item_name.startswith('a'):
-                            return_text.append(QCoreApplication.translate('main', '当前活动结束还有'))
-                        else:
-                            return_text.append(QCoreApplication.translate('main', '课间时长还有'))
-                        # 返回倒计时、进度条
-                        time_diff = c_time - current_dt
-                        minute, sec = divmod(time_diff.seconds, 60)
-                        return_text.append(f'{minute:02d}:{sec:02d}')
-                        # 进度条
-                        seconds = time_diff.seconds
-                        return_text.append(int(100 - seconds / (int(item_time) * 60) * 100))
-                        got_return_data = True
-            if not return_text:
-                return_text = [QCoreApplication.translate('main', '目前课程已结束'), f'00:00', 100]
-        else:
-            prepare_minutes_str = config_center.read_conf('Toast', 'prepare_minutes')
-            if prepare_minutes_str != '0' and toast:
-                prepare_minutes = int(prepare_minutes_str)
-                if current_dt == c_time - dt.timedelta(minutes=prepare_minutes):
-                    next_lesson_name = None
-                    next_lesson_key = None
-                    if timeline_data:
-                        for key in sorted(timeline_data.keys()):
-                            if key.startswith(f'a{str(part)}'):
-                                next_lesson_key = key
-                                break
-                    if next_lesson_key and next_lesson_key in current_lessons:
-                        lesson_name = current_lessons[next_lesson_key]
-                        if lesson_name != QCoreApplication.translate('main', '暂无课程'):
-                            next_lesson_name = lesson_name
-                    if current_state == 0:
-                        now = TimeManagerFactory.get_instance().get_current_time()
-                        if not last_notify_time or (now - last_notify_time).seconds >= notify_cooldown:
-                            if next_lesson_name != None:
-                                    notification.push_notification(3, next_lesson_name)
-            if f'a{part}1' in timeline_data:
-                time_diff = c_time - current_dt
-                minute, sec = divmod(time_diff.seconds, 60)
-                return_text = [QCoreApplication.translate('main', '距离上课还有'), f'{minute:02d}:{sec:02d}', 100]
-            else:
-                return_text = [QCoreApplication.translate('main', '目前课程已结束'), f'00:00', 100]
-        return return_text
+
+    lesson_name = current_lessons.get(event.next_class.key, '') if event.next_class else ''
+    if event.type == TransitionType.ATTEND_CLASS:
+        notification.push_notification(1, lesson_name)  # 上课
+    elif event.type == TransitionType.FINISH_CLASS:
+        if event.part.is_break and event.next_class is None:  # 休息段结束
+            lesson_name = loaded_data.get('part_name', {}).get(str(event.part.part), current_lesson_name)
+        notification.push_notification(0, lesson_name)  # 下课
+    elif event.type == TransitionType.AFTER_SCHOOL:
+        if config_center.read_conf('Toast', 'after_school') != '1':
+            return
+        notification.push_notification(2)  # 放学
+    elif event.type == TransitionType.PREPARE_CLASS:
+        if not lesson_name or lesson_name == QCoreApplication.translate('main', '暂无课程'):
+            return
+        notification.push_notification(3, lesson_name)  # 准备上课（预备铃）
+    last_notify_time = current_dt
 
 
 # 获取将发生的活动
@@ -447,33 +433,17 @@ def get_next_lessons() -> None:
     global current_lesson_name
     global next_lessons
     next_lessons = []
-    part = 0
     current_dt = TimeManagerFactory.get_instance().get_current_time()  # 当前时间
 
-    if parts_start_time:
-        c_time, part = get_part()
-
-        def before_class():
-            if part == 0 or part == 3:
-                return True
-            else:
-                if current_dt >= TimeManagerFactory.get_instance().get_current_time().replace(
-                    hour=parts_start_time[part].hour, 
-                    minute=parts_start_time[part].minute, 
-                    second=parts_start_time[part].second, 
-                    microsecond=parts_start_time[part].microsecond
-                ) - dt.timedelta(minutes=60):
-                    return True
-                else:
-                    return False
+    part = get_current_part(current_dt)
+    if part is None:
+        return
 
-        if before_class():
-            for item_name, item_time in timeline_data.items():
-                if item_name.startswith(f'a{str(part)}') or item_name.startswith(f'f{str(part)}'):
-                    add_time = int(item_time)
-                    if c_time > current_dt and item_name.startswith('a'):
-                        next_lessons.append(current_lessons[item_name])
-                    c_time += dt.timedelta(minutes=add_time)
+    now = seconds_of_day(current_dt)
+    # 上课前一小时内开始显示（第 0、3 节点始终显示）
+    if part.part in (0, 3) or now >= part.start - 3600:
+        next_lessons = [current_lessons[slot.key] for slot in day_timeline.upcoming_classes(part, now)
+                        if slot.key in current_lessons]
 
 
 def get_next_lessons_text() -> str: 
@@ -493,26 +463,24 @@ def get_current_lesson_name() -> None:
     current_lesson_name = QCoreApplication.translate('main', '暂无课程')
     current_state = 0
 
-    if parts_start_time:
-        c_time, part = get_part()
-
-        if current_dt >= c_time:
-            if parts_type[part] == 'break':  # 休息段
-                current_lesson_name = loaded_data['part_name'][str(part)]
-                current_state = 2
-
-            for item_name, item_time in timeline_data.items():
-                if item_name.startswith(f'a{str(part)}') or item_name.startswith(f'f{str(part)}'):
-                    add_time = int(item_time)
-                    c_time += dt.timedelta(minutes=add_time)
-                    if c_time > current_dt:
-                        if item_name.startswith('a'):
-                            current_lesson_name = current_lessons[item_name]
-                            current_state = 1
-                        else:
-                            current_lesson_name = QCoreApplication.translate('main', '课间')
-                            current_state = 0
-                        return
+    part = get_current_part(current_dt)
+    if part is None:
+        return
+
+    now = seconds_of_day(current_dt)
+    if now >= part.start:
+        if part.is_break:  # 休息段
+            current_lesson_name = loaded_data['part_name'][str(part.part)]
+            current_state = 2
+
+        slot = day_timeline.slot_in(part, now)
+        if slot is not None:
+            if slot.is_class:
+                current_lesson_name = current_lessons[slot.key]
+                current_state = 1
+            else:
+                current_lesson_name = QCoreApplication.translate('main', '课间')
+                current_state = 0
 
 def get_hide_status() -> int:
     # 1 -> hide, 0 -> show
@@ -527,6 +495,76 @@ def get_hide_status() -> int:
     }[str(config_center.read_conf('General', 'hide'))]() and not (current_lesson_name in excluded_lessons) else 0
 
 
+# 刷新共享状态（每帧一次，供所有小组件使用）
+def update_state() -> None:
+    global current_time, current_week, today
+
+    today = TimeManagerFactory.get_instance().get_today()
+    current_time = TimeManagerFactory.get_instance().get_current_time_str('%H:%M:%S')
+    get_start_time()
+    get_current_lessons()
+    get_current_lesson_name()
+    get_excluded_lessons()
+    get_next_lessons()
+    hide_status = get_hide_status()
+
+    if (hide_mode:=config_center.read_conf('General', 'hide')) in ['1','2']:  # 上课自动隐藏
+        if hide_status:
+            mgr.decide_to_hide()
+        else:
+            mgr.show_windows()
+    elif hide_mode == '3': # 灵活隐藏
+        if mgr.hide_status is None:
+            mgr.hide_status = (-1, hide_status)
+        elif mgr.hide_status[0] != current_state:
+            mgr.hide_status = (-1, hide_status)
+        if mgr.hide_status[1]:
+            mgr.decide_to_hide()
+        else:
+            mgr.show_windows()
+
+    if conf.is_temp_week():  # 调休日
+        current_week = config_center.read_conf('Temp', 'set_week')
+    else:
+        current_week = TimeManagerFactory.get_instance().get_current_weekday()
+
+
+def use_light_subject_icon() -> bool:  # 在暗色模式显示亮色图标
+    theme_config = conf.load_theme_config(str('default' if theme is None else theme)).config
+    return isDarkTheme() and (theme_config.support_dark_mode or theme_config.default_theme == 'dark')
+
+
+def warm_icon_cache() -> None:  # 预加载学科图标
+    if config_center.read_conf('Other', 'warm_icon_cache') != '1':
+        return
+    try:
+        icon_cache.warm_subjects(theme, use_light_subject_icon(), app.primaryScreen().devicePixelRatio())
+    except Exception as e:
+        logger.warning(f'预加载学科图标失败：{e}')
+
+
+# 各小组件渲染所依赖的状态字段（未列出的组件每帧都会刷新）
+WIDGET_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    'widget-time.ui': ('date',),
+    'widget-current-activity.ui': ('lesson', 'state', 'dark'),
+    'widget-next-activity.ui': ('next_lessons',),
+    'widget-countdown.ui': ('countdown', 'blur_countdown'),
+}
+
+
+def get_render_frame(cd_list: Optional[List[Union[str, int]]]) -> Dict[str, Any]:
+    """本帧的渲染状态"""
+    return {
+        'date': today,
+        'lesson': current_lesson_name,
+        'state': current_state,
+        'dark': isDarkTheme(),
+        'next_lessons': get_next_lessons_text(),
+        'countdown': tuple(cd_list) if cd_list else None,
+        'blur_countdown': config_center.read_conf('General', 'blur_countdown'),
+    }
+
+
 # 定义 RECT 结构体
 class RECT(ctypes.Structure):
     _fields_ = [("left", ctypes.c_long),
@@ -707,55 +745,73 @@ class ErrorDialog(Dialog):  # 重大错误提示框
 
 class PluginManager:  # 插件管理器
     def __init__(self) -> None:
-        self.cw_contexts = {}
-        self.get_app_contexts()
+        self.cw_contexts = AppContext(self._context_providers())
         self.temp_window = []
         self.method = PluginMethod(self.cw_contexts)
 
-    def get_app_contexts(self, path: Optional[str] = None) -> Dict[str, Any]:
-        self.cw_contexts = {
-            "Widgets_Width": list_.widget_width,
-            "Widgets_Name": list_.widget_name,
-            "Widgets_Code": list_.widget_conf,  # 小组件列表
-
-            "Current_Lesson": current_lesson_name,  # 当前课程名
-            "State": current_state,  # 0：课间 1：上课（上下课状态）
-            "Current_Part": get_part(),  # 返回开始时间、Part序号
-            "Next_Lessons_text": get_next_lessons_text(),  # 下节课程
-            "Next_Lessons": next_lessons,  # 下节课程
-            "Current_Lessons": current_lessons,  # 当前课程
-            "Current_Week": current_week,  # 当前周次
-            "Excluded_Lessons": excluded_lessons,  # 排除的课程
-            
-            "Current_Time": current_time,  # 当前时间
-            "Timeline_Data": timeline_data,  # 时间线数据
-            "Parts_Start_Time": parts_start_time,  # 节点开始时间
-            "Parts_Type": parts_type,  # 节点类型
-            "Time_Offset": TimeManagerFactory.get_instance().get_time_offset(),  # 时差偏移
-
-            "Schedule_Name": config_center.schedule_name,  # 课程表名称
-            "Loaded_Data": loaded_data,  # 加载的课程表数据
-            "Order": order,  # 课程顺序
-
-            "Weather": weather_name,  # 天气情况
-            "Temp": temperature,  # 温度
-            "Weather_Data": weather_data_temp,  # 天气数据
-            "Weather_Icon": weather_icon,  # 天气图标
-            "Weather_API": config_center.read_conf('Weather', 'api'),  # 天气API
-            "City": city,  # 城市代码
-
-            "Notification": notification.notification_contents,  # 检测到的通知内容
-            "Last_Notify_Time": last_notify_time,  # 上次通知时间
-
-            "PLUGIN_PATH": os.path.normpath(os.path.join(conf.PLUGINS_DIR, path)) if path else conf.PLUGINS_DIR,  # 传递插件目录
-            "Config_Center": config_center,  # 配置中心实例
-            "Schedule_Center": schedule_center,  # 课程表中心实例
-            "Base_Directory": base_directory,  # 资源目录
-            "Widgets_Mgr": mgr,  # 组件管理器实例
-            "Theme": theme,  # 当前主题
+    @staticmethod
+    def _context_providers() -> Dict[str, Callable[[], Any]]:
+        """上下文各键的取值方法（读取时才计算）"""
+        return {
+            "Widgets_Width": lambda: list_.widget_width,
+            "Widgets_Name": lambda: list_.widget_name,
+            "Widgets_Code": lambda: list_.widget_conf,  # 小组件列表
+
+            "Current_Lesson": lambda: current_lesson_name,  # 当前课程名
+            "State": lambda: current_state,  # 0：课间 1：上课（上下课状态）
+            "Current_Part": get_part,  # 返回开始时间、Part序号
+            "Next_Lessons_text": get_next_lessons_text,  # 下节课程
+            "Next_Lessons": lambda: next_lessons,  # 下节课程
+            "Current_Lessons": lambda: current_lessons,  # 当前课程
+            "Current_Week": lambda: current_week,  # 当前周次
+            "Excluded_Lessons": lambda: excluded_lessons,  # 排除的课程
+
+            "Current_Time": lambda: current_time,  # 当前时间
+            "Timeline_Data": lambda: timeline_data,  # 时间线数据
+            "Parts_Start_Time": lambda: parts_start_time,  # 节点开始时间
+            "Parts_Type": lambda: parts_type,  # 节点类型
+            "Day_Timeline": lambda: day_timeline,  # 预编译的当日时间线
+            "Time_Offset": lambda: TimeManagerFactory.get_instance().get_time_offset(),  # 时差偏移
+
+            "Schedule_Name": lambda: config_center.schedule_name,  # 课程表名称
+            "Loaded_Data": lambda: loaded_data,  # 加载的课程表数据
+            "Order": lambda: order,  # 课程顺序
+
+            "Weather": lambda: weather_name,  # 天气情况
+            "Temp": lambda: temperature,  # 温度
+            "Weather_Data": lambda: weather_data_temp,  # 天气数据
+            "Weather_Bundle": lambda: db.weather_manager.bundle if db.loaded else None,  # 天气数据快照（含预报）
+            "Weather_Icon": lambda: weather_icon,  # 天气图标
+            "Weather_API": lambda: config_center.read_conf('Weather', 'api'),  # 天气API
+            "City": lambda: city,  # 城市代码
+
+            "Notification": lambda: notification.notification_contents,  # 检测到的通知内容
+            "Last_Notify_Time": lambda: last_notify_time,  # 上次通知时间
+
+            "PLUGIN_PATH": lambda: conf.PLUGINS_DIR,  # 传递插件目录
+            "Config_Center": lambda: config_center,  # 配置中心实例
+            "Schedule_Center": lambda: schedule_center,  # 课程表中心实例
+            "Base_Directory": lambda: base_directory,  # 资源目录
+            "Widgets_Mgr": lambda: mgr,  # 组件管理器实例
+            "Theme": lambda: theme,  # 当前主题
         }
+
+    def new_tick(self) -> AppContext:
+        """开始新一轮插件更新，上一轮计算的值全部失效"""
+        self.cw_contexts.invalidate()
         return self.cw_contexts
 
+    def get_app_contexts(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取最新的上下文
+        指定 path 时返回该插件专用的副本（PLUGIN_PATH 指向插件目录），否则返回共用的上下文
+        """
+        contexts = self.new_tick()
+        if path:
+            contexts = contexts.copy()
+            contexts["PLUGIN_PATH"] = os.path.normpath(os.path.join(conf.PLUGINS_DIR, path))  # 传递插件目录
+        return contexts
+
 
 class PluginMethod:  # 插件方法
     def __init__(self, app_context: Dict[str, Any]) -> None:
@@ -794,6 +850,11 @@ class PluginMethod:  # 插件方法
                           content: str = QCoreApplication.translate('main', '这是一条通知示例'), icon: Optional[Any] = None, duration: int = 2000) -> None:  # 发送通知
         notification.push_notification(state, lesson_name, title, subtitle, content, icon, duration)
 
+    @staticmethod
+    def subscribe_transition(callback: Callable[[TransitionEvent], None]) -> None:  # 订阅上下课切换事件
+        if transition_scheduler:
+            transition_scheduler.subscribe(callback)
+
     @staticmethod
     def subprocess_exec(title: str, action: str) -> None:  # 执行系统命令
         w = openProgressDialog(title, action)
@@ -831,6 +892,7 @@ class PluginMethod:  # 插件方法
         返回：
         str: 生成的音频文件路径
         """
+        from generate_speech import generate_speech_sync
         return generate_speech_sync(
             text=text,
             engine=engine,
@@ -872,6 +934,14 @@ class WidgetsManager:
         self.start_pos_y = 0
 
         self.hide_status = None # [0] -> 在 current_state 设置的灵活隐藏， [1] -> 隐藏模式
+        self.render_stats = {'executed': 0, 'skipped': 0}  # 小组件渲染/跳过次数
+
+    def get_render_stats(self) -> Dict[str, int]:
+        """小组件渲染统计"""
+        stats = dict(self.render_stats)
+        total = stats['executed'] + stats['skipped']
+        stats['skip_ratio'] = stats['skipped'] / total if total else 0.0
+        return stats
 
     def sync_widget_animation(self, target_pos: Any) -> None:
         for widget in self.widgets:
@@ -934,7 +1004,7 @@ class WidgetsManager:
             height = self.get_widgets_height()
             pos = self.get_widget_pos(widget.path, widget.widget_cnt)
             pos_x, pos_y = pos[0], pos[1]
-            op = int(config_center.read_conf('General', 'opacity')) / 100
+            op = config_center.snapshot.get_int('General', 'opacity', 100) / 100
 
             if widget.animation is None:
                 widget.widget_transition(pos_x, width, height, op, pos_y)
@@ -1009,14 +1079,20 @@ class WidgetsManager:
         init()
 
     def update_widgets(self) -> None:
-        c = 0
         self.adjust_ui()
 
-        for widget in self.widgets:
-            if c == 0:
-                get_countdown(True)
-            widget.update_data(path=widget.path)
-            c += 1
+        if self.widgets:
+            update_state()
+            cd_list = get_countdown()
+            frame = get_render_frame(cd_list)
+            for widget in self.widgets:
+                render_key = widget.render_key(frame)
+                if render_key is not None and render_key == widget.last_render_key:  # 依赖的状态未变化
+                    self.render_stats['skipped'] += 1
+                    continue
+                widget.last_render_key = render_key
+                widget.render_data(widget.path, cd_list)
+                self.render_stats['executed'] += 1
         p_loader.update_plugins()
 
         if notification.pushed_notification:
@@ -1050,21 +1126,12 @@ class WidgetsManager:
         for widget in widgets_to_clean:
             widget_path = getattr(widget, 'path', self.tr('未知组件'))
             try:
-                if hasattr(widget, 'weather_timer') and widget.weather_timer:
-                    try:
-                        widget.weather_timer.stop()
-                    except RuntimeError:
-                        pass
-                if hasattr(widget, 'weather_thread') and widget.weather_thread:
+                if getattr(widget, 'weather_subscribed', False):
                     try:
-                        if widget.weather_thread.isRunning():
-                            widget.weather_thread.quit()
-                            if not widget.weather_thread.wait(500):
-                                logger.warning(f"组件 {widget_path} 的天气线程未正常退出，强制终止")
-                                widget.weather_thread.terminate()
-                                widget.weather_thread.wait()
-                    except RuntimeError:
+                        db.weather_coordinator.weather_updated.disconnect(widget.update_weather_data)
+                    except (TypeError, RuntimeError):
                         pass
+                    widget.weather_subscribed = False
                 widget.deleteLater()
             except Exception as ex:
                 logger.error(f"清理组件 {widget_path} 时发生异常: {ex}")
@@ -1136,9 +1203,9 @@ class openProgressDialog(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
 
         if isDarkTheme():
-            uic.loadUi(f'{base_directory}/ui/default/dark/toast-open_dialog.ui', self)
+            ui_cache.load(f'{base_directory}/ui/default/dark/toast-open_dialog.ui', self)
         else:
-            uic.loadUi(f'{base_directory}/ui/default/toast-open_dialog.ui', self)
+            ui_cache.load(f'{base_directory}/ui/default/toast-open_dialog.ui', self)
 
         backgnd = self.findChild(QFrame, 'backgnd')
         shadow_effect = QGraphicsDropShadowEffect(self)
@@ -1241,7 +1308,7 @@ class FloatingWidget(QWidget):  # 浮窗
                 50  # 距离顶部 50px
             )
 
-        update_timer.add_callback(self.update_data)
+        update_timer.add_callback(self.update_data, align_to_second=True)
 
     def adjust_position_to_screen(self, pos: QPoint) -> QPoint:
         screen = QApplication.screenAt(pos)
@@ -1362,14 +1429,14 @@ class FloatingWidget(QWidget):  # 浮窗
         theme_config = theme_info.config
         if (theme_path / 'widget-floating.ui').exists():
             if isDarkTheme() and theme_config.support_dark_mode:
-                uic.loadUi(theme_path / 'dark/widget-floating.ui', self)
+                ui_cache.load(theme_path / 'dark/widget-floating.ui', self)
             else:
-                uic.loadUi(theme_path / 'widget-floating.ui', self)
+                ui_cache.load(theme_path / 'widget-floating.ui', self)
         else:
             if isDarkTheme() and theme_config.support_dark_mode:
-                uic.loadUi(f'{base_directory}/ui/default/dark/widget-floating.ui', self)
+                ui_cache.load(f'{base_directory}/ui/default/dark/widget-floating.ui', self)
             else:
-                uic.loadUi(f'{base_directory}/ui/default/widget-floating.ui', self)
+                ui_cache.load(f'{base_directory}/ui/default/widget-floating.ui', self)
 
         # 设置窗口无边框和透明背景
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -1433,7 +1500,7 @@ class FloatingWidget(QWidget):  # 浮窗
         if self.animating:  # 执行动画时跳过更新
             return
         if platform.system() == 'Windows' and platform.release() != '7':
-            self.setWindowOpacity(int(config_center.read_conf('General', 'opacity')) / 100)  # 设置窗口透明度
+            self.setWindowOpacity(config_center.snapshot.get_int('General', 'opacity', 100) / 100)  # 设置窗口透明度
         else:
             self.setWindowOpacity(1.0)
         cd_list = get_countdown()
@@ -1713,6 +1780,7 @@ class DesktopWidget(QWidget):  # 主要小组件
         self.alert_showing = False
 
         self.position = parent.get_widget_pos(self.path, None) if position is None else position
+        self.last_render_key: Optional[Tuple[Any, ...]] = None  # 上一帧渲染时依赖的状态
         self.animation = None
         self.opacity_animation = None
         mgr.hide_status = None
@@ -1823,11 +1891,13 @@ class DesktopWidget(QWidget):  # 主要小组件
             self.current_reminder_index = 0  # 当前提醒索引
             self.showing_reminder = False  # 是否正在显示提醒
 
-            self.weather_timer = QTimer(self)
-            refresh_interval = int(config_center.read_conf('Weather', 'refresh_interval'))
-            self.weather_timer.setInterval(refresh_interval * 60 * 1000)  # 从配置读取间隔
-            self.weather_timer.timeout.connect(self.get_weather_data)
-            self.weather_timer.start()
+            # 所有天气组件共用一个刷新定时器与请求，结果由协调器广播
+            db.weather_coordinator.weather_updated.connect(self.update_weather_data)
+            self.weather_subscribed = True
+            db.weather_coordinator.start()
+            cached_bundle = db.weather_manager.load_cached_bundle()
+            if cached_bundle is not None:  # 先显示上次的天气，再在后台刷新
+                self.update_weather_data(cached_bundle.weather_data)
             self.get_weather_data()
             update_timer.add_callback(self.detect_weather_code_changed)
 
@@ -1882,14 +1952,14 @@ class DesktopWidget(QWidget):  # 主要小组件
         theme_path = theme_info.path
         if (theme_path / path).exists():
             if theme_config.support_dark_mode and isDarkTheme():
-                uic.loadUi(theme_path / 'dark' / path, self)
+                ui_cache.load(theme_path / 'dark' / path, self)
             else:
-                uic.loadUi(theme_path / path, self)
+                ui_cache.load(theme_path / path, self)
         else:
             if theme_config.support_dark_mode and isDarkTheme():
-                uic.loadUi(theme_path / 'dark/widget-base.ui', self)
+                ui_cache.load(theme_path / 'dark/widget-base.ui', self)
             else:
-                uic.loadUi(theme_path / 'widget-base.ui', self)
+                ui_cache.load(theme_path / 'widget-base.ui', self)
 
         # 设置窗口无边框和透明背景
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
@@ -2065,9 +2135,9 @@ class DesktopWidget(QWidget):  # 主要小组件
 
     def closeEvent(self, event):
         try:
-            if hasattr(self, 'weather_thread') and self.weather_thread.isRunning():
-                self.weather_thread.stop()
-                self.weather_thread.wait(1000)
+            if getattr(self, 'weather_subscribed', False):
+                db.weather_coordinator.weather_updated.disconnect(self.update_weather_data)
+                self.weather_subscribed = False
             if hasattr(self, 'reminder_thread') and self.reminder_thread.isRunning():
                 self.reminder_thread.stop()
                 self.reminder_thread.wait(1000)
@@ -2169,41 +2239,20 @@ class DesktopWidget(QWidget):  # 主要小组件
             self.open_extra_menu()
 
     def update_data(self, path: str = '') -> None:
-        global current_time, current_week, start_y, today
-
-        today = TimeManagerFactory.get_instance().get_today()
-        current_time = TimeManagerFactory.get_instance().get_current_time_str('%H:%M:%S')
-        get_start_time()
-        get_current_lessons()
-        get_current_lesson_name()
-        get_excluded_lessons()
-        get_next_lessons()
-        hide_status = get_hide_status()
-
-        if (hide_mode:=config_center.read_conf('General', 'hide')) in ['1','2']:  # 上课自动隐藏
-            if hide_status:
-                mgr.decide_to_hide()
-            else:
-                mgr.show_windows()
-        elif hide_mode == '3': # 灵活隐藏
-            if mgr.hide_status is None:
-                mgr.hide_status = (-1, hide_status)
-            elif mgr.hide_status[0] != current_state:
-                mgr.hide_status = (-1, hide_status)
-            if mgr.hide_status[1]:
-                mgr.decide_to_hide()
-            else:
-                mgr.show_windows()
-
-            
-
-        if conf.is_temp_week():  # 调休日
-            current_week = config_center.read_conf('Temp', 'set_week')
-        else:
-            current_week = TimeManagerFactory.get_instance().get_current_weekday()
-        
-        cd_list = get_countdown()
-
+        update_state()
+        self.render_data(path, get_countdown())
+
+    def render_key(self, frame: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        """本组件依赖的状态，返回 None 表示每帧都刷新"""
+        if self.path == 'widget-countdown-day.ui':  # 自定义倒计时（按组件轮换）
+            return (frame['date'], conf.next_countdown_index(self.cnt),
+                    config_center.read_conf('Date', 'cd_text_custom'), config_center.read_conf('Date', 'countdown_date'))
+        dependencies = WIDGET_DEPENDENCIES.get(self.path)
+        if dependencies is None:
+            return None
+        return tuple(frame[name] for name in dependencies)
+
+    def render_data(self, path: str, cd_list: Optional[List[Union[str, int]]]) -> None:
         if path == 'widget-time.ui':  # 日期显示
             self.date_text.setText(self.tr('{year} 年 {month}').format(year=today.year, month=list_.month[today.month - 1]))
             self.day_text.setText(self.tr('{day}日  {week}').format(day=today.day, week=list_.week[today.weekday()]))
@@ -2211,29 +2260,13 @@ class DesktopWidget(QWidget):  # 主要小组件
         if path == 'widget-current-activity.ui':  # 当前活动
             self.current_subject.setText(f'  {current_lesson_name}')
 
-            if current_state != 2:  # 非休息段
-                render = QSvgRenderer(list_.get_subject_icon(current_lesson_name))
-                self.blur_effect_label.setStyleSheet(
-                    f'background-color: rgba{list_.subject_color(current_lesson_name)}, 200);'
-                )
-            else:  # 休息段
-                render = QSvgRenderer(list_.get_subject_icon('课间'))
-                self.blur_effect_label.setStyleSheet(
-                    f'background-color: rgba{list_.subject_color("课间")}, 200);'
-                )
-            pixmap = QPixmap(render.defaultSize())
-            pixmap.fill(Qt.GlobalColor.transparent)
-
-            painter = QPainter(pixmap)
-            render.render(painter)
-            theme_config = conf.load_theme_config(str('default' if theme is None else theme)).config
-            if (isDarkTheme() and theme_config.support_dark_mode
-                    or isDarkTheme() and theme_config.default_theme == 'dark'):  # 在暗色模式显示亮色图标
-                painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
-                painter.fillRect(pixmap.rect(), QColor("#FFFFFF"))
-            painter.end()
-
-            self.current_subject.setIcon(QIcon(pixmap))
+            subject = current_lesson_name if current_state != 2 else '课间'  # 休息段使用课间图标
+            self.blur_effect_label.setStyleSheet(
+                f'background-color: rgba{list_.subject_color(subject)}, 200);'
+            )
+            self.current_subject.setIcon(
+                icon_cache.subject_icon(subject, theme, use_light_subject_icon(), self.devicePixelRatioF())
+            )
             self.blur_effect.setBlurRadius(25)  # 模糊半径
             self.blur_effect_label.setGraphicsEffect(self.blur_effect)
 
@@ -2258,22 +2291,11 @@ class DesktopWidget(QWidget):  # 主要小组件
             self.custom_countdown.setText(conf.get_custom_countdown())
         self.update()
 
-    def get_weather_data(self) -> None:
+    def get_weather_data(self, force: bool = False) -> None:
+        """请求刷新天气（与其他组件、设置页的请求合并，结果通过 update_weather_data 返回）"""
         logger.info('获取天气数据')
-        if hasattr(weather_manager, 'get_weather_reminders') and hasattr(weather_manager.get_weather_reminders, 'clear_cache'):
-            weather_manager.get_weather_reminders.clear_cache()
-        if hasattr(weather_manager, 'fetch_weather_data') and hasattr(weather_manager.fetch_weather_data, 'clear_cache'):
-            weather_manager.fetch_weather_data.clear_cache()
         self._reset_weather_alert_state()
-        # 停止旧的天气线程
-        if hasattr(self, 'weather_thread') and self.weather_thread.isRunning():
-            self.weather_thread.stop()
-            self.weather_thread.wait(1000)  # 等待线程结束
-        
-        if not hasattr(self, 'weather_thread') or not self.weather_thread.isRunning():
-            self.weather_thread = weatherReportThread()
-            self.weather_thread.weather_signal.connect(self.update_weather_data)
-            self.weather_thread.start()
+        db.weather_coordinator.request_refresh(force=force)
     
     def _on_reminders_ready(self, reminders: list) -> None:
         """获取的天气提醒数据"""
@@ -2341,7 +2363,7 @@ class DesktopWidget(QWidget):  # 主要小组件
             else:
                 # logger.debug(f'检测到城市配置变化: {self.last_code} -> {current_key_config}')
                 self.last_code = current_key_config
-                self.get_weather_data()
+                self.get_weather_data(force=True)
 
     def toggle_weather_alert(self) -> None:
         """按照配置顺序循环显示天气信息"""
@@ -2876,6 +2898,7 @@ class DesktopWidget(QWidget):  # 主要小组件
             self.last_color_mode = color_mode
             self.last_widgets = widgets
             logger.info(f'切换主题：{theme_}，颜色模式{color_mode}')
+            icon_cache.clear()
             mgr.clear_widgets()
 
     def update_weather_data(self, weather_data: Dict[str, Any]) -> None:  # 更新天气数据(已兼容多api)
@@ -2888,7 +2911,7 @@ class DesktopWidget(QWidget):  # 主要小组件
             self._reset_weather_alert_state()
             try:
                 # 更新数据
-                weather_manager.current_weather_data = original_weather_data
+                db.weather_manager.current_weather_data = original_weather_data
                 # 初始化预警和提醒数据
                 self.current_alerts = []
                 self.current_alert_index = 0
@@ -2900,7 +2923,8 @@ class DesktopWidget(QWidget):  # 主要小组件
                 
                 if not hasattr(self, 'reminder_thread') or not self.reminder_thread.isRunning():
                     from weather import WeatherReminderThread
-                    self.reminder_thread = WeatherReminderThread(weather_manager, original_weather_data)
+                    db.weather_manager.set_day_timeline(day_timeline)
+                    self.reminder_thread = WeatherReminderThread(db.weather_manager, original_weather_data)
                     self.reminder_thread.reminders_ready.connect(self._on_reminders_ready)
                     self.reminder_thread.alerts_ready.connect(self._on_alerts_ready)
                     self.reminder_thread.start()
@@ -2912,34 +2936,24 @@ class DesktopWidget(QWidget):  # 主要小组件
                 self.current_reminders = []
                 self.current_reminder_index = 0
 
-            weather_name = db.get_weather_by_code(db.get_weather_data('icon', weather_data))
-            temp_data = db.get_weather_data('temp', weather_data)
-            if temp_data and temp_data.lower() != 'none':
-                temperature = db.weather_processor._convert_temperature_unit(temp_data)
-            else:
-                temperature = '--°'
+            snapshot = db.get_weather_snapshot(weather_data)  # 各组件与设置页共用同一次提取结果
+            weather_name = snapshot.description or '未知'
+            temperature = snapshot.temperature or '--°'
             current_city = self.findChild(QLabel, 'current_city')
             try:
-                self.weather_icon.setPixmap(
-                    QPixmap(db.get_weather_icon_by_code(db.get_weather_data('icon', weather_data)))
-                )
+                self.weather_icon.setPixmap(icon_cache.file_pixmap(db.get_weather_icon_by_code(snapshot.icon)))
                 self.alert_icon.hide()
                 if settings and hasattr(settings, '_on_weather_data_ready'):
                     settings._on_weather_data_ready(original_weather_data)
 
-                temp_data = db.get_weather_data('temp', weather_data)
-                if temp_data and temp_data.lower() != 'none':
-                    converted_temp = db.weather_processor._convert_temperature_unit(temp_data)
-                    self.temperature.setText(converted_temp)
-                else:
-                    self.temperature.setText('--°')
-                city_name = db.search_by_num(config_center.read_conf('Weather', 'city'))
+                self.temperature.setText(temperature)
+                city_name = db.search_by_num(db.get_location_key())
                 if city_name != 'coordinates':
                     current_city.setText(f"{city_name} · "
                                         f"{weather_name}")
                 else:
                     current_city.setText(f'{weather_name}')
-                path = db.get_weather_stylesheet(db.get_weather_data('icon', weather_data)).replace('\\', '/')
+                path = db.get_weather_stylesheet(snapshot.icon).replace('\\', '/')
                 update_stylesheet = re.sub(
                     r'border-image: url\([^)]*\);',
                     f"border-image: url({path});",
@@ -2952,7 +2966,7 @@ class DesktopWidget(QWidget):  # 主要小组件
             logger.error(f'获取天气数据出错：{weather_data}')
             try: 
                 if hasattr(self, 'weather_icon'):
-                    self.weather_icon.setPixmap(QPixmap(f'{base_directory}/img/weather/99.svg'))
+                    self.weather_icon.setPixmap(icon_cache.file_pixmap(f'{base_directory}/img/weather/99.svg'))
                     self.alert_icon.hide()
                     self.weather_alert_text.hide()
                     self.temperature.setText('--°')
@@ -2965,7 +2979,7 @@ class DesktopWidget(QWidget):  # 主要小组件
                         self._reset_weather_alert_state()
                     current_city = self.findChild(QLabel, 'current_city')
                     if current_city:
-                        city_name = city=db.search_by_num(config_center.read_conf('Weather', 'city'))
+                        city_name = db.search_by_num(db.get_location_key())
                         if city_name != 'coordinates':
                             current_city.setText(self.tr("{city} · 未知").format(city=city_name))
                         else:
@@ -2981,21 +2995,6 @@ class DesktopWidget(QWidget):  # 主要小组件
             except Exception as e:
                 logger.error(f'天气图标设置失败：{e}')
 
-    def update_weather_timer_interval(self, minutes: int) -> None:
-        """更新天气定时器间隔"""
-        try:
-            if hasattr(self, 'weather_timer') and self.weather_timer:
-                self.weather_timer.stop()
-                new_interval = minutes * 60 * 1000
-                self.weather_timer.setInterval(new_interval)
-                self.weather_timer.start()
-                # logger.debug(f'天气定时器间隔已更新为 {minutes} 分钟')
-                if settings and hasattr(settings, 'weather_refresh_picker'):
-                    if settings.weather_refresh_picker:
-                        settings.weather_refresh_picker.setValue(minutes)
-        except Exception as e:
-            logger.error(f'更新天气定时器间隔失败: {e}')
-
     def open_extra_menu(self) -> None:
         global ex_menu
         if ex_menu is None or not ex_menu.isVisible():
@@ -3303,13 +3302,14 @@ def check_windows_maximize() -> bool:  # 检查窗口是否最大化
 
 
 def init_config() -> None:  # 重设配置文件
-    config_center.write_conf('Temp', 'set_week', '')
-    config_center.write_conf('Temp', 'set_schedule', '')
-    if config_center.read_conf('Temp', 'temp_schedule') != '':  # 修复换课重置
-        copy(f'{base_directory}/config/schedule/backup.json',
-             f'{base_directory}/config/schedule/{config_center.schedule_name}')
-        config_center.write_conf('Temp', 'temp_schedule', '')
-        schedule_center.update_schedule()
+    with config_center.transaction():
+        config_center.write_conf('Temp', 'set_week', '')
+        config_center.write_conf('Temp', 'set_schedule', '')
+        if config_center.read_conf('Temp', 'temp_schedule') != '':  # 修复换课重置
+            copy(f'{base_directory}/config/schedule/backup.json',
+                 f'{base_directory}/config/schedule/{config_center.schedule_name}')
+            config_center.write_conf('Temp', 'temp_schedule', '')
+            schedule_center.update_schedule()
 
 
 def init() -> None:
@@ -3341,8 +3341,10 @@ def init() -> None:
             fw.show()
             mgr.full_hide_windows()
 
-    update_timer.add_callback(mgr.update_widgets)
+    update_timer.add_callback(mgr.update_widgets, align_to_second=True)
+    update_timer.add_callback(theme_registry.poll, theme_registry.check_interval)
     update_timer.start()
+    QTimer.singleShot(0, warm_icon_cache)
 
     version = config_center.read_conf("Version", "version")
     build_uuid = config_center.read_conf("Version", "build_runid") or "(Debug)"
@@ -3352,6 +3354,7 @@ def init() -> None:
     else:
         logger.success(f'Class Widgets 初始化完成。版本: {version} Build UUID: {build_uuid}({build_type})')
     p_loader.run_plugins()  # 运行插件
+    QTimer.singleShot(0, p_loader.load_deferred)  # 窗口显示后导入延后加载的插件
 
     first_start = False
 
@@ -3394,12 +3397,12 @@ if __name__ == '__main__':
     app.setQuitOnLastWindowClosed(False)
     
     logger.debug(f"i18n加载,界面: {global_i18n_manager.get_current_language_view_name()},组件: {global_i18n_manager.get_current_language_widgets_name()}")
-    menu.global_i18n_manager = global_i18n_manager
 
     logger.info(
         f"是否允许多开实例：{config_center.read_conf('Other', 'multiple_programs')}")
     try:
         dark_mode_watcher = DarkModeWatcher(parent=app)
+        dark_mode_watcher.darkModeChanged.connect(icon_cache.clear)
         dark_mode_watcher.darkModeChanged.connect(handle_dark_mode_change) # 连接信号
         # 初始主题设置依赖于 darkModeChanged 信号
     except Exception as e:
@@ -3447,12 +3450,21 @@ if __name__ == '__main__':
         except Exception as e:
             logger.error(f'添加快捷方式失败：{e}')
 
+    transition_scheduler = TransitionScheduler(lambda: TimeManagerFactory.get_instance().get_current_time())
+    transition_scheduler.subscribe(on_lesson_transition)
+    config_center.subscribe(update_transition_timeline, 'Toast', 'prepare_minutes')
+    config_center.subscribe(on_clock_changed, 'Time', 'time_offset')
+    utils.time_sync_notifier.synced.connect(transition_scheduler.poll)
+
+    theme_registry.watch(handle_themes_changed)
+
     p_mgr = PluginManager()
     p_loader.set_manager(p_mgr)
     p_loader.load_plugins()
 
     init()
     get_start_time()
+    update_transition_timeline()  # 时间线可能在调度器创建前已编译
     get_current_lessons()
     get_current_lesson_name()
     get_next_lessons()
@@ -3477,7 +3489,12 @@ if __name__ == '__main__':
     # w = ErrorDialog()
     # w.exec()
     if config_center.read_conf('Version', 'auto_check_update', '1') == '1':
-        check_update()
+        startup.idle_tasks.add('check_update', check_update)
+    startup.idle_tasks.add('preload_weather', startup.preload('weather'))
+    startup.idle_tasks.add('preload_audio', startup.preload('play_audio'))
+    startup.idle_tasks.add('preload_speech', startup.preload('generate_speech'))
+    QTimer.singleShot(0, report_startup)
+    startup.idle_tasks.start(delay=1000)
 
     status = app.exec()
 
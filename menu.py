@@ -30,7 +30,6 @@ from packaging.version import Version
 from PyQt5 import uic, QtCore
 from PyQt5.QtCore import QObject, QThread, QTimer, QTranslator, QUrl, QDate, QLocale, QTime, Qt, pyqtSignal, QSize
 from PyQt5.QtGui import QColor, QDesktopServices, QIcon, QPainter, QPixmap
-from PyQt5.QtSvg import QSvgRenderer
 from PyQt5.QtWidgets import (
     QApplication, QFileDialog, QFrame, QHeaderView, QHBoxLayout, QLabel, QListWidgetItem, QScroller, 
     QSpacerItem, QTableWidgetItem, QVBoxLayout, QWidget, QSizePolicy
@@ -57,6 +56,7 @@ import weather as wd
 from basic_dirs import THEME_HOME
 from conf import base_directory, load_theme_config
 from cses_mgr import CSES_Converter
+from icon_cache import icon_cache
 from generate_speech import ( 
     get_voice_name_by_id_sync, get_tts_service, get_tts_service, generate_speech_sync, 
     get_available_engines, get_supported_languages, TTSEngine
@@ -225,6 +225,7 @@ class I18nManager:
 
             import importlib
             importlib.reload(list_)
+            config_center.invalidate_snapshot()  # 默认配置值的翻译随语言变化
 
             if not utils.main_mgr is None:
                 utils.main_mgr.clear_widgets()
@@ -309,7 +310,7 @@ class I18nManager:
 
 from PyQt5.QtCore import QCoreApplication
 
-global_i18n_manager = None
+global_i18n_manager = i18n_manager.global_i18n_manager
 
 today = TimeManagerFactory.get_instance().get_today()
 plugin_plaza = None
@@ -476,7 +477,12 @@ class selectCity(MessageBoxBase):  # 选择城市
             self.cancelButton.setText(QCoreApplication.translate('menu','取消'))
             self.search_edit.setPlaceholderText(QCoreApplication.translate('menu','输入城市名'))
             self.search_edit.setClearButtonEnabled(True)
-            self.search_edit.textChanged.connect(self.search_city)
+            # 输入停顿后再搜索，避免每次按键都查询
+            self._search_timer = QTimer(self)
+            self._search_timer.setSingleShot(True)
+            self._search_timer.setInterval(150)
+            self._search_timer.timeout.connect(self.search_city)
+            self.search_edit.textChanged.connect(lambda: self._search_timer.start())
             self.city_list = ListWidget()
             self.city_list.addItems(wd.search_by_name(''))
             self.get_selected_city()
@@ -536,9 +542,10 @@ class selectCity(MessageBoxBase):  # 选择城市
     def get_selected_city(self):
         if self.method != 'location_key':
             raise ValueError("Method must be 'location_key' for city search.")
-        selected_city = self.city_list.findItems(
-            wd.search_by_num(str(config_center.read_conf('Weather', 'city'))), QtCore.Qt.MatchFlag.MatchExactly
-        )
+        city_code = str(config_center.read_conf('Weather', 'city'))
+        if city_code in ('0', ''):  # 自动定位时不预选城市
+            return
+        selected_city = self.city_list.findItems(wd.search_by_num(city_code), QtCore.Qt.MatchFlag.MatchExactly)
         if selected_city:  # 若找到该城市
             item = selected_city[0]
             # 选中该项
@@ -753,7 +760,7 @@ class licenseDialog(MessageBoxBase):  # 显示软件许可协议
 
 class PluginSettingsDialog(MessageBoxBase):  # 插件设置对话框
     def __init__(self, plugin_dir=None, parent=None):
-        if plugin_dir not in p_loader.plugins_settings:
+        if p_loader.get_settings(plugin_dir) is None:
             return
             
         super().__init__(parent)
@@ -829,7 +836,7 @@ class PluginCard(CardWidget):  # 插件卡片
         
         if plugin_dir in enabled_plugins['enabled_plugins']:  # 插件是否启用
             self.enableButton.setChecked(True)
-            if enable_settings and plugin_dir in p_loader.plugins_settings:
+            if enable_settings and p_loader.has_settings(plugin_dir):
                 self.moreMenu.addSeparator()
                 self.moreMenu.addAction(Action(fIcon.SETTING, f'"{title}"插件设置', triggered=self.show_settings))
                 self.settingsBtn.show()
@@ -891,6 +898,9 @@ class PluginCard(CardWidget):  # 插件卡片
             conf.save_plugin_config(enabled_plugins)
 
     def show_settings(self):
+        if p_loader.get_settings(self.plugin_dir) is None:  # 设置页在首次打开时才导入
+            self.settingsBtn.hide()
+            return
         w = PluginSettingsDialog(self.plugin_dir, self.parent)
         if w:
             w.exec()
@@ -1245,8 +1255,17 @@ class SettingsMenu(FluentWindow):
             lambda checked: switch_checked('Other', 'safe_plugin', checked)
         )
 
-        if not p_loader.plugins_settings:  # 若插件设置为空
-            p_loader.load_plugins()  # 加载插件设置
+        plugin_budget = self.findChild(SpinBox, 'plugin_budget')
+        plugin_budget.setRange(0, 5000)
+        plugin_budget.setValue(int(config_center.read_conf('Plugin', 'update_budget', '50')))
+        plugin_budget.valueChanged.connect(
+            lambda: config_center.write_conf('Plugin', 'update_budget', str(plugin_budget.value())))
+        # 设置插件更新耗时上限
+
+        self.setup_plugin_stats_table()
+
+        if not p_loader.manifests:  # 尚未读取插件清单（设置页在打开时才导入）
+            p_loader.load_plugins()
 
         self.load_plugin_cards()
         self.update_plugin_count()
@@ -1318,13 +1337,16 @@ class SettingsMenu(FluentWindow):
             alert_exclude.textChanged.connect(lambda: config_center.write_conf('Weather', 'alert_exclude', alert_exclude.text()))
 
             # 初始化天气管理器
-            self.weather_manager = wd.WeatherManager()
-            self.weather_fetch_thread = wd.WeatherFetchThread(self.weather_manager)
-            self.weather_fetch_thread.weather_data_ready.connect(self._on_weather_data_ready)
-            self.weather_fetch_thread.weather_error.connect(self._on_weather_error)
-            self.weather_fetch_thread.start()
-            self._update_api_key_card_visibility()
+            self.weather_manager = wd.weather_manager
             self._is_refreshing = False  # 刷新标志
+            # 与天气组件共用刷新协调器，同一时间只会有一个请求
+            wd.weather_coordinator.weather_updated.connect(self._on_weather_data_ready)
+            wd.weather_coordinator.weather_failed.connect(self._on_weather_error)
+            wd.weather_coordinator.refresh_finished.connect(self._on_refresh_finished)
+            self.weather_subscribed = True
+            wd.weather_coordinator.start()
+            wd.weather_coordinator.request_refresh()
+            self._update_api_key_card_visibility()
         except Exception as e:
             logger.error(f"天气界面初始化失败: {e}")
 
@@ -1347,26 +1369,19 @@ class SettingsMenu(FluentWindow):
             self._is_refreshing = True
             if hasattr(self, 'refresh_animation'):
                 self.refresh_animation.start()
-            if hasattr(self, 'weather_fetch_thread') and self.weather_fetch_thread.isRunning():
-                self.weather_fetch_thread.stop()
-                self.weather_fetch_thread.wait()
-            self.weather_fetch_thread = wd.WeatherFetchThread(self.weather_manager)
-            self.weather_fetch_thread.weather_data_ready.connect(self._on_weather_data_ready)
-            self.weather_fetch_thread.weather_error.connect(self._on_weather_error)
-            self.weather_fetch_thread.finished.connect(lambda: setattr(self, '_is_refreshing', False))
-            self.weather_fetch_thread.start()
-            if hasattr(self, 'main_window') and self.main_window:
-                self.main_window.get_weather_data()
+            wd.weather_coordinator.request_refresh(force=True)  # 结果同时广播给天气组件
         except Exception as e:
             logger.error(f"刷新天气数据失败: {e}")
             self._is_refreshing = False
     
+    def _on_refresh_finished(self) -> None:
+        self._is_refreshing = False
+
     def _on_refresh_interval_changed(self, value: int) -> None:
         """天气刷新间隔改变事件"""
         try:
             config_center.write_conf('Weather', 'refresh_interval', str(value))
-            if hasattr(self, 'main_window') and self.main_window:
-                self.main_window.update_weather_timer_interval(value)
+            wd.weather_coordinator.set_interval(value)
             # logger.info(f'天气刷新间隔已更新为 {value}')
         except Exception as e:
             logger.error(f'更新天气刷新间隔失败: {e}')
@@ -1387,6 +1402,8 @@ class SettingsMenu(FluentWindow):
     def _on_weather_data_ready(self, weather_data: dict) -> None:
         """就绪回调"""
         try:
+            if 'error' in weather_data:  # 由 _on_weather_error 显示
+                return
             self._update_weather_display_with_data(weather_data)
         except Exception as e:
             logger.error(f"处理异步天气数据失败: {e}")
@@ -1420,7 +1437,7 @@ class SettingsMenu(FluentWindow):
     def _update_basic_weather_info(self, weather_data):
         """基本天气信息"""
         try:
-            city_code = config_center.read_conf('Weather', 'city', '0')
+            city_code = wd.get_location_key() or '0'  # 自动定位时显示实际定位结果
             if city_code == '0':
                 city_name = '未知城市'
             else:
@@ -1436,7 +1453,8 @@ class SettingsMenu(FluentWindow):
                     self.city_location_label.setText(f"{city_name} · 当前天气")
                 else:
                     self.city_location_label.setText("当前天气")
-            update_time_str = wd.get_weather_data('updateTime', weather_data)
+            snapshot = wd.get_weather_snapshot(weather_data)
+            update_time_str = snapshot.update_time
             if update_time_str:
                 try:
                     if 'T' in update_time_str:
@@ -1464,19 +1482,13 @@ class SettingsMenu(FluentWindow):
             
             if self.weather_update_time:
                 self.weather_update_time.setText(f"最后更新于 {display_datetime}")
-            temp_data = wd.get_weather_data('temp', weather_data)
-            if self.current_temperature and temp_data and temp_data.lower() != 'none':
-                self.current_temperature.setText(temp_data)
-            elif self.current_temperature:
-                self.current_temperature.setText('--°')
-            icon_code = wd.get_weather_data('icon', weather_data)
-            if icon_code:
-                description = wd.get_weather_by_code(icon_code)
-                if self.weather_description and description:
-                    self.weather_description.setText(description)
-            feels_like_data = wd.get_weather_data('feels_like', weather_data)
-            if self.feels_like_temperature and feels_like_data and feels_like_data.lower() != 'none':
-                self.feels_like_temperature.setText(f"体感温度: {feels_like_data}")
+            if self.current_temperature:
+                self.current_temperature.setText(snapshot.temperature or '--°')
+            icon_code = snapshot.icon
+            if self.weather_description and snapshot.description:
+                self.weather_description.setText(snapshot.description)
+            if self.feels_like_temperature and snapshot.feels_like:
+                self.feels_like_temperature.setText(f"体感温度: {snapshot.feels_like}")
             elif self.feels_like_temperature:
                 self.feels_like_temperature.setText("体感温度: --°")
             if self.weather_icon_label and icon_code:
@@ -1502,31 +1514,7 @@ class SettingsMenu(FluentWindow):
     def _render_svg_icon(self, svg_path):
         """渲染SVG"""
         try:
-            renderer = QSvgRenderer(svg_path)
-            if not renderer.isValid():
-                raise ValueError(f"无效的SVG文件: {svg_path}")
-            svg_size = renderer.defaultSize()
-            if svg_size.isEmpty():
-                svg_size = QSize(100, 100)  # 默认尺寸
-            target_size = 100
-            aspect_ratio = svg_size.width() / svg_size.height()
-            if aspect_ratio > 1:
-                final_width = target_size
-                final_height = int(target_size / aspect_ratio)
-            else:
-                final_height = target_size
-                final_width = int(target_size * aspect_ratio)
-            final_size = QSize(final_width, final_height)
-            high_res_size = final_size * 2
-            pixmap = QPixmap(high_res_size)
-            pixmap.fill(Qt.transparent)
-            painter = QPainter(pixmap)
-            painter.setRenderHint(QPainter.Antialiasing, True)
-            painter.setRenderHint(QPainter.SmoothPixmapTransform, True)
-            painter.setRenderHint(QPainter.TextAntialiasing, True)
-            renderer.render(painter)
-            painter.end()
-            scaled_pixmap = pixmap.scaled(final_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            scaled_pixmap = icon_cache.svg_pixmap(svg_path, 100)
             if hasattr(self, 'weather_icon_label') and self.weather_icon_label:
                 self.weather_icon_label.setPixmap(scaled_pixmap)
                 self.weather_icon_label.setScaledContents(False)
@@ -1543,36 +1531,26 @@ class SettingsMenu(FluentWindow):
     def _update_weather_details(self, weather_data):
         """其他天气信息"""
         try:
+            snapshot = wd.get_weather_snapshot(weather_data)
             # 风速和风向
-            wind_speed = wd.get_weather_data('wind_speed', weather_data)
-            wind_direction = wd.get_weather_data('wind_direction', weather_data)
             if self.wind_speed_value:
                 wind_text = ""
-                if wind_speed and wind_speed.lower() != 'none':
-                    wind_text = f"{wind_speed}"
-                    if wind_direction and wind_direction.lower() != 'none':
-                        wind_text += f" {wind_direction}"
+                if snapshot.wind_speed:
+                    wind_text = f"{snapshot.wind_speed}"
+                    if snapshot.wind_direction:
+                        wind_text += f" {snapshot.wind_direction}"
                 else:
                     wind_text = "-- km/h"
                 self.wind_speed_value.setText(wind_text)
             # 湿度
-            humidity = wd.get_weather_data('humidity', weather_data)
-            if self.humidity_percentage_value and humidity and humidity.lower() != 'none':
-                self.humidity_percentage_value.setText(f"{humidity}")
-            elif self.humidity_percentage_value:
-                self.humidity_percentage_value.setText("-- %")
+            if self.humidity_percentage_value:
+                self.humidity_percentage_value.setText(f"{snapshot.humidity}" if snapshot.humidity else "-- %")
             # 能见度
-            visibility = wd.get_weather_data('visibility', weather_data)
-            if self.visibility_distance_value and visibility and visibility.lower() != 'none':
-                self.visibility_distance_value.setText(f"{visibility}")
-            elif self.visibility_distance_value:
-                self.visibility_distance_value.setText("-- km")
+            if self.visibility_distance_value:
+                self.visibility_distance_value.setText(f"{snapshot.visibility}" if snapshot.visibility else "-- km")
             # 气压
-            pressure = wd.get_weather_data('pressure', weather_data)
-            if self.pressure_hpa_value and pressure and pressure.lower() != 'none':
-                self.pressure_hpa_value.setText(f"{pressure}")
-            elif self.pressure_hpa_value:
-                self.pressure_hpa_value.setText("-- hPa")
+            if self.pressure_hpa_value:
+                self.pressure_hpa_value.setText(f"{snapshot.pressure}" if snapshot.pressure else "-- hPa")
             # aqi = wd.get_weather_data('aqi', weather_data)
             # if aqi and aqi.lower() != 'none':
             #     logger.info(f"空气质量指数(AQI): {aqi}")
@@ -1826,6 +1804,46 @@ class SettingsMenu(FluentWindow):
         except Exception as e:
             logger.error(f'切换天气API时发生错误: {e}')
 
+    def setup_plugin_stats_table(self):
+        """插件运行统计表（设置页可见时每秒刷新）"""
+        self.plugin_stats_table = self.findChild(TableWidget, 'plugin_stats_table')
+        self.plugin_stats_columns = [
+            self.tr('插件'), self.tr('调用次数'), self.tr('平均耗时(ms)'), self.tr('最大耗时(ms)'),
+            self.tr('CPU 占用'), self.tr('跳过次数'), self.tr('错误'), self.tr('状态')
+        ]
+        self.plugin_state_text = {
+            'running': self.tr('正常'),
+            'throttled': self.tr('已暂缓'),
+            'disabled': self.tr('已停止'),
+        }
+        self.plugin_stats_table.setColumnCount(len(self.plugin_stats_columns))
+        self.plugin_stats_table.setHorizontalHeaderLabels(self.plugin_stats_columns)
+        self.plugin_stats_table.verticalHeader().hide()
+        self.plugin_stats_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.plugin_stats_timer = QTimer(self)
+        self.plugin_stats_timer.timeout.connect(self.refresh_plugin_stats)
+        self.plugin_stats_timer.start(1000)
+        self.refresh_plugin_stats()
+
+    def refresh_plugin_stats(self):
+        if not self.plInterface.isVisible() and self.plugin_stats_table.rowCount():
+            return
+        stats = p_loader.runtime.stats()
+        self.plugin_stats_table.setRowCount(len(stats))
+        for row, item in enumerate(stats):
+            name = plugin_dict.get(item['name'], {}).get('name', item['name'])
+            values = [
+                name, str(item['calls']), f"{item['avg_ms']:.2f}", f"{item['max_ms']:.2f}",
+                f"{item['cpu_percent']:.2f}%", str(item['skipped']), str(item['errors']),
+                self.plugin_state_text.get(item['state'], item['state'])
+            ]
+            for column, text in enumerate(values):
+                cell = self.plugin_stats_table.item(row, column)
+                if cell is None:
+                    self.plugin_stats_table.setItem(row, column, QTableWidgetItem(text))
+                elif cell.text() != text:
+                    cell.setText(text)
+
     def load_plugin_cards(self):
         """加载插件卡片"""
         self.clear_plugin_cards()
@@ -4035,8 +4053,7 @@ class SettingsMenu(FluentWindow):
                             aniType=FlyoutAnimationType.PULL_UP
                         )
             if city_changed:
-                if hasattr(self.weather_manager, 'get_weather_reminders') and hasattr(self.weather_manager.get_weather_reminders, 'clear_cache'):
-                    self.weather_manager.get_weather_reminders.clear_cache()
+                self.weather_manager.get_weather_reminders.clear_cache()
                 self._hide_weather_alerts_section()
                 self._on_refresh_clicked()
 
@@ -5400,6 +5417,14 @@ class SettingsMenu(FluentWindow):
             self._remove_ntp_auto_sync_callback()
         except Exception as e:
             logger.error(f"清理NTP自动同步回调失败: {e}")
+        try:
+            if getattr(self, 'weather_subscribed', False):
+                wd.weather_coordinator.weather_updated.disconnect(self._on_weather_data_ready)
+                wd.weather_coordinator.weather_failed.disconnect(self._on_weather_error)
+                wd.weather_coordinator.refresh_finished.disconnect(self._on_refresh_finished)
+                self.weather_subscribed = False
+        except Exception as e:
+            logger.error(f"断开天气刷新信号失败: {e}")
         
         # 清理TTS相关线程和资源
         try:
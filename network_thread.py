@@ -1,20 +1,18 @@
 import os
 import json
-import shutil
-import zipfile  # 解压插件zip
+import time
 from datetime import datetime
-from typing import Optional, Union, List, Tuple, Dict, Any
+from typing import Optional, Union, List, Dict, Any
 
 import requests
-from PyQt5.QtCore import QThread, pyqtSignal, QEventLoop
+from PyQt5.QtCore import QThread, pyqtSignal
 from loguru import logger
 from packaging.version import Version
 
 import conf
 import utils
-import weather as db
-from weather import WeatherReportThread as weatherReportThread
 from conf import base_directory
+from plugin_download import DownloadCancelled, ResumableDownload, extract_plugin
 from file import config_center
 import list_
 
@@ -201,70 +199,6 @@ class getReadme(QThread):  # 获取README
             logger.error(f"获取README失败：{e}")
             return ''
 
-class getCity(QThread):
-
-    def __init__(self, url: str = 'https://qifu-api.baidubce.com/ip/local/geo/v1/district') -> None:
-        super().__init__()
-        self.download_url = url
-
-    def run(self) -> None:
-        try:
-            city_data = self.get_city()
-            config_center.write_conf('Weather', 'city', db.search_code_by_name(city_data))
-        except Exception as e:
-            logger.error(f"获取城市失败: {e}")
-
-    def get_city(self) -> Tuple[str, str]:
-        try:
-            req = requests.get(self.download_url, proxies=proxies)
-            if req.status_code == 200:
-                data = req.json()
-                # {"code":"Success","data":{"continent":"","country":"中国","zipcode":"","owner":"","isp":"","adcode":"","prov":"","city":"","district":""},"ip":"45.192.96.246"}
-                if data['code'] == 'Success':
-                    data = data['data']
-                    logger.info(f"获取城市成功：{data['city']}, {data['district']}")
-                    return (data['city'], data['district'])
-                else:
-                    logger.error(f"获取城市失败：{data['message']}")
-                    raise ValueError(f"获取城市失败：{data['message']}")
-            else:
-                logger.error(f"获取城市失败：{req.status_code}")    
-                raise ValueError(f"获取城市失败：{req.status_code}")
-            
-        except Exception as e:
-            logger.error(f"获取城市失败：{e}")
-            raise ValueError(f"获取城市失败：{e}")
-        
-class getCoordinates(QThread):
-    def __init__(self, url: str = 'http://ip-api.com/json/?fields=status,lat,lon'):
-        super().__init__()
-        self.download_url = url
-    
-    def run(self) -> None:
-        try:
-            coordinates_data = self.get_coordinates()
-            config_center.write_conf('Weather', 'city', f"{coordinates_data[1]},{coordinates_data[0]}")
-        except Exception as e:
-            logger.error(f"获取坐标失败: {e}")
-
-    def get_coordinates(self) -> Tuple[float, float]:
-        try:
-            req = requests.get(self.download_url, proxies=proxies)
-            if req.status_code == 200:
-                data = req.json()
-                if data['status'] == 'success':
-                    logger.info(f"获取坐标成功：{data['lat']}, {data['lon']}")
-                    return (data['lat'], data['lon'])
-                else:
-                    logger.error(f"获取坐标失败：{data['message']}")
-                    raise ValueError(f"获取坐标失败：{data['message']}")
-            else:
-                logger.error(f"获取坐标失败：{req.status_code}")
-                raise ValueError(f"获取坐标失败：{req.status_code}")
-        except Exception as e:
-            logger.error(f"获取坐标失败：{e}")
-            raise ValueError(f"获取坐标失败：{e}")
-
 class VersionThread(QThread):  # 获取最新版本号
     version_signal = pyqtSignal(dict)
     _instance_running = False
@@ -333,13 +267,15 @@ class DownloadAndExtract(QThread):  # 下载并解压插件
     progress_signal = pyqtSignal(float)  # 进度
     status_signal = pyqtSignal(str)  # 状态
 
-    def __init__(self, url: str, plugin_name: str = 'test_114') -> None:
+    def __init__(self, url: str, plugin_name: str = 'test_114', sha256: Optional[str] = None) -> None:
         super().__init__()
         self.download_url = url
-        print(self.download_url)
-        self.cache_dir = "cache"
+        self.cache_dir = os.path.join(base_directory, 'cache')
         self.plugin_name = plugin_name
+        self.sha256 = sha256  # 插件广场提供时校验
         self.extract_dir = conf.PLUGINS_DIR  # 插件目录
+        self._running = True
+        self._extracting = False
 
     def run(self) -> None:
         try:
@@ -355,7 +291,6 @@ class DownloadAndExtract(QThread):  # 下载并解压插件
             self.status_signal.emit("EXTRACTING")
             self.extract_zip(zip_path)
             os.remove(zip_path)
-            print(enabled_plugins)
 
             if (
                 self.plugin_name not in enabled_plugins['enabled_plugins']
@@ -366,55 +301,43 @@ class DownloadAndExtract(QThread):  # 下载并解压插件
                 conf.save_plugin_config(enabled_plugins)
 
             self.status_signal.emit("DONE")
+        except DownloadCancelled:
+            logger.info(f"已取消下载插件 {self.plugin_name}，下次下载时继续")
         except Exception as e:
-            self.status_signal.emit(f"错误: {e}")
+            self.status_signal.emit(f"ERROR: {e}")
             logger.error(f"插件下载/解压失败: {e}")
 
     def stop(self) -> None:
+        """请求取消（不阻塞），线程在当前分块或解压的文件完成后结束，结束时发出 finished"""
         self._running = False
-        self.terminate()
+
+    @property
+    def terminable(self) -> bool:
+        """解压/替换插件目录时不能强制终止，否则可能只剩下旧目录的备份"""
+        return not self._extracting
+
+    def _report_progress(self, downloaded: int, total: int) -> None:
+        self.progress_signal.emit(downloaded / total * 100 if total > 0 else 0)  # 计算进度
 
     def download_file(self, file_path: str) -> None:
-        # time.sleep(555)  # 模拟下载时间
-        try:
-            self.download_url = mirror_dict[config_center.read_conf('Plugin', 'mirror')] + self.download_url
-            print(self.download_url)
-            response = requests.get(self.download_url, stream=True, proxies=proxies)
-            if response.status_code != 200:
-                logger.error(f"插件下载失败，错误代码: {response.status_code}")
-                self.status_signal.emit(f'ERROR: 网络连接错误：{response.status_code}')
-                return
-
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded_size = 0
-
-            with open(file_path, 'wb') as file:
-                for chunk in response.iter_content(1024):
-                    file.write(chunk)
-                    downloaded_size += len(chunk)
-                    progress = (downloaded_size / total_size) * 100 if total_size > 0 else 0  # 计算进度
-                    self.progress_signal.emit(progress)
-        except Exception as e:
-            self.status_signal.emit(f'ERROR: {e}')
-            logger.error(f"插件下载错误: {e}")
+        """下载到 file_path（可续传，失败时抛出异常）"""
+        url = mirror_dict[config_center.read_conf('Plugin', 'mirror')] + self.download_url
+        logger.debug(f"下载插件 {self.plugin_name}: {url}")
+        start = time.perf_counter()
+        ResumableDownload(
+            url, file_path, sha256=self.sha256,
+            segments=config_center.snapshot.get_int('Plugin', 'download_segments', 4),
+            headers={"User-Agent": headers["User-Agent"]}, proxies=proxies,
+            progress=self._report_progress, is_cancelled=lambda: not self._running
+        ).run()
+        logger.info(f"插件 {self.plugin_name} 下载完成，耗时 {time.perf_counter() - start:.1f} s")
 
     def extract_zip(self, zip_path: str) -> None:
+        self._extracting = True
         try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(self.extract_dir)
-
-            for p_dir in os.listdir(self.extract_dir):
-                if p_dir.startswith(self.plugin_name) and len(p_dir) > len(self.plugin_name):
-                    new_name = p_dir.rsplit('-', 1)[0]
-                    if os.path.exists(os.path.join(self.extract_dir, new_name)):
-                        shutil.copytree(
-                            os.path.join(self.extract_dir, p_dir), os.path.join(self.extract_dir, new_name),
-                            dirs_exist_ok=True)
-                        shutil.rmtree(os.path.join(self.extract_dir, p_dir))
-                    else:
-                        os.rename(os.path.join(self.extract_dir, p_dir), os.path.join(self.extract_dir, new_name))
-        except Exception as e:
-            logger.error(f"解压失败: {e}")
+            extract_plugin(zip_path, self.extract_dir, self.plugin_name, is_cancelled=lambda: not self._running)
+        finally:
+            self._extracting = False
 
 
 def check_update() -> None:
@@ -1,12 +1,17 @@
 import importlib
+import inspect
 import json
 from pathlib import Path
 import shutil
-from typing import Dict, List, Optional, Any
+import time
+from typing import Dict, List, Optional, Any, Set
 
 from loguru import logger
 
 import conf
+from plugin_discovery import DEFERRED, PluginManifest, plugin_discovery
+from plugin_host import PluginHost
+from plugin_runtime import PluginRuntime, plugin_interval
 
 class PluginLoader:  # 插件加载器
     def __init__(self, p_mgr: Optional[Any] = None) -> None:
@@ -14,13 +19,25 @@ class PluginLoader:  # 插件加载器
         self.plugins_name: List[str] = []
         self.plugins_dict: Dict[str, Any] = {}
         self.manager = p_mgr
+        self._accepts_changes: Dict[str, bool] = {}  # 插件 update 是否接收变化的键
+        self._last_generation: Dict[str, int] = {}  # 插件上次更新时的上下文代数
+        self.runtime = PluginRuntime()
+        self.host: Optional[PluginHost] = None  # 独立进程中运行的插件
+        self.manifests: Dict[str, PluginManifest] = {}
+        self._deferred: List[str] = []  # 窗口显示后再导入的插件
+        self._isolated: Set[str] = set()
+        self._safe_plugin = False
 
     def set_manager(self, p_mgr: Any) -> None:
         self.manager = p_mgr
 
     def load_plugins(self) -> List[str]:
+        """
+        读取所有插件清单，只导入需要在首个窗口显示前运行的插件
+        声明 "load": "deferred" 的插件由 load_deferred 在窗口显示后导入；
+        已知只有设置页的插件以及设置页本身在首次打开时才导入
+        """
         plugin_config = conf.load_plugin_config()
-        safe_plugin_enabled = plugin_config.get('safe_plugin', False)
         if 'temp_disabled_plugins' in plugin_config:
             temp_disabled = plugin_config['temp_disabled_plugins']
             if temp_disabled:
@@ -29,52 +46,117 @@ class PluginLoader:  # 插件加载器
                         plugin_config['enabled_plugins'].append(plugin_name)
                 plugin_config['temp_disabled_plugins'] = []
                 conf.save_plugin_config(plugin_config)
-        
-        for folder in Path(conf.PLUGINS_DIR).iterdir():
-            if folder.is_dir() and (folder / 'plugin.json').exists():
-                self.plugins_name.append(folder.name)  # 检测所有插件
-
-                if folder.name not in conf.load_plugin_config()['enabled_plugins']:
-                    continue
-                relative_path = conf.PLUGINS_DIR.name
-                module_name = f"{relative_path}.{folder.name}"
-                try:
-                    module = importlib.import_module(module_name)
-
-                    if hasattr(module, 'Settings'):  # 设置页
-                        plugin_class = getattr(module, "Settings")  # 获取 Plugin 类
-                        # 实例化插件
-                        self.plugins_settings[folder.name] = plugin_class(f'{conf.PLUGINS_DIR}/{folder.name}')
-
-                    if self.manager and hasattr(module, 'Plugin'):  # 插件入口
-                        plugin_class = getattr(module, "Plugin")  # 获取 Plugin 类
-                        # 实例化插件
-                        self.plugins_dict[folder.name] = plugin_class(
-                            self.manager.get_app_contexts(folder.name), self.manager.method
-                        )
-
-                    logger.success(f"加载插件成功：{module_name}")
-                except (ImportError, FileNotFoundError) as e:
-                    logger.warning(f"加载插件 {folder.name} 失败: {e}. 将禁用此插件")
-                    plugin_config = conf.load_plugin_config()
-                    if folder.name in plugin_config['enabled_plugins']:
-                        plugin_config['enabled_plugins'].remove(folder.name)
-                        conf.save_plugin_config(plugin_config)
-                    if folder.name in self.plugins_name:
-                        self.plugins_name.remove(folder.name)
-                    if safe_plugin_enabled:
-                        self._disable_plugin_safely(folder.name)
-                        logger.warning(f"已临时禁用插件 {folder.name}")
-                    continue
-                except Exception as e:
-                    logger.error(f"加载插件 {folder.name} 时发生未知错误: {e}")
-                    if safe_plugin_enabled:
-                        self._disable_plugin_safely(folder.name)
-                        logger.warning(f"已临时禁用插件 {folder.name}")
-                    # 大部分情况一般不会影响运行
-                    continue
+        self._safe_plugin = plugin_config.get('safe_plugin', False)
+        enabled = set(plugin_config.get('enabled_plugins', []))
+        isolated_enabled = set(plugin_config.get('isolated_plugins', []))
+
+        start = time.perf_counter()
+        self.manifests = plugin_discovery.discover()
+        self.plugins_name = list(self.manifests)  # 检测所有插件
+        isolated = []
+        loaded = 0
+        for name, manifest in self.manifests.items():
+            if name not in enabled:
+                continue
+            if name in isolated_enabled or manifest.isolated:  # 交由宿主进程导入
+                isolated.append(name)
+                self._isolated.add(name)
+                continue
+            if not self.manager or manifest.has_plugin is False:  # 没有插件入口，打开设置页时再导入
+                continue
+            if manifest.load == DEFERRED:
+                if name not in self.plugins_dict and name not in self._deferred:
+                    self._deferred.append(name)
+                continue
+            loaded += self._instantiate(name)
+
+        if isolated and self.manager and not self.host:
+            self.host = PluginHost(isolated)
+            self.host.start()
+        plugin_discovery.save()
+        logger.info(f"插件加载完成：导入 {loaded} 个，延后 {len(self._deferred)} 个，"
+                    f"独立进程 {len(isolated)} 个，耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
         return self.plugins_name
 
+    def load_deferred(self) -> None:
+        """导入并运行延后加载的插件（首个窗口显示后调用）"""
+        deferred, self._deferred = self._deferred, []
+        for name in deferred:
+            if self._instantiate(name):
+                self._execute(name, self.plugins_dict[name])
+        if deferred:
+            plugin_discovery.save()
+
+    def _import(self, name: str) -> Optional[Any]:
+        """导入插件模块并记录耗时与入口，失败时按原有规则禁用插件"""
+        module_name = f"{conf.PLUGINS_DIR.name}.{name}"
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            self._on_load_failed(name, e)
+            return None
+        logger.debug(f"导入插件 {name} 耗时 {(time.perf_counter() - start) * 1000:.1f} ms")
+        plugin_discovery.record_entry(name, hasattr(module, 'Plugin'), hasattr(module, 'Settings'))
+        return module
+
+    def _instantiate(self, name: str) -> bool:
+        """导入插件并创建插件实例"""
+        if name in self.plugins_dict:
+            return True
+        module = self._import(name)
+        if module is None:
+            return False
+        if not hasattr(module, 'Plugin'):  # 只有设置页
+            return False
+        try:
+            self.plugins_dict[name] = module.Plugin(self.manager.get_app_contexts(name), self.manager.method)
+        except Exception as e:
+            self._on_load_failed(name, e)
+            return False
+        logger.success(f"加载插件成功：{module.__name__}")
+        return True
+
+    def _on_load_failed(self, name: str, e: Exception) -> None:
+        if isinstance(e, (ImportError, FileNotFoundError)):
+            logger.warning(f"加载插件 {name} 失败: {e}. 将禁用此插件")
+            plugin_config = conf.load_plugin_config()
+            if name in plugin_config['enabled_plugins']:
+                plugin_config['enabled_plugins'].remove(name)
+                conf.save_plugin_config(plugin_config)
+            if name in self.plugins_name:
+                self.plugins_name.remove(name)
+        else:
+            logger.error(f"加载插件 {name} 时发生未知错误: {e}")
+            # 大部分情况一般不会影响运行
+        if self._safe_plugin:
+            self._disable_plugin_safely(name)
+            logger.warning(f"已临时禁用插件 {name}")
+
+    def has_settings(self, name: str) -> bool:
+        """插件是否有设置页（未导入过时以 plugin.json 的 settings 为准）"""
+        if name in self._isolated:
+            return False
+        manifest = self.manifests.get(name)
+        return name in self.plugins_settings or bool(manifest and manifest.settings)
+
+    def get_settings(self, name: str) -> Optional[Any]:
+        """获取插件设置页，首次打开时才导入并创建"""
+        if name in self.plugins_settings:
+            return self.plugins_settings[name]
+        if name in self._isolated or name not in self.manifests:
+            return None
+        module = self._import(name)
+        plugin_discovery.save()
+        if module is None or not hasattr(module, 'Settings'):
+            return None
+        try:
+            self.plugins_settings[name] = module.Settings(f'{conf.PLUGINS_DIR}/{name}')
+        except Exception as e:
+            logger.error(f"创建插件 {name} 设置页失败: {e}")
+            return None
+        return self.plugins_settings[name]
+
     def _disable_plugin_safely(self, plugin_name: str) -> None:
         """安全禁用插件"""
         plugin_config = conf.load_plugin_config()
@@ -88,14 +170,88 @@ class PluginLoader:  # 插件加载器
             logger.info(f"插件 {plugin_name} 已被临时禁用")
 
     def run_plugins(self) -> None:
-        for plugin in self.plugins_dict.values():
+        for name, plugin in list(self.plugins_dict.items()):
+            self._execute(name, plugin)
+        if self.host:
+            for name in self.host.plugins:
+                self.host.execute(name)
+
+    def _execute(self, name: str, plugin: Any) -> None:
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
             plugin.execute()
+        except Exception as e:
+            self.runtime.record_error(name)
+            logger.error(f"插件 {name} 执行失败: {e}")
+        self.runtime.record_execute(name, time.perf_counter() - start, time.thread_time() - cpu_start)
+
+    @staticmethod
+    def _update_accepts_changes(update: Any) -> bool:
+        """
+        update(cw_contexts, changed_keys) 形式的插件会额外收到变化的键
+        只统计没有默认值的位置参数，update(self, ctx, extra=None) 等旧写法仍只收到上下文
+        """
+        try:
+            params = list(inspect.signature(update).parameters.values())
+        except (TypeError, ValueError):
+            return False
+        required = [p for p in params if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) and p.default is p.empty]
+        return len(required) >= 2
 
     def update_plugins(self) -> None:
-        for plugin in self.plugins_dict.values():
-            if hasattr(plugin, 'update'):
-                if self.manager:
-                    plugin.update(self.manager.get_app_contexts())
+        """
+        所有插件共用同一轮的上下文，各键只计算一次
+        记录每个插件的耗时，按声明的 update_interval 跳过更新，超出耗时上限的插件暂缓或临时禁用
+        """
+        if not self.manager or not (self.plugins_dict or self.host):
+            return
+        contexts = self.manager.new_tick()
+        over_budget = []
+        for name, plugin in list(self.plugins_dict.items()):
+            update = getattr(plugin, 'update', None)
+            if update is None:
+                continue
+            now = time.monotonic()
+            if not self.runtime.should_run(name, now):
+                continue
+            accepts_changes = self._accepts_changes.get(name)
+            if accepts_changes is None:
+                accepts_changes = self._accepts_changes[name] = self._update_accepts_changes(update)
+
+            start, cpu_start = time.perf_counter(), time.thread_time()
+            try:
+                if accepts_changes:
+                    changed = contexts.changed_since(self._last_generation.get(name))
+                    self._last_generation[name] = contexts.generation
+                    update(contexts, changed)
+                else:
+                    update(contexts)
+            except Exception as e:
+                self.runtime.record_error(name)
+                logger.error(f"插件 {name} 更新失败: {e}")
+            elapsed = time.perf_counter() - start
+            if self.runtime.record(name, elapsed, time.thread_time() - cpu_start, plugin_interval(plugin), now):
+                over_budget.append((name, elapsed))
+
+        for name, elapsed in over_budget:
+            self._disable_over_budget(name, elapsed)
+
+        if self.host:
+            self.host.tick(contexts, self.manager.method, self.runtime)
+
+    def _disable_over_budget(self, name: str, elapsed: float) -> None:
+        """连续超出耗时上限：停止调用，开启安全模式时加入临时禁用列表（下次启动恢复）"""
+        self.plugins_dict.pop(name, None)
+        logger.warning(f"插件 {name} 连续 {self.runtime.max_strikes} 次更新超出耗时上限 "
+                       f"({elapsed * 1000:.0f} ms > {self.runtime.budget * 1000:.0f} ms)，已停止更新")
+        if conf.config_center.read_conf('Other', 'safe_plugin') == '1':
+            self._disable_plugin_safely(name)
+
+    def shutdown(self) -> None:
+        """退出前停止插件宿主进程"""
+        if self.host:
+            self.host.stop()
+            self.host = None
 
     def delete_plugin(self, plugin_name: str) -> bool:
         plugin_dir = Path(conf.PLUGINS_DIR) / plugin_name
@@ -122,6 +278,14 @@ class PluginLoader:  # 插件加载器
             except Exception as e:
                 logger.error(f"更新 config/widget.json 失败: {e}")
 
+        self._accepts_changes.pop(plugin_name, None)
+        self._last_generation.pop(plugin_name, None)
+        self.runtime.forget(plugin_name)
+        plugin_discovery.forget(plugin_name)
+        plugin_discovery.save()
+        self.manifests.pop(plugin_name, None)
+        if plugin_name in self._deferred:
+            self._deferred.remove(plugin_name)
         if plugin_name in self.plugins_dict:
             del self.plugins_dict[plugin_name]
             logger.info(f"已移除正在运行的插件实例: {plugin_name}")
@@ -0,0 +1,113 @@
+"""
+插件上下文
+所有插件共用一个上下文（dict 的子类，用法不变）。各键的值在首次读取时才计算，并在同一轮更新内复用；
+每轮更新开始时代数加一，已计算的值全部失效。插件可获取自上次更新以来发生变化的键。
+插件写入的键在同一轮内对其他插件可见，下一轮开始时清除（不会保留到之后的更新）。
+"""
+from typing import Any, Callable, Dict, FrozenSet, Iterator, Optional
+
+
+def _fingerprint(value: Any) -> Any:
+    """用于比较变化的副本（容器只复制一层，原地修改也能检测到）"""
+    if isinstance(value, dict):
+        return dict(value)
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+class AppContext(dict):
+    """按需计算的插件上下文"""
+
+    def __init__(self, providers: Dict[str, Callable[[], Any]]) -> None:
+        super().__init__()
+        self._providers = dict(providers)
+        self.generation = 0
+        self._seen: Dict[str, Any] = {}  # 键 -> 上次比较时的值
+        self._changed_at: Dict[str, int] = {}  # 键 -> 检测到变化时的代数
+        self._diffed_generation = -1
+        self.computed = 0  # 实际计算次数
+
+    def __missing__(self, key: str) -> Any:
+        provider = self._providers.get(key)
+        if provider is None:
+            raise KeyError(key)
+        value = provider()
+        self.computed += 1
+        dict.__setitem__(self, key, value)
+        return value
+
+    def register(self, key: str, provider: Callable[[], Any]) -> None:
+        self._providers[key] = provider
+        dict.pop(self, key, None)
+
+    def invalidate(self) -> int:
+        """开始新一轮更新，返回新的代数（已计算的值与插件写入的键一并清除）"""
+        self.generation += 1
+        for key in [key for key in dict.keys(self) if key not in self._providers]:
+            self._seen.pop(key, None)
+            self._changed_at.pop(key, None)
+        dict.clear(self)
+        return self.generation
+
+    def materialize(self) -> None:
+        """计算全部尚未计算的键"""
+        for key in self._providers:
+            if not dict.__contains__(self, key):
+                self[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._providers or dict.__contains__(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self.materialize()
+        return dict.__len__(self)
+
+    def keys(self):  # type: ignore[override]
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):  # type: ignore[override]
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):  # type: ignore[override]
+        self.materialize()
+        return dict.items(self)
+
+    def copy(self) -> Dict[str, Any]:
+        """当前各键值的普通 dict 副本"""
+        self.materialize()
+        return dict(dict.items(self))
+
+    def changed_since(self, generation: Optional[int]) -> FrozenSet[str]:
+        """
+        自 generation 以来值发生变化的键（generation 为 None 时返回全部键）
+        每轮更新最多比较一次，结果由所有插件共用
+        """
+        if self._diffed_generation != self.generation:
+            for key, value in self.items():
+                fingerprint = _fingerprint(value)
+                try:
+                    changed = key not in self._seen or bool(self._seen[key] != fingerprint)
+                except Exception:  # 无法比较的值视为已变化
+                    changed = True
+                if changed:
+                    self._seen[key] = fingerprint
+                    self._changed_at[key] = self.generation
+            self._diffed_generation = self.generation
+        if generation is None:
+            return frozenset(self._changed_at)
+        return frozenset(key for key, changed_at in self._changed_at.items() if changed_at > generation)
@@ -0,0 +1,170 @@
+"""
+插件发现
+启动时并行读取各插件的 plugin.json，结果连同插件提供的入口（Plugin / Settings）按文件修改时间缓存到磁盘；
+插件目录未改动时直接使用缓存，不再读取清单。
+
+plugin.json 可选字段
+    "load": "eager" | "deferred"   eager（默认）在首个窗口显示前导入，deferred 在窗口显示后导入
+    "isolated": true               在插件宿主进程中运行（同 config/plugin.json 的 isolated_plugins）
+"""
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+import conf
+from file import base_directory
+
+DISCOVERY_CACHE_PATH = base_directory / 'cache' / 'plugin_discovery.json'
+CACHE_VERSION = 1
+MAX_WORKERS = 8
+
+EAGER = 'eager'
+DEFERRED = 'deferred'
+
+
+@dataclass(frozen=True)
+class PluginManifest:
+    """插件清单与已知的入口"""
+    name: str  # 插件目录名
+    stamp: Tuple[int, ...]  # (目录, plugin.json, __init__.py) 的修改时间(ns)
+    data: Dict[str, Any] = field(default_factory=dict)
+    has_plugin: Optional[bool] = None  # 导入过后才知道，None 为未知
+    has_settings: Optional[bool] = None
+
+    @property
+    def load(self) -> str:
+        return DEFERRED if str(self.data.get('load', EAGER)).lower() == DEFERRED else EAGER
+
+    @property
+    def isolated(self) -> bool:
+        return bool(self.data.get('isolated', False))
+
+    @property
+    def settings(self) -> bool:
+        """是否有设置页（导入过则以实际入口为准）"""
+        if self.has_settings is not None:
+            return self.has_settings
+        return bool(self.data.get('settings', False))
+
+    def as_cache(self) -> Dict[str, Any]:
+        return {
+            'stamp': list(self.stamp),
+            'manifest': self.data,
+            'has_plugin': self.has_plugin,
+            'has_settings': self.has_settings,
+        }
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+class PluginDiscovery:
+    """读取并缓存插件清单"""
+
+    def __init__(self, plugins_dir: Path, cache_path: Path) -> None:
+        self.plugins_dir = Path(plugins_dir)
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self.manifests: Dict[str, PluginManifest] = {}
+        self._dirty = False
+
+    def _load_cache(self) -> Dict[str, Any]:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                return data.get('plugins', {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f'读取插件缓存失败: {e}')
+        return {}
+
+    def save(self) -> None:
+        """有变化时写入缓存"""
+        with self._lock:
+            if not self._dirty:
+                return
+            plugins = {name: manifest.as_cache() for name, manifest in self.manifests.items()}
+            self._dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_path.parent), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'plugins': plugins}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f'保存插件缓存失败: {e}')
+
+    @staticmethod
+    def _read(folder: Path, cached: Optional[Dict[str, Any]]) -> Tuple[Optional[PluginManifest], bool]:
+        """读取单个插件的清单，返回 (清单, 是否来自缓存)；不是插件目录时清单为 None"""
+        manifest_path = folder / 'plugin.json'
+        stamp = (_mtime_ns(folder), _mtime_ns(manifest_path), _mtime_ns(folder / '__init__.py'))
+        if not stamp[1]:
+            return None, False
+        if cached and tuple(cached.get('stamp', ())) == stamp:
+            return PluginManifest(
+                folder.name, stamp, cached.get('manifest') or {},
+                cached.get('has_plugin'), cached.get('has_settings')
+            ), True
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError('plugin.json 格式错误')
+        except Exception as e:
+            logger.warning(f'读取插件 {folder.name} 的 plugin.json 失败: {e}')
+            data = {}
+        return PluginManifest(folder.name, stamp, data), False
+
+    def discover(self) -> Dict[str, PluginManifest]:
+        """并行读取所有插件清单（按目录名排序）"""
+        try:
+            folders = sorted((f for f in self.plugins_dir.iterdir()
+                              if f.is_dir() and not f.name.startswith('.')),  # 跳过安装时的临时目录
+                             key=lambda f: f.name)
+        except FileNotFoundError:
+            folders = []
+        cache = self._load_cache()
+        results: List[Tuple[Optional[PluginManifest], bool]] = []
+        if folders:
+            with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(folders)),
+                                    thread_name_prefix='plugin_discovery') as executor:
+                results = list(executor.map(lambda f: self._read(f, cache.get(f.name)), folders))
+
+        manifests = {manifest.name: manifest for manifest, _ in results if manifest is not None}
+        with self._lock:
+            self.manifests = manifests
+            self._dirty = set(manifests) != set(cache) or not all(hit for manifest, hit in results if manifest)
+        hits = sum(1 for manifest, hit in results if manifest and hit)
+        logger.debug(f'发现 {len(manifests)} 个插件（{hits} 个使用缓存）')
+        return manifests
+
+    def record_entry(self, name: str, has_plugin: bool, has_settings: bool) -> None:
+        """导入插件后记录其提供的入口，下次启动可据此跳过导入"""
+        with self._lock:
+            manifest = self.manifests.get(name)
+            if manifest is None or (manifest.has_plugin, manifest.has_settings) == (has_plugin, has_settings):
+                return
+            self.manifests[name] = replace(manifest, has_plugin=has_plugin, has_settings=has_settings)
+            self._dirty = True
+
+    def forget(self, name: str) -> None:
+        with self._lock:
+            if self.manifests.pop(name, None) is not None:
+                self._dirty = True
+
+
+plugin_discovery = PluginDiscovery(conf.PLUGINS_DIR, DISCOVERY_CACHE_PATH)
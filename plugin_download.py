@@ -0,0 +1,351 @@
+"""
+插件下载与安装
+下载先写入 cache 目录中的 .part 文件，进度保存在同名 .part.json 中，中断后按 HTTP Range 续传；
+服务器支持 Range 且文件较大时分成多段并行下载。提供 SHA-256 时下载完成后校验。
+解压先流式写入插件目录下的临时目录，完成后再整体重命名为插件目录。
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from loguru import logger
+from requests.adapters import HTTPAdapter
+
+CHUNK_SIZE = 256 * 1024
+PROGRESS_INTERVAL = 0.1  # 进度回调的最小间隔(s)
+STATE_INTERVAL = 1.0  # 保存续传进度的间隔(s)
+SEGMENT_MIN_SIZE = 2 * 1024 * 1024  # 每段至少多大才分段下载
+MAX_RETRIES = 3  # 每段失败后重试次数
+DEFAULT_TIMEOUT = (10.0, 30.0)  # (连接, 读取) 超时(s)
+CODE_SUFFIXES = ('.py', '.pyc', '.pyd')  # 更新插件时不从旧目录保留的文件
+
+_CONTENT_RANGE = re.compile(r'bytes\s+\d+-\d+/(\d+)')
+
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+
+
+@dataclass
+class Segment:
+    """文件中的一段 [start, end]"""
+    start: int
+    end: int
+    done: int = 0
+
+    @property
+    def position(self) -> int:
+        return self.start + self.done
+
+    @property
+    def finished(self) -> bool:
+        return self.position > self.end
+
+
+@dataclass(frozen=True)
+class RemoteFile:
+    size: int  # 0 为未知
+    ranges: bool  # 是否支持 Range
+    validator: str  # ETag 或 Last-Modified
+
+
+class ResumableDownload:
+    """可续传、可分段并行的下载（在调用线程中阻塞执行）"""
+
+    def __init__(self, url: str, path: str, sha256: Optional[str] = None, segments: int = 1,
+                 headers: Optional[Dict[str, str]] = None, proxies: Optional[Dict[str, Any]] = None,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 is_cancelled: Optional[Callable[[], bool]] = None) -> None:
+        self.url = url
+        self.path = path
+        self.part_path = f'{path}.part'
+        self.state_path = f'{path}.part.json'
+        self.sha256 = sha256.lower() if sha256 else None
+        self.segments = max(1, segments)
+        self.headers = dict(headers or {})
+        self.proxies = proxies
+        self.timeout = timeout
+        self.progress = progress
+        self.is_cancelled = is_cancelled or (lambda: False)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.segments + 1)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._lock = threading.Lock()
+        self._downloaded = 0
+        self._total = 0
+        self._last_progress = 0.0
+        self._last_state = 0.0
+        self._abort = threading.Event()  # 某一段失败后通知其他段停止
+
+    def run(self) -> str:
+        """下载到 path 并返回 path"""
+        try:
+            remote, response = self._probe()
+            if remote.ranges and remote.size:
+                if response is not None:
+                    response.close()
+                self._download_ranges(remote)
+            else:
+                self._download_stream(remote, response)
+            self._verify()
+            os.replace(self.part_path, self.path)
+            self._remove(self.state_path)
+            return self.path
+        finally:
+            self.session.close()
+
+    def _request(self, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        headers = dict(self.headers)
+        headers.update(extra_headers or {})
+        return self.session.get(self.url, headers=headers, proxies=self.proxies, timeout=self.timeout, stream=True)
+
+    def _probe(self) -> Tuple[RemoteFile, Optional[requests.Response]]:
+        """用 Range: bytes=0-0 探测大小与是否支持续传；不支持时直接返回完整响应供下载"""
+        response = self._request({'Range': 'bytes=0-0'})
+        validator = response.headers.get('ETag') or response.headers.get('Last-Modified') or ''
+        if response.status_code == 206:
+            match = _CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+            response.close()
+            return RemoteFile(int(match.group(1)) if match else 0, bool(match), validator), None
+        if response.status_code != 200:
+            response.close()
+            raise ConnectionError(f'网络连接错误：{response.status_code}')
+        return RemoteFile(int(response.headers.get('content-length', 0) or 0), False, validator), response
+
+    def _load_state(self, remote: RemoteFile) -> Optional[List[Segment]]:
+        """读取续传进度，文件已变化时返回 None"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if (state.get('url') != self.url or state.get('size') != remote.size
+                    or state.get('validator', '') != remote.validator
+                    or os.path.getsize(self.part_path) != remote.size):
+                return None
+            return [Segment(*segment) for segment in state['segments']]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f'读取下载进度失败，将重新下载: {e}')
+            return None
+
+    def _save_state(self, remote: RemoteFile, segments: List[Segment]) -> None:
+        with self._lock:
+            state = {
+                'url': self.url, 'size': remote.size, 'validator': remote.validator,
+                'segments': [[s.start, s.end, s.done] for s in segments],
+            }
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or '.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.warning(f'保存下载进度失败: {e}')
+
+    def _plan(self, size: int) -> List[Segment]:
+        count = max(1, min(self.segments, size // SEGMENT_MIN_SIZE))
+        step = -(-size // count)
+        return [Segment(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+    def _report(self, amount: int, force: bool = False) -> None:
+        with self._lock:
+            self._downloaded += amount
+            now = time.monotonic()
+            if not force and now - self._last_progress < PROGRESS_INTERVAL:
+                return
+            self._last_progress = now
+            downloaded, total = self._downloaded, self._total
+        if self.progress:
+            self.progress(downloaded, total)
+
+    def _download_ranges(self, remote: RemoteFile) -> None:
+        segments = self._load_state(remote)
+        if segments is None:
+            segments = self._plan(remote.size)
+            with open(self.part_path, 'wb') as f:
+                f.truncate(remote.size)
+        else:
+            logger.info(f'继续下载 {os.path.basename(self.path)}')
+        self._total = remote.size
+        self._downloaded = sum(s.done for s in segments)
+        pending = [s for s in segments if not s.finished]
+        self._report(0, force=True)
+        try:
+            if len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='plugin_download') as executor:
+                    futures = [executor.submit(self._fetch_segment, remote, segments, s) for s in pending]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        self._abort.set()
+                        raise
+            elif pending:
+                self._fetch_segment(remote, segments, pending[0])
+        finally:
+            self._save_state(remote, segments)
+        self._report(0, force=True)
+
+    def _fetch_segment(self, remote: RemoteFile, segments: List[Segment], segment: Segment) -> None:
+        attempt = 0
+        while not segment.finished:
+            try:
+                response = self._request({'Range': f'bytes={segment.position}-{segment.end}'})
+                with response, open(self.part_path, 'r+b') as f:
+                    if response.status_code != 206:
+                        raise ConnectionError(f'服务器不支持分段下载：{response.status_code}')
+                    f.seek(segment.position)
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        if self._abort.is_set() or self.is_cancelled():
+                            raise DownloadCancelled()
+                        chunk = chunk[:segment.end + 1 - segment.position]
+                        f.write(chunk)
+                        with self._lock:
+                            segment.done += len(chunk)
+                        self._report(len(chunk))
+                        self._maybe_save_state(remote, segments)
+                        if segment.finished:
+                            break
+                if not segment.finished:
+                    raise ConnectionError('连接提前关闭')
+            except (requests.RequestException, ConnectionError) as e:
+                attempt += 1
+                if attempt > MAX_RETRIES or self.is_cancelled():
+                    raise
+                logger.warning(f'下载分段 {segment.start}-{segment.end} 失败，第 {attempt} 次重试: {e}')
+                time.sleep(attempt)
+
+    def _maybe_save_state(self, remote: RemoteFile, segments: List[Segment]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_state < STATE_INTERVAL:
+                return
+            self._last_state = now
+        self._save_state(remote, segments)
+
+    def _download_stream(self, remote: RemoteFile, response: Optional[requests.Response]) -> None:
+        """服务器不支持 Range：整体下载"""
+        if response is None:
+            response = self._request()
+        self._total = remote.size
+        self._downloaded = 0
+        self._remove(self.state_path)
+        with response, open(self.part_path, 'wb') as f:
+            if response.status_code != 200:
+                raise ConnectionError(f'网络连接错误：{response.status_code}')
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if self.is_cancelled():
+                    raise DownloadCancelled()
+                f.write(chunk)
+                self._report(len(chunk))
+        self._report(0, force=True)
+
+    def _verify(self) -> None:
+        if not self.sha256:
+            return
+        digest = hashlib.sha256()
+        with open(self.part_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        if digest.hexdigest() != self.sha256:
+            self._remove(self.part_path)
+            self._remove(self.state_path)
+            raise ValueError('文件校验失败（SHA-256 不一致），请重新下载')
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _archive_root(names: List[str]) -> str:
+    """压缩包内唯一的顶层目录（如 GitHub 的 repo-main/），没有时返回空串"""
+    roots = {name.split('/', 1)[0] for name in names if name}
+    if len(roots) == 1 and all('/' in name for name in names if name):
+        return f'{roots.pop()}/'
+    return ''
+
+
+def _keep_local_files(old_dir: Path, new_dir: Path) -> None:
+    """保留旧插件目录中压缩包里没有的数据文件（如插件自己生成的配置），旧版本的代码不保留"""
+    for root, dirs, files in os.walk(old_dir):
+        dirs[:] = [d for d in dirs if d != '__pycache__']
+        relative = Path(root).relative_to(old_dir)
+        for name in files:
+            if name.lower().endswith(CODE_SUFFIXES):
+                continue
+            target = new_dir / relative / name
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(os.path.join(root, name), target)
+
+
+def extract_plugin(zip_path: str, plugins_dir: Path, plugin_name: str,
+                   is_cancelled: Optional[Callable[[], bool]] = None) -> Path:
+    """
+    解压到临时目录后整体替换插件目录，返回插件目录
+    解压过程中 is_cancelled 返回 True 时抛出 DownloadCancelled；开始替换目录后不再中断
+    """
+    plugins_dir = Path(plugins_dir)
+    staging = Path(tempfile.mkdtemp(prefix=f'.{plugin_name}-', dir=str(plugins_dir)))
+    target = plugins_dir / plugin_name
+    try:
+        staging_root = staging.resolve()
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = zip_ref.infolist()
+            root = _archive_root([m.filename for m in members])
+            for member in members:
+                if is_cancelled is not None and is_cancelled():
+                    raise DownloadCancelled()
+                relative = member.filename[len(root):]
+                if not relative:
+                    continue
+                path = (staging / relative).resolve()
+                if staging_root not in path.parents:  # 不允许解压到临时目录之外
+                    raise ValueError(f'压缩包中包含非法路径: {member.filename}')
+                if member.is_dir():
+                    path.mkdir(parents=True, exist_ok=True)
+                    continue
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with zip_ref.open(member) as src, open(path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+        if not target.exists():
+            os.replace(staging, target)
+            return target
+
+        _keep_local_files(target, staging)
+        backup = plugins_dir / f'.{plugin_name}.old'
+        shutil.rmtree(backup, ignore_errors=True)
+        try:
+            os.replace(target, backup)
+        except OSError as e:  # 插件文件被占用（如已加载的 .pyd），退回逐个覆盖
+            logger.warning(f'无法替换插件目录 {target}，将覆盖其中的文件: {e}')
+            shutil.copytree(staging, target, dirs_exist_ok=True)
+            shutil.rmtree(staging, ignore_errors=True)
+            return target
+        try:
+            os.replace(staging, target)
+        except OSError:
+            os.replace(backup, target)
+            raise
+        shutil.rmtree(backup, ignore_errors=True)
+        return target
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
@@ -0,0 +1,428 @@
+"""
+插件宿主进程
+config/plugin.json 中 isolated_plugins 列出的插件在独立的子进程中运行，不与组件刷新争抢 GIL，崩溃也不会影响主程序。
+主进程与子进程通过本地 socket（multiprocessing.connection）交换消息，消息均为元组：
+
+主进程 -> 子进程
+    ('load', 插件名)
+    ('tick', 代数, {变化的上下文键: 值})     子进程应用变化后调用各插件的 update
+    ('execute', 插件名)
+    ('stop',)
+子进程 -> 主进程
+    ('loaded', 插件名) / ('load_failed', 插件名, 错误)
+    ('call', 插件名, 方法名, args, kwargs)  由主进程在主线程调用 PluginMethod 对应方法
+    ('config', 节, 键, 值)                 子进程中的 write_conf，由主进程写入 config.ini
+    ('timing', 插件名, 耗时, CPU 时间)
+    ('error', 插件名, 错误)
+
+子进程中的 config_center 为只读：修改转交主进程写入，config.ini 变化后子进程重新读取，
+两个进程不会各自用内存中的旧副本覆盖对方的修改。
+子进程退出后按指数退避自动重启，重启后重新加载插件并发送完整的上下文。
+"""
+import importlib
+import os
+import pickle
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+HOST_FLAG = '--plugin-host'
+AUTHKEY_ENV = 'CW_PLUGIN_HOST_AUTHKEY'  # authkey 通过环境变量传给子进程，命令行对其他用户可见
+CONNECT_TIMEOUT = 10.0  # 等待子进程连接的时长(s)
+RESTART_BASE = 2.0  # 首次重启前的等待(s)
+RESTART_MAX = 60.0
+MAX_RESTARTS = 5  # 连续崩溃超过此次数后不再重启
+STABLE_AFTER = 60.0  # 运行超过此时长视为稳定，清零崩溃计数(s)
+
+# 不发送到子进程的上下文（子进程中无法使用，需要时在子进程中自行导入）
+LOCAL_ONLY_KEYS = frozenset({'Config_Center', 'Schedule_Center', 'Widgets_Mgr'})
+# 子进程可以请求主进程执行的 PluginMethod 方法
+REMOTE_CALLS = frozenset({
+    'register_widget', 'adjust_widget_width', 'change_widget_content', 'send_notification',
+    'subprocess_exec', 'play_audio',
+})
+
+
+def host_command(address: Any) -> List[str]:
+    """启动子进程的命令（打包后的程序通过 main 的 --plugin-host 参数进入宿主）"""
+    host, port = address
+    args = [HOST_FLAG, host, str(port)]
+    if getattr(sys, 'frozen', False) or '__compiled__' in globals():
+        return [sys.executable] + args
+    return [sys.executable, os.path.abspath(__file__)] + args
+
+
+class PluginHost:
+    """主进程一侧：管理子进程，转发上下文并执行子进程请求的插件方法（只在主线程调用）"""
+
+    def __init__(self, plugins: List[str]) -> None:
+        self.plugins = list(plugins)
+        self.loaded: Set[str] = set()
+        self._executed: Set[str] = set()  # 已请求 execute 的插件，连接或重启后补发
+        self.process: Optional[subprocess.Popen] = None
+        self._listener: Optional[Listener] = None
+        self._conn: Optional[Connection] = None
+        self._pending_conn: Optional[Connection] = None
+        self._generation: Optional[int] = None  # 子进程已收到的上下文代数
+        self._unpicklable: Set[str] = set()
+        self._started_at = 0.0
+        self._restart_at = 0.0
+        self.crashes = 0
+        self.stopped = False
+
+    @property
+    def connected(self) -> bool:
+        return self._conn is not None
+
+    def start(self) -> None:
+        if self.stopped or not self.plugins:
+            return
+        authkey = os.urandom(16)
+        self._listener = Listener(('127.0.0.1', 0), authkey=authkey)
+        threading.Thread(target=self._accept, args=(self._listener,), name='plugin-host-accept',
+                         daemon=True).start()
+        from file import base_directory
+        env = dict(os.environ, **{AUTHKEY_ENV: authkey.hex()})
+        self.process = subprocess.Popen(host_command(self._listener.address), cwd=str(base_directory), env=env)
+        self._started_at = time.monotonic()
+        logger.info(f"插件宿主进程已启动 (pid {self.process.pid})：{', '.join(self.plugins)}")
+
+    def _accept(self, listener: Listener) -> None:
+        try:
+            self._pending_conn = listener.accept()
+        except Exception as e:
+            if not self.stopped:
+                logger.error(f"插件宿主进程连接失败: {e}")
+
+    def _on_connected(self) -> None:
+        self._conn, self._pending_conn = self._pending_conn, None
+        self._generation = None
+        self.loaded.clear()
+        for name in self.plugins:
+            self._send(('load', name))
+        for name in self.plugins:
+            if name in self._executed:
+                self._send(('execute', name))
+
+    def _send(self, message: tuple) -> bool:
+        if self._conn is None:
+            return False
+        try:
+            self._conn.send(message)
+            return True
+        except (OSError, EOFError, ValueError) as e:
+            self._handle_crash(f'发送失败: {e}')
+            return False
+
+    def _snapshot(self, contexts: Any) -> Dict[str, Any]:
+        """自上次发送以来变化的、可序列化的上下文"""
+        changed = contexts.changed_since(self._generation)
+        delta = {}
+        for key in changed:
+            if key in LOCAL_ONLY_KEYS or key in self._unpicklable:
+                continue
+            value = contexts[key]
+            try:
+                pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            except Exception:
+                self._unpicklable.add(key)
+                logger.debug(f"上下文 {key} 无法序列化，不发送到插件宿主进程")
+                continue
+            delta[key] = value
+        return delta
+
+    def tick(self, contexts: Any, method: Any, runtime: Any) -> None:
+        """每轮插件更新时调用：检查子进程状态、发送上下文变化并处理子进程的消息"""
+        if self.stopped:
+            return
+        now = time.monotonic()
+        if self.process is None:
+            if self._restart_at and now >= self._restart_at:
+                self._restart_at = 0.0
+                self.start()
+            return
+        if self.process.poll() is not None:
+            self._handle_crash(f'进程已退出 (code {self.process.returncode})')
+            return
+        if self._conn is None:
+            if self._pending_conn is not None:
+                self._on_connected()
+            elif now - self._started_at > CONNECT_TIMEOUT:
+                self._handle_crash('连接超时')
+                return
+            else:
+                return
+        if self.crashes and now - self._started_at > STABLE_AFTER:
+            self.crashes = 0
+
+        if self._send(('tick', contexts.generation, self._snapshot(contexts))):
+            self._generation = contexts.generation
+        self._drain(method, runtime)
+
+    def _drain(self, method: Any, runtime: Any) -> None:
+        while self._conn is not None:
+            try:
+                if not self._conn.poll():
+                    return
+                message = self._conn.recv()
+            except (OSError, EOFError) as e:
+                self._handle_crash(f'接收失败: {e}')
+                return
+            self._dispatch(message, method, runtime)
+
+    def _dispatch(self, message: tuple, method: Any, runtime: Any) -> None:
+        kind, name = message[0], message[1]
+        if kind == 'call':
+            method_name, args, kwargs = message[2:5]
+            if method_name not in REMOTE_CALLS:
+                logger.warning(f"插件 {name} 请求了不支持的方法: {method_name}")
+                return
+            try:
+                getattr(method, method_name)(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"执行插件 {name} 的 {method_name} 失败: {e}")
+        elif kind == 'config':
+            from file import config_center
+            config_center.write_conf(message[1], message[2], message[3])
+        elif kind == 'timing':
+            runtime.record_timing(name, message[2], message[3])
+        elif kind == 'loaded':
+            self.loaded.add(name)
+            logger.success(f"加载插件成功（独立进程）：{name}")
+        elif kind == 'load_failed':
+            logger.warning(f"插件 {name} 在独立进程中加载失败: {message[2]}")
+        elif kind == 'error':
+            runtime.record_error(name)
+            logger.error(f"插件 {name} 运行出错（独立进程）: {message[2]}")
+
+    def execute(self, name: str) -> None:
+        self._executed.add(name)
+        self._send(('execute', name))
+
+    def _close(self) -> None:
+        for closable in (self._conn, self._pending_conn, self._listener):
+            if closable is not None:
+                try:
+                    closable.close()
+                except OSError:
+                    pass
+        self._conn = self._pending_conn = self._listener = None
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+        self.process = None
+
+    def _handle_crash(self, reason: str) -> None:
+        self._close()
+        if self.stopped:
+            return
+        self.crashes += 1
+        if self.crashes > MAX_RESTARTS:
+            self.stopped = True
+            logger.error(f"插件宿主进程连续崩溃 {self.crashes - 1} 次（{reason}），不再重启")
+            return
+        delay = min(RESTART_MAX, RESTART_BASE * 2 ** (self.crashes - 1))
+        self._restart_at = time.monotonic() + delay
+        logger.warning(f"插件宿主进程异常：{reason}，{delay:.0f} 秒后重启")
+
+    def stop(self) -> None:
+        self.stopped = True
+        if self._conn is not None:
+            try:
+                self._conn.send(('stop',))
+            except (OSError, EOFError, ValueError):
+                pass
+        if self.process is not None:
+            try:
+                self.process.wait(2)
+            except subprocess.TimeoutExpired:
+                pass
+        self._close()
+
+
+class RemoteMethod:
+    """子进程中的 PluginMethod，界面相关的调用转发到主进程执行"""
+
+    def __init__(self, send: Callable[[tuple], None], plugin_name: str) -> None:
+        self._send = send
+        self._plugin_name = plugin_name
+
+    def _forward(self, method_name: str, *args: Any, **kwargs: Any) -> None:
+        self._send(('call', self._plugin_name, method_name, args, kwargs))
+
+    def register_widget(self, widget_code: str, widget_name: str, widget_width: int) -> None:
+        self._forward('register_widget', widget_code, widget_name, widget_width)
+
+    def adjust_widget_width(self, widget_code: str, width: int) -> None:
+        self._forward('adjust_widget_width', widget_code, width)
+
+    def change_widget_content(self, widget_code: str, title: str, content: str) -> None:
+        self._forward('change_widget_content', widget_code, title, content)
+
+    def send_notification(self, *args: Any, **kwargs: Any) -> None:
+        self._forward('send_notification', *args, **kwargs)
+
+    def subprocess_exec(self, title: str, action: str) -> None:
+        self._forward('subprocess_exec', title, action)
+
+    def play_audio(self, file_path: str, tts_delete_after: bool = True) -> None:
+        self._forward('play_audio', file_path, tts_delete_after)
+
+    @staticmethod
+    def get_widget(widget_code: str) -> None:
+        """子进程中无法获取组件实例"""
+        return None
+
+    @staticmethod
+    def is_get_notification() -> bool:
+        """子进程中无法获取通知状态"""
+        return False
+
+    @staticmethod
+    def subscribe_transition(callback: Any) -> None:
+        logger.warning('独立进程中的插件不支持订阅上下课切换事件')
+
+    @staticmethod
+    def read_config(path: str, section: str, option: str) -> Optional[Any]:
+        import json
+        try:
+            with open(path, 'r', encoding='utf-8') as r:
+                config = json.load(r)
+            return config.get(section, option)
+        except Exception as e:
+            logger.error(f"插件读取配置文件失败：{e}")
+
+    @staticmethod
+    def generate_speech(text: str, engine: str = "edge", voice: Optional[str] = None,
+                        timeout: float = 10.0, auto_fallback: bool = True) -> str:
+        from generate_speech import generate_speech_sync
+        return generate_speech_sync(text=text, engine=engine, voice_id=voice,
+                                    auto_fallback=auto_fallback, timeout=timeout)
+
+
+class _HostRuntime:
+    """子进程一侧：加载插件并按主进程的消息调用"""
+
+    def __init__(self, conn: Connection) -> None:
+        import conf
+        from file import base_directory, config_center, schedule_center
+        self.conn = conn
+        self.conf = conf
+        self._send_lock = threading.Lock()  # 插件可能在自己的线程中调用 RemoteMethod
+        self.config_center = config_center
+        config_center.forward_writes(lambda section, key, value: self.send(('config', section, key, value)))
+        self._config_mtime = self._config_stamp()
+        self.plugins: Dict[str, Any] = {}
+        self._accepts_changes: Dict[str, bool] = {}  # 插件 update 是否接收变化的键
+        self.contexts: Dict[str, Any] = {
+            'Config_Center': config_center,  # 子进程自己的只读实例，修改由主进程写入
+            'Schedule_Center': schedule_center,
+            'Widgets_Mgr': None,
+            'Base_Directory': base_directory,
+        }
+
+    def send(self, message: tuple) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def _config_stamp(self) -> float:
+        try:
+            return os.path.getmtime(self.config_center.user_config_path)
+        except OSError:
+            return 0.0
+
+    def reload_config(self) -> None:
+        """主进程写入 config.ini 后重新读取"""
+        stamp = self._config_stamp()
+        if stamp != self._config_mtime:
+            self._config_mtime = stamp
+            self.config_center.update_conf()
+
+    def load(self, name: str) -> None:
+        try:
+            module = importlib.import_module(f'{self.conf.PLUGINS_DIR.name}.{name}')
+            contexts = dict(self.contexts)
+            contexts['PLUGIN_PATH'] = os.path.normpath(os.path.join(self.conf.PLUGINS_DIR, name))
+            self.plugins[name] = module.Plugin(contexts, RemoteMethod(self.send, name))
+            self.send(('loaded', name))
+        except Exception as e:
+            self.send(('load_failed', name, repr(e)))
+
+    def _update_accepts_changes(self, name: str, plugin: Any) -> bool:
+        """与主进程相同的判断：update(cw_contexts, changed_keys) 形式的插件额外收到变化的键"""
+        accepts = self._accepts_changes.get(name)
+        if accepts is None:
+            from plugin import PluginLoader
+            update = getattr(plugin, 'update', None)
+            accepts = self._accepts_changes[name] = update is not None and PluginLoader._update_accepts_changes(update)
+        return accepts
+
+    def call(self, name: str, plugin: Any, method_name: str, *args: Any) -> None:
+        method = getattr(plugin, method_name, None)
+        if method is None:
+            return
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            method(*args)
+        except Exception as e:
+            self.send(('error', name, repr(e)))
+        if method_name == 'update':
+            self.send(('timing', name, time.perf_counter() - start, time.thread_time() - cpu_start))
+
+    def serve(self) -> None:
+        try:
+            from PyQt5.QtCore import QCoreApplication
+            app = QCoreApplication.instance() or QCoreApplication([])  # 部分插件依赖 Qt 事件循环
+        except ImportError:
+            app = None
+        while True:
+            if not self.conn.poll(0.05):
+                if app is not None:
+                    app.processEvents()
+                continue
+            changed: Optional[Set[str]] = None
+            while self.conn.poll():  # 合并积压的更新，只调用一次 update
+                message = self.conn.recv()
+                kind = message[0]
+                if kind == 'stop':
+                    return
+                if kind == 'tick':
+                    self.contexts.update(message[2])
+                    changed = (changed or set()) | set(message[2])
+                elif kind == 'load':
+                    self.load(message[1])
+                elif kind == 'execute' and message[1] in self.plugins:
+                    self.call(message[1], self.plugins[message[1]], 'execute')
+            if changed is not None:
+                self.reload_config()
+                for name, plugin in self.plugins.items():
+                    if self._update_accepts_changes(name, plugin):
+                        self.call(name, plugin, 'update', self.contexts, frozenset(changed))
+                    else:
+                        self.call(name, plugin, 'update', self.contexts)
+            if app is not None:
+                app.processEvents()
+
+
+def run_host(argv: List[str]) -> int:
+    """子进程入口：argv 为 [地址, 端口]，authkey 从环境变量读取"""
+    host, port = argv[0], int(argv[1])
+    authkey = bytes.fromhex(os.environ.pop(AUTHKEY_ENV, ''))  # 不留给插件启动的子进程
+    conn = Client((host, port), authkey=authkey)
+    try:
+        _HostRuntime(conn).serve()
+    except (EOFError, OSError):  # 主进程已退出
+        pass
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == HOST_FLAG:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        sys.exit(run_host(sys.argv[2:]))
@@ -54,9 +54,12 @@ class ThreadManager:
                     if hasattr(thread, 'stop'):
                         thread.stop()
                     if not thread.wait(1000):
-                        # self.logger.warning(f"线程 {thread.__class__.__name__} 未能在1秒内停止，强制终止")
-                        thread.terminate()
-                        thread.wait(500)
+                        if getattr(thread, 'terminable', True):
+                            # self.logger.warning(f"线程 {thread.__class__.__name__} 未能在1秒内停止，强制终止")
+                            thread.terminate()
+                            thread.wait(500)
+                        else:  # 正在替换插件目录，等待完成
+                            thread.wait()
                     # self.logger.debug(f"线程已停止: {thread.__class__.__name__}")
                 thread.deleteLater()
             except Exception as e:
@@ -114,11 +117,13 @@ class TagLink(HyperlinkButton):  # 标签链接
 
 
 class downloadProgressBar(InfoBar):  # 下载进度条(创建下载进程)
-    def __init__(self, url: str = TEST_DOWNLOAD_LINK, branch: str = 'main', name: str = "Test", parent: Optional[Any] = None) -> None:
+    def __init__(self, url: str = TEST_DOWNLOAD_LINK, branch: str = 'main', name: str = "Test", parent: Optional[Any] = None,
+                 sha256: Optional[str] = None) -> None:
         global download_progress
         self.p_name = url.split('/')[4]  # repo
         # user = url.split('/')[3]
         self.name = name
+        self.sha256 = sha256
         self.url = f'{url}/archive/refs/heads/{branch}.zip'
 
         super().__init__(icon=fIcon.DOWNLOAD,
@@ -145,7 +150,7 @@ class downloadProgressBar(InfoBar):  # 下载进度条(创建下载进程)
         self.download(self.url)
 
     def download(self, url: str) -> None:  # 接受下载连接并开始任务
-        self.download_thread = nt.DownloadAndExtract(url, self.p_name)
+        self.download_thread = nt.DownloadAndExtract(url, self.p_name, self.sha256)
         # self.download_thread = nt.DownloadAndExtract(TEST_DOWNLOAD_LINK, self.p_name)
         self.download_thread.progress_signal.connect(lambda progress: self.bar.setValue(int(progress)))  # 下载进度
         self.download_thread.status_signal.connect(self.detect_status)  # 判断状态
@@ -157,8 +162,8 @@ class downloadProgressBar(InfoBar):  # 下载进度条(创建下载进程)
     def cancelDownload(self) -> None:
         global download_progress
         download_progress.remove(self.p_name)
+        self.download_thread.finished.connect(self.download_thread.deleteLater)  # 线程结束后再释放
         self.download_thread.stop()
-        self.download_thread.deleteLater()
         self.close()
 
     def detect_status(self, status: str) -> None:
@@ -237,7 +242,8 @@ def install_plugin(parent: Any, p_name: str, data: Dict[str, Any]) -> bool:
             url=f"{url}",
             branch=branch,
             name=title,
-            parent=parent
+            parent=parent,
+            sha256=data.get("sha256")  # 插件广场提供时校验下载的文件
         )
         di.show()
         return True
@@ -0,0 +1,139 @@
+"""
+插件运行统计
+记录每个插件 update/execute 的耗时与 CPU 时间，按插件声明的 update_interval 降低调用频率；
+单次更新超出耗时上限时暂缓调用（指数退避），连续超限达到次数后由加载器临时禁用。
+"""
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from file import config_center
+
+DEFAULT_BUDGET = 50  # 单次 update 耗时上限(ms)，0 为不限制
+DEFAULT_STRIKES = 5  # 连续超限多少次后禁用
+THROTTLE_BASE = 1.0  # 首次超限后暂缓的时长(s)
+THROTTLE_MAX = 60.0  # 暂缓时长上限(s)
+
+RUNNING = 'running'
+THROTTLED = 'throttled'
+DISABLED = 'disabled'
+
+
+@dataclass
+class PluginProfile:
+    """单个插件的运行统计"""
+    name: str
+    calls: int = 0
+    skipped: int = 0  # 因更新间隔或暂缓而跳过的次数
+    errors: int = 0
+    total_time: float = 0.0
+    cpu_time: float = 0.0
+    max_time: float = 0.0
+    last_time: float = 0.0
+    execute_time: float = 0.0  # execute() 耗时
+    over_budget: int = 0
+    strikes: int = 0  # 连续超限次数
+    next_run: float = 0.0  # time.monotonic()
+    state: str = RUNNING
+    started: float = field(default_factory=time.monotonic)
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'avg_ms': self.total_time / self.calls * 1000 if self.calls else 0.0,
+            'max_ms': self.max_time * 1000,
+            'last_ms': self.last_time * 1000,
+            'execute_ms': self.execute_time * 1000,
+            'cpu_percent': self.cpu_time / elapsed * 100,
+            'over_budget': self.over_budget,
+            'state': self.state,
+        }
+
+
+def plugin_interval(plugin: Any) -> float:
+    """插件声明的更新间隔(s)，未声明时每次都更新"""
+    try:
+        return max(0.0, float(getattr(plugin, 'update_interval', 0) or 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class PluginRuntime:
+    """插件耗时统计与限流（只在主线程使用）"""
+
+    def __init__(self) -> None:
+        self.profiles: Dict[str, PluginProfile] = {}
+
+    @property
+    def budget(self) -> float:
+        """单次 update 耗时上限(s)"""
+        return config_center.snapshot.get_int('Plugin', 'update_budget', DEFAULT_BUDGET) / 1000
+
+    @property
+    def max_strikes(self) -> int:
+        return max(1, config_center.snapshot.get_int('Plugin', 'budget_strikes', DEFAULT_STRIKES))
+
+    def profile(self, name: str) -> PluginProfile:
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = PluginProfile(name)
+        return profile
+
+    def should_run(self, name: str, now: float) -> bool:
+        profile = self.profile(name)
+        if profile.state == DISABLED:
+            return False
+        if now < profile.next_run:
+            profile.skipped += 1
+            return False
+        return True
+
+    def record(self, name: str, elapsed: float, cpu: float, interval: float, now: float) -> bool:
+        """记录一次 update，返回是否应禁用该插件"""
+        profile = self.record_timing(name, elapsed, cpu)
+        profile.next_run = now + interval if interval else 0.0
+
+        budget = self.budget
+        if budget <= 0 or elapsed <= budget:
+            profile.strikes = 0
+            profile.state = RUNNING
+            return False
+        profile.over_budget += 1
+        profile.strikes += 1
+        if profile.strikes >= self.max_strikes:
+            profile.state = DISABLED
+            return True
+        profile.state = THROTTLED
+        delay = min(THROTTLE_MAX, THROTTLE_BASE * 2 ** (profile.strikes - 1))
+        profile.next_run = max(profile.next_run, now + delay)
+        return False
+
+    def record_timing(self, name: str, elapsed: float, cpu: float) -> PluginProfile:
+        """只记录耗时（独立进程中的插件不占用主线程，不受耗时上限限制）"""
+        profile = self.profile(name)
+        profile.calls += 1
+        profile.total_time += elapsed
+        profile.cpu_time += cpu
+        profile.last_time = elapsed
+        profile.max_time = max(profile.max_time, elapsed)
+        return profile
+
+    def record_execute(self, name: str, elapsed: float, cpu: float) -> None:
+        profile = self.profile(name)
+        profile.execute_time = elapsed
+        profile.cpu_time += cpu
+
+    def record_error(self, name: str) -> None:
+        self.profile(name).errors += 1
+
+    def forget(self, name: str) -> None:
+        self.profiles.pop(name, None)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """按累计耗时从高到低排列的统计"""
+        profiles = sorted(self.profiles.values(), key=lambda p: p.total_time + p.execute_time, reverse=True)
+        return [profile.as_dict() for profile in profiles]
@@ -0,0 +1,171 @@
+"""
+启动优化
+延迟导入的模块代理、空闲时执行的后台任务，以及 --profile-startup 下按模块统计导入耗时。
+本模块只依赖标准库，需在其他模块之前导入。
+"""
+import builtins
+import importlib
+import importlib.util
+import os
+import sys
+import threading
+import time
+from collections import deque
+from types import ModuleType
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+PROFILE_FLAG = '--profile-startup'
+
+
+class LazyModule:
+    """模块代理，首次访问属性时才真正导入"""
+
+    def __init__(self, name: str) -> None:
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_module', None)
+
+    def _load(self) -> ModuleType:
+        module = self._module
+        if module is None:
+            module = importlib.import_module(self._name)
+            object.__setattr__(self, '_module', module)
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None or self._name in sys.modules
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._load(), item)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        setattr(self._load(), key, value)
+
+    def __repr__(self) -> str:
+        return f'<LazyModule {self._name} {"loaded" if self.loaded else "pending"}>'
+
+
+class ImportProfiler:
+    """
+    导入耗时统计（与 python -X importtime 类似）
+    记录每个模块首次导入的总耗时与自身耗时（扣除其间导入的子模块）
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = time.perf_counter()
+        self.records: Dict[str, Tuple[float, float]] = {}  # 模块名 -> (总耗时, 自身耗时)
+        self.marks: List[Tuple[str, float]] = []
+        self._original_import: Optional[Callable[..., Any]] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        if self.enabled:
+            return
+        self.enabled = True
+        self.started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def disable(self) -> None:
+        if self.enabled and self._original_import is not None:
+            builtins.__import__ = self._original_import
+        self.enabled = False
+
+    def _import(self, name: str, globals: Optional[Dict[str, Any]] = None, locals: Optional[Dict[str, Any]] = None,
+                fromlist: Any = (), level: int = 0) -> Any:
+        original = self._original_import
+        full_name = name
+        if level:
+            try:
+                full_name = importlib.util.resolve_name('.' * level + name, (globals or {}).get('__package__'))
+            except (ImportError, ValueError):
+                return original(name, globals, locals, fromlist, level)
+        if full_name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)  # 子模块耗时累计
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += total
+            with self._lock:
+                self.records.setdefault(full_name, (total, max(0.0, total - children)))
+
+    def mark(self, label: str) -> float:
+        """记录启动阶段的时间点（距启动的秒数）"""
+        elapsed = time.perf_counter() - self.started
+        self.marks.append((label, elapsed))
+        return elapsed
+
+    def report(self, top: int = 40) -> str:
+        with self._lock:
+            records = sorted(self.records.items(), key=lambda r: r[1][1], reverse=True)
+        lines = [f'{"self(ms)":>10} {"total(ms)":>10}  module']
+        for name, (total, self_time) in records[:top]:
+            lines.append(f'{self_time * 1000:10.1f} {total * 1000:10.1f}  {name}')
+        lines.append(f'共导入 {len(records)} 个模块，自身耗时合计 '
+                     f'{sum(r[1][1] for r in records) * 1000:.1f} ms')
+        for label, elapsed in self.marks:
+            lines.append(f'[{elapsed * 1000:10.1f} ms] {label}')
+        return '\n'.join(lines)
+
+    def dump(self, directory: str) -> str:
+        """将完整统计写入 directory，返回文件路径"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'startup_profile_{time.strftime("%Y-%m-%d_%H-%M-%S")}.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report(top=len(self.records)))
+        return path
+
+
+class IdleTasks:
+    """在事件循环空闲时依次执行的启动后任务，每次只执行一个以免阻塞界面"""
+
+    def __init__(self, interval: int = 200) -> None:
+        self.interval = interval  # 两个任务之间的间隔(ms)
+        self._tasks: Deque[Tuple[str, Callable[[], Any]]] = deque()
+        self._running = False
+
+    def add(self, name: str, task: Callable[[], Any]) -> None:
+        self._tasks.append((name, task))
+
+    def start(self, delay: int = 0) -> None:
+        if self._running:
+            return
+        self._running = True
+        from PyQt5.QtCore import QTimer
+        QTimer.singleShot(delay, self._run_next)
+
+    def _run_next(self) -> None:
+        from PyQt5.QtCore import QTimer
+        from loguru import logger
+
+        if not self._tasks:
+            self._running = False
+            return
+        name, task = self._tasks.popleft()
+        start = time.perf_counter()
+        try:
+            task()
+            logger.debug(f'空闲任务 {name} 完成，用时 {(time.perf_counter() - start) * 1000:.1f} ms')
+        except Exception as e:
+            logger.error(f'空闲任务 {name} 执行失败：{e}')
+        QTimer.singleShot(self.interval, self._run_next)
+
+
+def preload(name: str) -> Callable[[], Any]:
+    """预加载模块的空闲任务"""
+    return lambda: importlib.import_module(name)
+
+
+import_profiler = ImportProfiler()
+idle_tasks = IdleTasks()
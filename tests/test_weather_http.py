@@ -0,0 +1,112 @@
+"""
+WeatherHttpClient 条件请求与缓存测试
+使用本地 http.server 作为天气接口，运行：python -m unittest discover tests
+"""
+import json
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import requests  # noqa: E402
+
+from weather_http import WeatherHttpClient  # noqa: E402
+
+PAYLOAD = {'now': {'temp': '20'}}
+ETAG = '"v1"'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """按路径返回不同缓存头的天气接口"""
+    hits = {}
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split('?', 1)[0]
+        self.hits[path] = self.hits.get(path, 0) + 1
+        if path == '/always-304':
+            self._reply(304)
+        elif path == '/etag' and self.headers.get('If-None-Match') == ETAG:
+            self._reply(304, {'ETag': ETAG, 'Cache-Control': 'no-cache'})
+        elif path == '/etag':
+            self._reply(200, {'ETag': ETAG, 'Cache-Control': 'no-cache'}, PAYLOAD)
+        elif path == '/fresh':
+            self._reply(200, {'Cache-Control': 'max-age=60'}, PAYLOAD)
+        elif path == '/short':
+            self._reply(200, {'Cache-Control': 'max-age=1'}, PAYLOAD)
+        else:
+            self._reply(404)
+
+    def _reply(self, status: int, headers: dict = None, payload: dict = None) -> None:
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        pass
+
+
+class WeatherHttpClientTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        _StubHandler.hits = {}
+        self.client = WeatherHttpClient(timeout=(2.0, 2.0))
+
+    def tearDown(self) -> None:
+        self.client.close()
+
+    def test_fresh_hit_skips_request(self) -> None:
+        url = f'{self.base_url}/fresh'
+        self.assertEqual(self.client.get_json(url, endpoint='fresh'), PAYLOAD)
+        self.assertEqual(self.client.get_json(url, endpoint='fresh'), PAYLOAD)
+        self.assertEqual(_StubHandler.hits['/fresh'], 1)
+        stats = self.client.stats()['fresh']
+        self.assertEqual((stats['requests'], stats['fresh_hits']), (1, 1))
+
+    def test_etag_revalidates_with_304(self) -> None:
+        url = f'{self.base_url}/etag'
+        first = self.client.get_json(url, endpoint='etag')
+        first['now']['temp'] = 'changed'  # 返回值为副本，修改不影响缓存
+        self.assertEqual(self.client.get_json(url, endpoint='etag'), PAYLOAD)
+        self.assertEqual(_StubHandler.hits['/etag'], 2)
+        self.assertEqual(self.client.stats()['etag']['not_modified'], 1)
+
+    def test_max_age_expiry_refetches(self) -> None:
+        url = f'{self.base_url}/short'
+        self.client.get_json(url)
+        self.client.get_json(url)
+        self.assertEqual(_StubHandler.hits['/short'], 1)
+        time.sleep(1.1)
+        self.assertEqual(self.client.get_json(url), PAYLOAD)
+        self.assertEqual(_StubHandler.hits['/short'], 2)
+
+    def test_304_without_cache_raises(self) -> None:
+        with self.assertRaises(requests.HTTPError):
+            self.client.get_json(f'{self.base_url}/always-304', endpoint='broken')
+        self.assertEqual(_StubHandler.hits['/always-304'], 1)
+        self.assertEqual(self.client.stats()['broken']['errors'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+"""
+主题注册表
+一次性索引所有主题目录，缓存解析后的 ThemeInfo，仅在目录或 theme.json 的修改时间变化时重新加载。
+"""
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from loguru import logger
+
+from basic_dirs import CW_HOME, THEME_DIRS
+from data_model import ThemeConfig, ThemeInfo
+
+ThemeWatcher = Callable[[Set[str]], None]  # 参数为发生变化的主题文件夹名
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ThemeRegistry:
+    """主题注册表"""
+
+    def __init__(self, theme_dirs: List[Path], default_dir: Path, check_interval: float = 2.0) -> None:
+        self.theme_dirs = list(theme_dirs)
+        self.default_dir = default_dir
+        self.check_interval = check_interval  # 两次检查文件修改时间的最小间隔(s)
+        self._lock = threading.RLock()
+        self._dir_stamps: Dict[Path, Optional[Tuple[int, int]]] = {}
+        self._index: Dict[str, Path] = {}  # 主题文件夹名 -> theme.json（THEME_DIRS 中靠前的优先）
+        self._configs: Dict[Path, Tuple[Optional[Tuple[int, int]], Optional[ThemeInfo]]] = {}
+        self._last_check = 0.0
+        self._watchers: List[ThemeWatcher] = []
+
+    def _scan(self) -> None:
+        """(需持有锁) 重新索引主题目录"""
+        index: Dict[str, Path] = {}
+        for root_dir in reversed(self.theme_dirs):
+            self._dir_stamps[root_dir] = _stat_key(root_dir)
+            if not root_dir.is_dir():
+                continue
+            for folder in root_dir.iterdir():
+                config_path = folder / 'theme.json'
+                if config_path.is_file():
+                    if folder.name in index:
+                        logger.warning(f'主题 {folder.name} - {index[folder.name].parent} 已存在，{folder} 将覆盖原有配置')
+                    index[folder.name] = config_path
+        self._index = index
+
+    def _load(self, config_path: Path) -> Optional[ThemeInfo]:
+        """(需持有锁) 读取 theme.json，文件未变化时直接返回缓存"""
+        stamp = _stat_key(config_path)
+        cached = self._configs.get(config_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        info = None
+        try:
+            with config_path.open('r', encoding='utf-8') as f:
+                info = ThemeInfo(path=config_path.parent, config=ThemeConfig.model_validate_json(f.read()))
+        except Exception as e:
+            logger.error(f'验证主题配置文件发生错误：{config_path} {e}')
+        self._configs[config_path] = (stamp, info)
+        return info
+
+    def refresh(self, force: bool = False) -> Set[str]:
+        """检查目录与 theme.json 的修改时间，返回发生变化的主题"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._index and now - self._last_check < self.check_interval:
+                return set()
+            self._last_check = now
+
+            old_index = self._index
+            if force or not old_index or any(_stat_key(d) != s for d, s in self._dir_stamps.items()):
+                self._scan()
+            changed = set(old_index) ^ set(self._index) if old_index else set()
+            for name, config_path in self._index.items():
+                cached = self._configs.get(config_path)
+                if cached is not None and cached[0] != _stat_key(config_path):
+                    changed.add(name)
+                    self._load(config_path)
+            watchers = list(self._watchers)
+
+        if changed:
+            logger.info(f'主题已变化：{", ".join(sorted(changed))}')
+            for watcher in watchers:
+                try:
+                    watcher(changed)
+                except Exception as e:
+                    logger.error(f'主题变化回调执行失败：{e}')
+        return changed
+
+    def get(self, theme: str) -> ThemeInfo:
+        """获取主题，不存在或无效时返回默认主题"""
+        self.refresh()
+        with self._lock:
+            config_path = self._index.get(theme)
+            info = self._load(config_path) if config_path is not None else None
+            if info is None:
+                if config_path is not None:
+                    logger.error(f"加载主题数据时出错: {theme}，返回默认主题")
+                info = self._load(self.default_dir / 'theme.json')
+            if info is None:
+                raise FileNotFoundError(f'默认主题不可用: {self.default_dir}')
+            return info
+
+    def themes(self) -> Dict[str, ThemeInfo]:
+        """全部有效主题（文件夹名 -> ThemeInfo）"""
+        self.refresh()
+        with self._lock:
+            result: Dict[str, ThemeInfo] = {}
+            for name, config_path in self._index.items():
+                info = self._load(config_path)
+                if info is not None:
+                    result[name] = info
+            return result
+
+    def watch(self, callback: ThemeWatcher) -> None:
+        """主题新增/删除/修改时回调，需定期调用 refresh (如 poll)"""
+        with self._lock:
+            self._watchers.append(callback)
+
+    def unwatch(self, callback: ThemeWatcher) -> None:
+        with self._lock:
+            self._watchers = [w for w in self._watchers if w != callback]
+
+    def poll(self) -> None:
+        """供定时器调用的检查入口"""
+        self.refresh()
+
+
+theme_registry = ThemeRegistry(THEME_DIRS, CW_HOME / 'ui' / 'default')
@@ -0,0 +1,184 @@
+"""
+当日时间线
+将课程表的节点与时间线预编译为有序区间，当前活动、倒计时与下节课均通过二分查找得到，
+仅在课程表内容或日期变化时重新编译。
+"""
+import datetime as dt
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class TimelineSlot:
+    """时间线中的单个活动（课程或课间）"""
+    key: str  # 时间线键名，如 a01 / f01
+    part: int  # 所属节点序号
+    start: int  # 开始时间（距零点秒数）
+    end: int  # 结束时间（距零点秒数）
+
+    @property
+    def is_class(self) -> bool:
+        return self.key.startswith('a')
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+
+@dataclass(frozen=True)
+class TimelinePart:
+    """节点（上午/下午/休息段等）"""
+    part: int
+    part_type: str  # part / break
+    start: int
+    end: int
+    slots: Tuple[TimelineSlot, ...]
+
+    @property
+    def is_break(self) -> bool:
+        return self.part_type == 'break'
+
+
+def seconds_of_day(moment: dt.datetime) -> float:
+    """距当日零点的秒数"""
+    return moment.hour * 3600 + moment.minute * 60 + moment.second + moment.microsecond / 1_000_000
+
+
+def at_seconds(moment: dt.datetime, seconds: float) -> dt.datetime:
+    """将距零点秒数还原到 moment 所在日期"""
+    seconds = int(seconds)
+    return moment.replace(hour=seconds // 3600 % 24, minute=seconds // 60 % 60, second=seconds % 60, microsecond=0)
+
+
+def sort_timeline_key(item: Tuple[str, Any]) -> Any:
+    item_name = item[0]
+    prefix = item_name[0]
+    if len(item_name) > 1:
+        try:
+            # 提取节点序数
+            part_num = int(item_name[1])
+            # 提取课程序数
+            class_num = 0
+            if len(item_name) > 2:
+                class_num = int(item_name[2:])
+            if prefix == 'a':
+                return part_num, class_num, 0
+            else:
+                return part_num, class_num, 1
+        except ValueError:
+            # 如果转换失败，返回原始字符串
+            return item_name
+    return item_name
+
+
+class DayTimeline:
+    """
+    预编译的当日时间线
+    所有时间均以距零点秒数表示，查询复杂度为 O(log n)
+    """
+    def __init__(self, parts: List[TimelinePart], signature: Any = None) -> None:
+        self.signature = signature
+        self.parts: Tuple[TimelinePart, ...] = tuple(sorted(parts, key=lambda p: p.start))
+        self.slots: Tuple[TimelineSlot, ...] = tuple(
+            sorted((slot for p in self.parts for slot in p.slots), key=lambda s: s.start)
+        )
+        self._by_part: Dict[int, TimelinePart] = {p.part: p for p in self.parts}
+        self._slot_starts: List[int] = [s.start for s in self.slots]
+
+        # 有活动的节点，以及其结束时间的前缀最大值（用于二分定位当前节点）
+        self._active_parts: List[TimelinePart] = [p for p in self.parts if p.slots]
+        self._active_end_max: List[int] = []
+        running = -1
+        for p in self._active_parts:
+            running = max(running, p.end)
+            self._active_end_max.append(running)
+
+        self._starting: Dict[int, List[TimelineSlot]] = {}
+        self._ending: Dict[int, List[TimelineSlot]] = {}
+        for slot in self.slots:
+            self._starting.setdefault(slot.start, []).append(slot)
+            self._ending.setdefault(slot.end, []).append(slot)
+        self._boundaries: List[int] = sorted(set(self._starting) | set(self._ending))
+
+    @classmethod
+    def build(cls, part: Dict[str, Any], timeline: Dict[str, Any], signature: Any = None) -> 'DayTimeline':
+        """由课程表的 part 与 timeline 编译时间线"""
+        sorted_timeline = sorted(timeline.items(), key=sort_timeline_key)
+        parts = []
+        for item_name, item_value in part.items():
+            try:
+                part_num = int(item_name)
+                h, m = item_value[:2]
+                part_type = item_value[2] if len(item_value) > 2 else 'part'
+            except Exception as e:
+                logger.error(f'编译时间线[节点]出错：{e}')
+                continue
+
+            start = int(h) * 3600 + int(m) * 60
+            cursor = start
+            slots = []
+            for key, minutes in sorted_timeline:
+                if len(key) < 2 or key[0] not in ('a', 'f') or key[1:2] != str(part_num):
+                    continue
+                try:
+                    length = int(minutes) * 60
+                except (TypeError, ValueError) as e:
+                    logger.error(f'编译时间线[时长]出错：{key} {e}')
+                    continue
+                slots.append(TimelineSlot(key, part_num, cursor, cursor + length))
+                cursor += length
+            parts.append(TimelinePart(part_num, part_type, start, cursor, tuple(slots)))
+        return cls(parts, signature)
+
+    def get_part(self, part: int) -> Optional[TimelinePart]:
+        return self._by_part.get(part)
+
+    def part_at(self, seconds: float) -> Optional[TimelinePart]:
+        """
+        当前所在节点：第一个尚未结束的有课节点；
+        若全部结束则为最后一个节点（其有活动时），否则为 None
+        """
+        index = bisect_left(self._active_end_max, seconds)
+        if index < len(self._active_parts):
+            return self._active_parts[index]
+        if self.parts and self.parts[-1].slots:
+            return self.parts[-1]
+        return None
+
+    @staticmethod
+    def slot_in(part: TimelinePart, seconds: float, inclusive_end: bool = False) -> Optional[TimelineSlot]:
+        """节点内第一个未结束的活动"""
+        ends = [s.end for s in part.slots]
+        index = bisect_left(ends, seconds) if inclusive_end else bisect_right(ends, seconds)
+        return part.slots[index] if index < len(part.slots) else None
+
+    def slot_at(self, seconds: float) -> Optional[TimelineSlot]:
+        """当前正在进行的活动"""
+        index = bisect_right(self._slot_starts, seconds) - 1
+        if index >= 0 and self.slots[index].end > seconds:
+            return self.slots[index]
+        return None
+
+    def upcoming_classes(self, part: TimelinePart, seconds: float) -> List[TimelineSlot]:
+        """节点内尚未开始的课程"""
+        starts = [s.start for s in part.slots]
+        return [s for s in part.slots[bisect_right(starts, seconds):] if s.is_class]
+
+    def starting_at(self, seconds: int) -> List[TimelineSlot]:
+        return self._starting.get(seconds, [])
+
+    def ending_at(self, seconds: int) -> List[TimelineSlot]:
+        return self._ending.get(seconds, [])
+
+    def next_boundary(self, seconds: float) -> Optional[int]:
+        """下一个活动开始/结束的时刻"""
+        index = bisect_right(self._boundaries, seconds)
+        return self._boundaries[index] if index < len(self._boundaries) else None
+
+    def remaining(self, seconds: float) -> Optional[float]:
+        """当前活动剩余秒数"""
+        slot = self.slot_at(seconds)
+        return slot.end - seconds if slot else None
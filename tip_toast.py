@@ -3,7 +3,6 @@ import sys
 from collections import defaultdict
 from typing import Optional, List, Tuple, Dict, Any
 
-from PyQt5 import uic
 from PyQt5.QtCore import Qt, QPropertyAnimation, QRect, QEasingCurve, QTimer, QPoint, pyqtProperty, QThread
 from PyQt5.QtGui import QColor, QPainter, QBrush, QPixmap
 from PyQt5.QtWidgets import QWidget, QApplication, QLabel, QFrame, QGraphicsBlurEffect
@@ -13,8 +12,7 @@ from qfluentwidgets import setThemeColor
 import conf
 import list_
 from file import base_directory, config_center
-from play_audio import PlayAudio
-from generate_speech import get_tts_service
+from ui_cache import ui_cache
 
 
 prepare_class = config_center.read_conf('Audio', 'prepare_class')
@@ -40,9 +38,10 @@ class tip_toast(QWidget):
         self.audio_thread = None
         global tts_service
         if tts_service is None:
+            from generate_speech import get_tts_service
             tts_service = get_tts_service()
 
-        uic.loadUi(f"{base_directory}/view/widget-toast-bar.ui", self)
+        ui_cache.load(f"{base_directory}/view/widget-toast-bar.ui", self)
 
         try:
             dpr = self.screen().devicePixelRatio() if self.screen() else QApplication.primaryScreen().devicePixelRatio()
@@ -292,6 +291,7 @@ class tip_toast(QWidget):
             if self.audio_thread and self.audio_thread.isRunning():
                 self.audio_thread.quit()
                 self.audio_thread.wait()
+            from play_audio import PlayAudio
             self.audio_thread = PlayAudio(
                 file_path=str(file_path),
                 volume=1.0,
@@ -0,0 +1,163 @@
+"""
+上下课状态切换调度
+根据预编译的时间线计算下一个边界（上课、下课、预备铃、放学），
+仅为该时刻设置一个单次定时器，到点后发出带类型的切换事件。
+"""
+import datetime as dt
+import math
+from bisect import bisect_right
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from loguru import logger
+
+from timeline import DayTimeline, TimelinePart, TimelineSlot, seconds_of_day
+
+
+class TransitionType(IntEnum):
+    """切换类型（与通知 state 一致）"""
+    FINISH_CLASS = 0  # 下课
+    ATTEND_CLASS = 1  # 上课
+    AFTER_SCHOOL = 2  # 放学
+    PREPARE_CLASS = 3  # 预备铃
+
+
+@dataclass(frozen=True)
+class TransitionEvent:
+    type: TransitionType
+    at: int  # 触发时刻（距零点秒数）
+    part: TimelinePart
+    slot: TimelineSlot  # 边界所属的活动
+    next_class: Optional[TimelineSlot] = None  # 相关课程（上课/预备铃为本节课，下课为节点内下一节课）
+
+
+# 同一秒内的多个边界仅保留优先级最高的一个（数值越小越优先）
+_PRIORITY_START = 0
+_PRIORITY_PREPARE = 1
+_PRIORITY_END = 2
+
+
+def compile_transitions(timeline: DayTimeline, prepare_seconds: int = 0) -> List[TransitionEvent]:
+    """由时间线生成当日全部切换事件（按时间排序）"""
+    candidates = []
+    for part in timeline.parts:
+        slots = part.slots
+        for index, slot in enumerate(slots):
+            later_classes = [s for s in slots[index + 1:] if s.is_class]
+            if slot.is_class:
+                candidates.append((slot.start, _PRIORITY_START,
+                                   TransitionEvent(TransitionType.ATTEND_CLASS, slot.start, part, slot, slot)))
+                if prepare_seconds > 0:
+                    at = slot.start - prepare_seconds
+                    during = timeline.slot_at(at)
+                    if at >= 0 and (during is None or not during.is_class):  # 仅在课间/课前打预备铃
+                        candidates.append((at, _PRIORITY_PREPARE,
+                                           TransitionEvent(TransitionType.PREPARE_CLASS, at, part, slot, slot)))
+                if not later_classes and index == len(slots) - 1:  # 节点最后一节课结束
+                    candidates.append((slot.end, _PRIORITY_END,
+                                       TransitionEvent(_after_school_type(part), slot.end, part, slot)))
+            elif later_classes:
+                candidates.append((slot.start, _PRIORITY_START,
+                                   TransitionEvent(TransitionType.FINISH_CLASS, slot.start, part, slot,
+                                                   later_classes[0])))
+            else:
+                candidates.append((slot.start, _PRIORITY_START,
+                                   TransitionEvent(_after_school_type(part), slot.start, part, slot)))
+
+    events = {}
+    for at, priority, event in sorted(candidates, key=lambda c: (c[0], c[1])):
+        events.setdefault(at, event)
+    return [events[at] for at in sorted(events)]
+
+
+def _after_school_type(part: TimelinePart) -> TransitionType:
+    # 休息段结束视为下课
+    return TransitionType.FINISH_CLASS if part.is_break else TransitionType.AFTER_SCHOOL
+
+
+class TransitionScheduler(QObject):
+    """
+    切换事件调度器
+    只为下一个边界设置单次定时器；若定时器因挂起/界面阻塞而错过边界，
+    定时器延迟触发时在宽限时间内补发，已发出的事件不会重复。
+    """
+    transition = pyqtSignal(object)  # TransitionEvent
+
+    GRACE_SECONDS = 60  # 错过边界后仍补发的时长
+
+    def __init__(self, time_func: Callable[[], dt.datetime], parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._time_func = time_func
+        self._timeline: Optional[DayTimeline] = None
+        self._prepare_seconds = 0
+        self._events: List[TransitionEvent] = []
+        self._event_times: List[int] = []
+        self._cursor: Optional[float] = None  # 已处理到的时刻
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._timer.timeout.connect(self.poll)
+
+    def set_timeline(self, timeline: Optional[DayTimeline], prepare_seconds: int = 0) -> None:
+        """更新时间线/预备铃提前量，未变化时不做任何事"""
+        if timeline is self._timeline and prepare_seconds == self._prepare_seconds:
+            return
+        self._timeline = timeline
+        self._prepare_seconds = prepare_seconds
+        self._events = compile_transitions(timeline, prepare_seconds) if timeline else []
+        self._event_times = [event.at for event in self._events]
+        self._cursor = None  # 不补发切换前已经过去的事件
+        logger.debug(f'已生成 {len(self._events)} 个上下课切换事件')
+        self.poll()
+
+    def poll(self) -> None:
+        """发出到期事件并重新设置定时器"""
+        now = seconds_of_day(self._time_func())
+        if self._cursor is None or now < self._cursor:  # 首次/时间回拨
+            self._cursor = now
+        else:
+            start = bisect_right(self._event_times, self._cursor)
+            end = bisect_right(self._event_times, now)
+            self._cursor = now
+            for event in self._events[start:end]:
+                if now - event.at > self.GRACE_SECONDS:
+                    logger.warning(f'已错过切换事件：{event.type.name} {event.slot.key}')
+                    continue
+                try:
+                    self.transition.emit(event)
+                except Exception as e:
+                    logger.error(f'处理切换事件 {event.type.name} 失败：{e}')
+        self._arm(now)
+
+    def _arm(self, now: float) -> None:
+        upcoming = self.next_event(now)
+        if upcoming is None:
+            self._timer.stop()
+            return
+        delay = max(0, math.ceil((upcoming.at - now) * 1000))
+        self._timer.start(delay)
+
+    def next_event(self, now: Optional[float] = None) -> Optional[TransitionEvent]:
+        """下一个切换事件"""
+        if now is None:
+            now = seconds_of_day(self._time_func())
+        index = bisect_right(self._event_times, now)
+        return self._events[index] if index < len(self._events) else None
+
+    def events(self) -> List[TransitionEvent]:
+        return list(self._events)
+
+    def subscribe(self, callback: Callable[[TransitionEvent], None]) -> None:
+        self.transition.connect(callback)
+
+    def unsubscribe(self, callback: Callable[[TransitionEvent], None]) -> None:
+        try:
+            self.transition.disconnect(callback)
+        except TypeError:
+            pass
+
+    def stop(self) -> None:
+        self._timer.stop()
@@ -0,0 +1,212 @@
+"""
+有界 TTL/LRU 缓存
+稳定的哈希键、条目上限、过期淘汰、按键失效、并发未命中合并（single-flight）与命中统计。
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import update_wrapper
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+def make_key(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Hashable:
+    """由调用参数生成稳定的缓存键，不可哈希的参数使用其 repr 的摘要"""
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """进行中的计算，其他线程的相同请求等待其结果"""
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class TTLCache(Generic[T]):
+    """线程安全的 TTL/LRU 缓存"""
+
+    def __init__(self, ttl: float, max_entries: int = 128, name: str = '') -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: 'OrderedDict[Hashable, Tuple[T, float]]' = OrderedDict()  # 键 -> (值, 过期时刻)
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._generation = 0  # 清除/失效后，进行中的计算结果不再写入
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # 等待其他线程结果的次数
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[T]:
+        with self._lock:
+            return self._lookup(key)
+
+    def _lookup(self, key: Hashable) -> Optional[T]:
+        """(需持有锁)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: T, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def _store(self, key: Hashable, value: T, ttl: Optional[float] = None) -> None:
+        """(需持有锁)"""
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._purge_expired()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _purge_expired(self) -> None:
+        """(需持有锁)"""
+        now = time.monotonic()
+        for key in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+            self.expirations += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        """命中则直接返回；未命中时只有一个线程执行 compute，其余线程等待并共享结果"""
+        with self._lock:
+            if (entry := self._entries.get(key)) is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+                self.expirations += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+            generation = self._generation
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = compute()
+            with self._lock:
+                if generation == self._generation:
+                    self._store(key, flight.result)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.event.set()
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            self._generation += 1
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class _BoundCachedMethod:
+    """绑定到实例的缓存方法"""
+
+    def __init__(self, func: Callable[..., Any], instance: Any, cache: TTLCache) -> None:
+        self._func = func
+        self._instance = instance
+        self.cache = cache
+        update_wrapper(self, func)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.cache.get_or_compute(make_key(args, kwargs), lambda: self._func(self._instance, *args, **kwargs))
+
+    def invalidate(self, *args: Any, **kwargs: Any) -> bool:
+        """使指定参数的缓存失效"""
+        return self.cache.invalidate(make_key(args, kwargs))
+
+    def clear_cache(self) -> None:
+        self.cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+
+class cached_method:
+    """
+    方法缓存装饰器，每个实例有独立的缓存（键不包含 self）
+    首次访问时把绑定后的方法存入实例的 __dict__，之后的访问不再经过描述符
+    用法: @cached_method(ttl=300, max_entries=32)
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 32) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.func: Optional[Callable[..., Any]] = None
+        self.attr_name = ''
+        self._lock = threading.Lock()
+
+    def __call__(self, func: Callable[..., Any]) -> 'cached_method':
+        self.func = func
+        self.attr_name = func.__name__
+        update_wrapper(self, func)
+        return self
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attr_name = name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        with self._lock:
+            bound = instance.__dict__.get(self.attr_name)
+            if bound is None:
+                cache = TTLCache(self.ttl, self.max_entries, name=f'{type(instance).__name__}.{self.func.__name__}')
+                bound = instance.__dict__[self.attr_name] = _BoundCachedMethod(self.func, instance, cache)
+        return bound
@@ -0,0 +1,132 @@
+"""
+界面文件编译缓存
+首次使用时将 .ui 编译为 Python 界面类并保存到磁盘（以文件路径与内容哈希为键），
+之后创建组件/通知只需实例化缓存的类，无需再次解析 XML。
+"""
+import hashlib
+import importlib.util
+import io
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Type, Union
+
+from PyQt5 import uic
+from PyQt5.QtCore import PYQT_VERSION_STR, QObject
+from PyQt5.QtWidgets import QWidget
+from loguru import logger
+
+from file import base_directory
+
+UI_CACHE_DIR = base_directory / 'cache' / 'ui'
+MAX_CACHED_FILES = 512  # 磁盘中保留的编译结果数量上限
+
+
+def _stat_key(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class UiFormCache:
+    """已编译界面类的缓存"""
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+        self._forms: Dict[str, Tuple[Optional[Tuple[int, int]], str, Type[Any]]] = {}  # 路径 -> (文件状态, 哈希, 界面类)
+        self.hits = 0
+        self.compiles = 0
+
+    def _digest(self, ui_path: Path, source: bytes) -> str:
+        # 编译结果中的相对图片路径以 .ui 所在目录为基准，因此路径也参与哈希
+        sha = hashlib.sha256()
+        sha.update(f'{PYQT_VERSION_STR}\0{ui_path}\0'.encode('utf-8'))
+        sha.update(source)
+        return sha.hexdigest()[:32]
+
+    def _compile(self, ui_path: Path, py_path: Path) -> None:
+        buffer = io.StringIO()
+        uic.compileUi(str(ui_path), buffer)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(buffer.getvalue())
+            os.replace(tmp_path, py_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.compiles += 1
+        logger.debug(f'已编译界面文件 {ui_path}')
+        self._prune()
+
+    def _prune(self) -> None:
+        """删除最久未更新的编译结果"""
+        try:
+            files = sorted(self.cache_dir.glob('ui_*.py'), key=lambda p: p.stat().st_mtime)
+            for stale in files[:max(0, len(files) - MAX_CACHED_FILES)]:
+                stale.unlink()
+        except OSError as e:
+            logger.warning(f'清理界面缓存失败：{e}')
+
+    @staticmethod
+    def _import(py_path: Path, digest: str) -> Type[Any]:
+        spec = importlib.util.spec_from_file_location(f'ui_{digest}', str(py_path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        for name, value in vars(module).items():
+            if name.startswith('Ui_') and isinstance(value, type):
+                return value
+        raise ImportError(f'编译结果中没有界面类: {py_path}')
+
+    def form_class(self, ui_path: Union[str, Path]) -> Type[Any]:
+        """获取 .ui 对应的界面类，源文件未变化时直接返回缓存"""
+        ui_path = Path(ui_path).resolve()
+        key = str(ui_path)
+        stamp = _stat_key(ui_path)
+        cached = self._forms.get(key)
+        if cached is not None and stamp is not None and cached[0] == stamp:
+            self.hits += 1
+            return cached[2]
+
+        source = ui_path.read_bytes()
+        digest = self._digest(ui_path, source)
+        if cached is not None and cached[1] == digest:  # 仅修改时间变化
+            self._forms[key] = (stamp, digest, cached[2])
+            return cached[2]
+
+        py_path = self.cache_dir / f'ui_{digest}.py'
+        if not py_path.exists():
+            self._compile(ui_path, py_path)
+        try:
+            form = self._import(py_path, digest)
+        except Exception as e:  # 缓存文件损坏时重新编译
+            logger.warning(f'加载界面缓存 {py_path} 失败，重新编译：{e}')
+            self._compile(ui_path, py_path)
+            form = self._import(py_path, digest)
+        self._forms[key] = (stamp, digest, form)
+        return form
+
+    def load(self, ui_path: Union[str, Path], widget: QWidget) -> QWidget:
+        """等同于 uic.loadUi(ui_path, widget)"""
+        try:
+            form = self.form_class(ui_path)()
+        except Exception as e:
+            logger.warning(f'编译界面文件 {ui_path} 失败，直接加载：{e}')
+            return uic.loadUi(str(ui_path), widget)
+
+        form.setupUi(widget)
+        # 与 uic.loadUi 一致，子控件可作为 widget 的属性访问
+        for name, value in vars(form).items():
+            if isinstance(value, QObject):
+                setattr(widget, name, value)
+        return widget
+
+    def stats(self) -> Dict[str, int]:
+        return {'forms': len(self._forms), 'hits': self.hits, 'compiles': self.compiles}
+
+
+ui_cache = UiFormCache(UI_CACHE_DIR)
@@ -1,19 +1,23 @@
 import datetime as dt
+import heapq
 import inspect
+import itertools
+import math
 import ntplib
 import os
 import signal
 import sys
 import threading
 import time
+from collections import deque
 
 import darkdetect
 import psutil
 import pytz
 from loguru import logger
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Any, Optional, Type, Union, Tuple
-from PyQt5.QtCore import QDir, QLockFile, QObject, QTimer, pyqtSignal
+from typing import Callable, Dict, Any, List, Optional, Type, Union, Tuple
+from PyQt5.QtCore import QDir, QLockFile, QObject, QTimer, Qt, pyqtSignal
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWidgets import QApplication, QSystemTrayIcon
 
@@ -67,6 +71,7 @@ def _terminate_child_processes() -> None:
 def restart() -> None:
     """重启程序"""
     logger.debug('重启程序')
+    config_center.flush()
 
     app = QApplication.instance()
     if app:
@@ -91,6 +96,23 @@ def stop(status: int = 0) -> None:
 
     logger.debug('退出程序...')
 
+    try:
+        config_center.flush()  # 写入尚未落盘的配置
+    except Exception as e:
+        logger.warning(f"写入配置文件时出错: {e}")
+
+    if 'weather' in sys.modules:  # 未加载天气模块时无需清理
+        try:
+            sys.modules['weather'].weather_coordinator.stop()
+        except Exception as e:
+            logger.warning(f"停止天气刷新时出错: {e}")
+
+    if 'plugin' in sys.modules:
+        try:
+            sys.modules['plugin'].p_loader.shutdown()
+        except Exception as e:
+            logger.warning(f"停止插件宿主进程时出错: {e}")
+
     try:
         from generate_speech import get_tts_service
         tts_service = get_tts_service()
@@ -213,23 +235,64 @@ class TrayIcon(QSystemTrayIcon):
 class UnionUpdateTimer(QObject):
     """
     统一更新计时器
+    按截止时间（小根堆）调度回调，仅在最早的截止时间唤醒；
+    同一合并窗口内到期的回调在同一次唤醒中执行。
     """
 
+    STATS_SAMPLES = 128  # 每个回调保留的耗时样本数
+
     def __init__(self, parent: Optional[QObject] = None, base_interval: float = 0.1) -> None:
         super().__init__(parent)
         self.timer: QTimer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.timer.timeout.connect(self._on_timeout)
-        self.callback_info: Dict[Callable[[], Any], Dict[str, Union[float, dt.datetime]]] = {}  # 回调函数信息: {callback: {'interval': float, 'last_run': datetime, 'next_run': datetime}}
+        # 回调函数信息: {callback: {'interval': float, 'last_run': datetime, 'next_run': datetime,
+        #                          'deadline': float(monotonic), 'aligned': bool, 'seq': int}}
+        self.callback_info: Dict[Callable[[], Any], Dict[str, Any]] = {}
+        self.callback_stats: Dict[Callable[[], Any], Dict[str, Any]] = {}
+        self._heap: List[Tuple[float, int, Callable[[], Any]]] = []  # (deadline, seq, callback)
+        self._seq = itertools.count()
         self._is_running: bool = False
-        self._base_interval: float = max(0.05, base_interval)  # 基础间隔,最小50ms
+        self._base_interval: float = max(0.05, base_interval)  # 合并窗口,最小50ms
         self._lock: threading.Lock = threading.Lock()
 
+    @staticmethod
+    def _until_next_second() -> float:
+        """距程序时间下一整秒的秒数"""
+        current_time = TimeManagerFactory.get_instance().get_current_time()
+        return 1.0 - current_time.microsecond / 1_000_000
+
+    def _push(self, callback: Callable[[], Any], info: Dict[str, Any], delay: float) -> None:
+        """(需持有锁) 设置回调的下一次截止时间"""
+        if info['aligned']:
+            # 对齐到整秒：间隔取整秒，截止时间落在秒边界
+            delay = max(0.0, delay - 1.0) + self._until_next_second()
+        seq = next(self._seq)
+        deadline = time.monotonic() + delay
+        info['deadline'] = deadline
+        info['seq'] = seq
+        info['next_run'] = TimeManagerFactory.get_instance().get_current_time() + dt.timedelta(seconds=delay)
+        heapq.heappush(self._heap, (deadline, seq, callback))
+
+    def _peek(self) -> Optional[Tuple[float, int, Callable[[], Any]]]:
+        """(需持有锁) 最早的有效截止时间，顺带清理失效的堆元素"""
+        while self._heap:
+            deadline, seq, callback = self._heap[0]
+            info = self.callback_info.get(callback)
+            if info is not None and info['seq'] == seq:
+                return self._heap[0]
+            heapq.heappop(self._heap)
+        return None
+
     def _on_timeout(self) -> None:  # 超时
         app = QApplication.instance()
         if not app or app.closingDown():
             self._safe_stop_timer()
             return
 
+        now = time.monotonic()
+        window_end = now + self._base_interval
         current_time = TimeManagerFactory.get_instance().get_current_time()
         callbacks_to_run = []
         with self._lock:
@@ -237,19 +300,27 @@ class UnionUpdateTimer(QObject):
                 self._is_running = False
                 self._safe_stop_timer()
                 return
-            for callback, info in list(self.callback_info.items()):
-                time_rollback = current_time < info['last_run']
-                if current_time >= info['next_run'] or time_rollback:
-                    callbacks_to_run.append(callback)
-                    info['last_run'] = current_time
-                    info['next_run'] = current_time + dt.timedelta(seconds=info['interval'])
+            scheduled = set()
+            while (head := self._peek()) is not None and head[0] <= window_end:
+                deadline, _, callback = head
+                info = self.callback_info[callback]
+                if callback in scheduled or (info['aligned'] and deadline > now):  # 对齐回调不提前执行
+                    break
+                heapq.heappop(self._heap)
+                scheduled.add(callback)
+                callbacks_to_run.append((callback, max(0.0, now - deadline)))
+                info['last_run'] = current_time
+                self._push(callback, info, info['interval'])
+
         invalid_callbacks = []
-        for callback in callbacks_to_run:
+        for callback, lateness in callbacks_to_run:
             try:
                 with self._lock:
                     if callback not in self.callback_info:
                         continue
+                started = time.perf_counter()
                 callback()
+                self._record(callback, time.perf_counter() - started, lateness)
             except RuntimeError as e:
                 logger.error(f"回调调用错误 (可能对象已删除): {e}")
                 invalid_callbacks.append(callback)
@@ -263,13 +334,46 @@ class UnionUpdateTimer(QObject):
             with self._lock:
                 for callback in invalid_callbacks:
                     self.callback_info.pop(callback, None)
+                    self.callback_stats.pop(callback, None)
 
         if self._is_running:
             self._schedule_next()
 
+    def _record(self, callback: Callable[[], Any], elapsed: float, lateness: float) -> None:
+        """记录回调耗时"""
+        with self._lock:
+            info = self.callback_info.get(callback)
+            if info is None:
+                return
+            stats = self.callback_stats.setdefault(callback, {
+                'count': 0, 'total': 0.0, 'max': 0.0, 'overruns': 0, 'late': 0,
+                'samples': deque(maxlen=self.STATS_SAMPLES)
+            })
+            stats['count'] += 1
+            stats['total'] += elapsed
+            stats['max'] = max(stats['max'], elapsed)
+            stats['samples'].append(elapsed)
+            if elapsed > info['interval']:  # 执行耗时超过刷新间隔
+                stats['overruns'] += 1
+            if lateness > self._base_interval:  # 唤醒晚于截止时间
+                stats['late'] += 1
+
     def _schedule_next(self) -> None:
-        """调度下一次执行"""
-        delay: int = int(self._base_interval * 1000)
+        """调度下一次执行（睡眠至最早的截止时间）"""
+        with self._lock:
+            head = self._peek()
+            if head is None:
+                return
+            deadline = head[0]
+            # 合并窗口内若有对齐回调，推迟到对齐时刻一起执行
+            for entry_deadline, seq, callback in sorted(self._heap):
+                if entry_deadline > deadline + self._base_interval:
+                    break
+                info = self.callback_info.get(callback)
+                if info is not None and info['seq'] == seq and info['aligned']:
+                    deadline = entry_deadline
+                    break
+        delay: int = max(0, math.ceil((deadline - time.monotonic()) * 1000))
         self.timer.start(delay)
 
     def _safe_stop_timer(self) -> None:
@@ -282,37 +386,46 @@ class UnionUpdateTimer(QObject):
             except Exception as e:
                 logger.error(f"停止 QTimer 时发生未知错误: {e}")
 
-    def add_callback(self, callback: Callable[[], Any], interval: float = 1.0) -> None:
+    def add_callback(self, callback: Callable[[], Any], interval: float = 1.0, align_to_second: bool = False) -> None:
         """添加回调函数
 
         Args:
             callback: 回调函数
             interval: 刷新间隔(s),默认1秒
+            align_to_second: 是否对齐到整秒执行(如时钟)
         """
         if not callable(callback):
             raise TypeError("回调必须是可调用对象")
         interval = max(0.1, interval)
+        if align_to_second:
+            interval = float(max(1, round(interval)))
         current_time: dt.datetime = TimeManagerFactory.get_instance().get_current_time()
         with self._lock:
-            if callback not in self.callback_info:
-                self.callback_info[callback] = {
+            info = self.callback_info.get(callback)
+            if info is None:
+                info = self.callback_info[callback] = {
                     'interval': interval,
                     'last_run': current_time,
-                    'next_run': current_time + dt.timedelta(seconds=interval)
+                    'aligned': align_to_second
                 }
                 should_start = not self._is_running
             else:
-                self.callback_info[callback]['interval'] = interval
+                info['interval'] = interval
+                info['aligned'] = align_to_second
                 should_start = False
+            self._push(callback, info, interval)
 
         if should_start:
             self.start()
+        elif self._is_running:
+            self._schedule_next()
         #logger.debug(f"添加回调函数 {callback},间隔: {interval}s")
 
     def remove_callback(self, callback: Callable[[], Any]) -> None:
         """移除回调函数"""
         with self._lock:
-            removed: Optional[Dict[str, Union[float, dt.datetime]]] = self.callback_info.pop(callback, None)
+            removed: Optional[Dict[str, Any]] = self.callback_info.pop(callback, None)
+            self.callback_stats.pop(callback, None)
             if removed:
                 pass
                 # logger.debug(f"移除回调函数(间隔:{removed['interval']}s)")
@@ -323,6 +436,8 @@ class UnionUpdateTimer(QObject):
         with self._lock:
             # count: int = len(self.callback_info)
             self.callback_info = {}
+            self.callback_stats = {}
+            self._heap = []
         # logger.debug(f"移除所有回调函数,共 {count} 个")
 
     def start(self) -> None:
@@ -331,9 +446,13 @@ class UnionUpdateTimer(QObject):
             if not self._is_running and self.callback_info:
                 logger.debug(f"启动 UnionUpdateTimer...")
                 self._is_running = True
-                self._schedule_next()
-            elif not self.callback_info:
-                logger.warning("没有回调函数")
+                should_schedule = True
+            else:
+                should_schedule = False
+                if not self.callback_info:
+                    logger.warning("没有回调函数")
+        if should_schedule:
+            self._schedule_next()
 
     def stop(self) -> None:
         """停止定时器"""
@@ -345,14 +464,16 @@ class UnionUpdateTimer(QObject):
     def set_callback_interval(self, callback: Callable[[], Any], interval: float) -> bool:
         """设置特定回调函数的间隔(s)"""
         interval = max(0.1, interval)
-        current_time: dt.datetime = TimeManagerFactory.get_instance().get_current_time()  # 使用真实时间
         with self._lock:
             if callback in self.callback_info:
-                self.callback_info[callback]['interval'] = interval
-                self.callback_info[callback]['next_run'] = current_time + dt.timedelta(seconds=interval)
-                return True
+                info = self.callback_info[callback]
+                info['interval'] = float(max(1, round(interval))) if info['aligned'] else interval
+                self._push(callback, info, info['interval'])
             else:
                 return False
+        if self._is_running:
+            self._schedule_next()
+        return True
 
     def get_callback_interval(self, callback: Callable[[], Any]) -> Optional[float]:
         """获取特定回调函数的间隔"""
@@ -364,18 +485,16 @@ class UnionUpdateTimer(QObject):
             return None
 
     def set_base_interval(self, interval: float) -> None:
-        """设置基础检查时间(s)"""
-        # 意义不明x3
+        """设置合并窗口(s)，同一窗口内到期的回调一次执行"""
         new_interval: float = max(0.05, interval)
         with self._lock:
             self._base_interval = new_interval
             was_running: bool = self._is_running
         if was_running:
-            self.stop()
-            self.start()
+            self._schedule_next()
 
     def get_base_interval(self) -> float:
-        """获取当前基础检查间隔"""
+        """获取当前合并窗口"""
         return self._base_interval
 
     def get_callback_count(self) -> int:
@@ -387,16 +506,34 @@ class UnionUpdateTimer(QObject):
         """获取所有回调函数的详细信息"""
         with self._lock:
             info: Dict[Callable[[], Any], Dict[str, Union[float, dt.datetime]]] = {}
-            current_time: dt.datetime = TimeManagerFactory.get_instance().get_current_time()
+            now = time.monotonic()
             for callback, data in self.callback_info.items():
                 info[callback] = {
                     'interval': data['interval'],
                     'last_run': data['last_run'],
                     'next_run': data['next_run'],
-                    'time_until_next': (data['next_run'] - current_time).total_seconds() if isinstance(data['next_run'], dt.datetime) else 0.0
+                    'aligned': data['aligned'],
+                    'time_until_next': max(0.0, data['deadline'] - now)
                 }
             return info
 
+    def get_callback_stats(self) -> Dict[Callable[[], Any], Dict[str, float]]:
+        """获取回调耗时统计 (次数、平均、p95、最大耗时(s)、超时次数、延迟唤醒次数)"""
+        with self._lock:
+            result: Dict[Callable[[], Any], Dict[str, float]] = {}
+            for callback, stats in self.callback_stats.items():
+                samples = sorted(stats['samples'])
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+                result[callback] = {
+                    'count': stats['count'],
+                    'mean': stats['total'] / stats['count'] if stats['count'] else 0.0,
+                    'p95': p95,
+                    'max': stats['max'],
+                    'overruns': stats['overruns'],
+                    'late': stats['late']
+                }
+            return result
+
     def is_running(self) -> bool:
         """检查定时器是否正在运行"""
         return self._is_running
@@ -500,7 +637,7 @@ class LocalTimeManager(TimeManagerInterface):
     
     def get_current_time(self) -> dt.datetime:
         """获取程序时间（含偏移）"""
-        time_offset = float(self._config_center.read_conf('Time', 'time_offset', 0))
+        time_offset = self._config_center.snapshot.get_float('Time', 'time_offset')
         return self.get_real_time() + dt.timedelta(seconds=time_offset)
     
     def get_current_time_without_ms(self) -> dt.datetime:
@@ -521,13 +658,24 @@ class LocalTimeManager(TimeManagerInterface):
     
     def get_time_offset(self) -> int:
         """获取时差偏移(秒)"""
-        return float(self._config_center.read_conf('Time', 'time_offset', 0))
+        return self._config_center.snapshot.get_float('Time', 'time_offset')
 
     def sync_with_ntp(self) -> bool:
         """为什么"""
         logger.warning("本地时间管理器不支持NTP同步")
         return False
 
+class TimeSyncNotifier(QObject):
+    """
+    时钟来源更新通知（NTP 同步完成或切换时间管理器）
+    可能在后台同步线程中发出，连接到主线程对象的槽时排队到主线程执行
+    """
+    synced = pyqtSignal()
+
+
+time_sync_notifier = TimeSyncNotifier()
+
+
 class NTPTimeManager(TimeManagerInterface):
     """NTP时间管理器"""
     _config_center: Any
@@ -597,6 +745,8 @@ class NTPTimeManager(TimeManagerInterface):
             with self._lock:
                 self._ntp_reference_time = ntp_time_local
                 self._ntp_reference_timestamp = time.time()
+                self._use_fallback = False
+            time_sync_notifier.synced.emit()
             logger.debug(f"NTP同步成功: 服务器={ntp_server},时间={ntp_time_local}({timezone_setting}),延迟={response.delay:.3f}秒")
             return True 
         except Exception as e:
@@ -634,7 +784,7 @@ class NTPTimeManager(TimeManagerInterface):
     
     def get_current_time(self) -> dt.datetime:
         """获取程序时间（含偏移）"""
-        time_offset = float(self._config_center.read_conf('Time', 'time_offset', 0))
+        time_offset = self._config_center.snapshot.get_float('Time', 'time_offset')
         return self.get_real_time() + dt.timedelta(seconds=time_offset)
     
     def get_current_time_without_ms(self) -> dt.datetime:
@@ -655,7 +805,7 @@ class NTPTimeManager(TimeManagerInterface):
     
     def get_time_offset(self) -> int:
         """获取时差偏移(秒)"""
-        return float(self._config_center.read_conf('Time', 'time_offset', 0))
+        return self._config_center.snapshot.get_float('Time', 'time_offset')
     
     def sync_with_ntp(self) -> bool:
         """进行NTP同步"""
@@ -752,8 +902,8 @@ class TimeManagerFactory:
             cls._instance = cls.create_manager(config_provider)
             # Note：不再修改其他模块的引用
             globals()['time_manager'] = cls._instance
-            
-            return cls._instance
+        time_sync_notifier.synced.emit()  # 时间来源变化，时钟可能跳变
+        return cls._instance
 
 main_mgr = None
 
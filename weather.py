@@ -2,54 +2,27 @@ import os
 import re
 import json
 import time
-import sqlite3
 import datetime
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from functools import wraps
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
 from PyQt5.QtCore import QCoreApplication
 
-import requests
 from loguru import logger
-from PyQt5.QtCore import QThread, pyqtSignal, QEventLoop
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal
 
 from file import config_center, base_directory
+from city_search import SEARCH_LIMIT, CitySearchIndex, city_search
+from forecast_analytics import ForecastAnalysis, analyze, normalize_daily, normalize_hourly
+from timeline import DayTimeline
+from ttl_cache import cached_method
+from weather_http import weather_http
+from weather_store import ENDPOINT_TTL, StoredEntry, weather_store
+from weather_location import CITY, COORDINATES, location_resolver
 
-
-class WeatherFetchThread(QThread):
-    """(异步)天气数据获取"""
-    weather_data_ready = pyqtSignal(dict)
-    weather_error = pyqtSignal(str)
-
-    def __init__(self, weather_manager):
-        super().__init__()
-        self.weather_manager = weather_manager
-        self._is_running = False
-
-    def run(self):
-        try:
-            self._is_running = True
-            weather_data = self.weather_manager.fetch_weather_data()
-            if self._is_running:
-                if 'error' in weather_data.get('now', {}):
-                    self.weather_error.emit(weather_data['now']['error'])
-                else:
-                    self.weather_data_ready.emit(weather_data)
-        except Exception as e:
-            if self._is_running:
-                error_msg = f"异步获取天气数据失败: {e}"
-                logger.error(error_msg)
-                self.weather_error.emit(error_msg)
-        finally:
-            self._is_running = False
-
-    def stop(self):
-        """停止线程"""
-        self._is_running = False
-        if self.isRunning():
-            self.quit()
-            self.wait(3000)
+AUTO_LOCATION_KEY = '@auto'  # 缓存中记录自动定位结果的位置键
 
 
 class WeatherReminderThread(QThread):
@@ -102,30 +75,6 @@ class WeatherReminderThread(QThread):
             self.quit()
             self.wait(3000)
 
-def cache_result(expire_seconds: int = 300):
-    """缓存装饰器 """
-    # 她还是忘了不了她的缓存
-    def decorator(func):
-        cache: Dict[str, Tuple[Any, float]] = {}
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = str(args) + str(sorted(kwargs.items()))
-            current_time = time.time()
-            if cache_key in cache:
-                result, timestamp = cache[cache_key]
-                if current_time - timestamp < expire_seconds:
-                    # logger.debug(f"使用缓存结果: {func.__name__}")
-                    return result
-            result = func(*args, **kwargs)
-            cache[cache_key] = (result, current_time)
-            return result
-
-        wrapper.clear_cache = lambda: cache.clear()
-        return wrapper
-    return decorator
-
-
 def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
     """重试装饰器"""
     def decorator(func):
@@ -148,14 +97,58 @@ def retry_on_failure(max_retries: int = 3, delay: float = 1.0):
         return wrapper
     return decorator
 
+@lru_cache(maxsize=1024)
+def compile_path(path: str) -> Callable[[Any], Any]:
+    """
+    将 weather_api.json 中的点分路径（如 current.temperature.value）编译为取值函数，只拆分一次
+    字典按键取值，列表只支持 0（第一项），路径不存在时返回 None
+    """
+    keys = tuple(path.split('.'))
+
+    def accessor(data: Any) -> Any:
+        value = data
+        for key in keys:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif key == '0' and isinstance(value, list):
+                value = value[0] if value else None
+            else:
+                return None
+            if value is None:
+                return None
+        return value
+    return accessor
+
+
+NON_PATH_PARAMETERS = frozenset({'database', 'method'})  # weather_api.json 中不是字段路径的字符串参数
+ALERT_PATH_KEYS = {'alert': 'type', 'alert_title': 'title', 'alert_desc': 'description'}
+
+
 class WeatherapiProvider(ABC):
     """天气api数据基类"""
+    DATA_ROOT = ''  # 字段路径相对的位置（如高德的 lives.0）
 
     def __init__(self, api_name: str, config: Dict[str, Any]):
         self.api_name = api_name
         self.config = config
         self.base_url = config.get('url', '')
         self.parameters = config.get('parameters', {})
+        # 配置中各字段路径预先编译为取值函数
+        self.accessors: Dict[str, Callable[[Any], Any]] = {
+            key: compile_path(f'{self.DATA_ROOT}.{path}' if self.DATA_ROOT else path)
+            for key, path in self.parameters.items()
+            if isinstance(path, str) and path and key not in NON_PATH_PARAMETERS
+        }
+        alerts = config.get('alerts') or {}
+        for key, field in ALERT_PATH_KEYS.items():
+            path = alerts.get(field)
+            if isinstance(path, str) and path:
+                self.accessors[key] = compile_path(path)
+
+    def extract(self, key: str, data: Any) -> Any:
+        """按编译好的字段路径取值，未配置或不存在时返回 None"""
+        accessor = self.accessors.get(key)
+        return accessor(data) if accessor is not None and data else None
 
     @abstractmethod
     def fetch_current_weather(self, location_key: str, api_key: str) -> Dict[str, Any]:
@@ -187,10 +180,21 @@ class WeatherapiProvider(ABC):
         """解析更新时间"""
         pass
 
+    # 预报数据已包含在实时天气响应中，无需单独请求
+    forecast_in_current = False
+
     def supports_alerts(self) -> bool:
         """检查是否支持天气预警"""
         return 'alerts' in self.config and bool(self.config['alerts'])
 
+    def supports_forecast(self, forecast_type: str) -> bool:
+        """检查是否支持指定类型的预报"""
+        return self.forecast_in_current or bool(self.config.get(f'{forecast_type}_forecast'))
+
+    def forecast_from_current(self, current_data: Dict[str, Any], forecast_type: str, days: int = 5) -> Dict[str, Any]:
+        """从实时天气响应中取出预报原始数据（forecast_in_current 为 True 时使用）"""
+        return current_data
+
     def get_database_name(self) -> str:
         """获取数据库文件名"""
         return self.config.get('database', 'xiaomi_weather.db')
@@ -206,14 +210,59 @@ class WeatherapiProvider(ABC):
         pass
 
 
-@dataclass
-class WeatherExtractionContext:
-    """天气数据提取"""
-    current_params: Dict[str, Any]
-    key: str
-    weather_data: Dict[str, Any]
-    current_api: str = ''
-    parameter_path: str = ''
+@dataclass(frozen=True)
+class WeatherBundle:
+    """
+    一次刷新得到的全部天气数据（只读快照）
+    组件、设置页、天气提醒与插件均读取同一份数据，不应修改其中的内容
+    """
+    api_name: str
+    location_key: str
+    now: Dict[str, Any]
+    alert: Dict[str, Any]
+    hourly: Tuple[Dict[str, Any], ...] = ()
+    daily: Tuple[Dict[str, Any], ...] = ()
+    air: Optional[Dict[str, Any]] = None
+    fetched_at: float = 0.0  # time.time()
+    elapsed: float = 0.0  # 刷新总耗时(s)
+    request_times: Dict[str, float] = field(default_factory=dict)  # 各请求耗时(s)
+    error: Optional[Dict[str, Any]] = None  # 获取失败时的错误信息
+    from_cache: bool = False  # 是否为网络不可用时读取的磁盘缓存
+
+    @property
+    def weather_data(self) -> Dict[str, Any]:
+        """兼容 fetch_weather_data 的返回格式"""
+        if self.error is not None:
+            return {'error': self.error, 'now': self.now, 'alert': self.alert}
+        return {'now': self.now, 'alert': self.alert}
+
+    @property
+    def has_error(self) -> bool:
+        return self.error is not None or 'error' in self.now
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+@dataclass(frozen=True)
+class WeatherSnapshot:
+    """
+    从实时天气数据中一次提取出的显示字段（已格式化，温度已按设置转换单位，缺失时为 None）
+    由 WeatherDataProcessor.extract_all 生成，组件与设置页直接读取属性
+    """
+    api_name: str
+    temperature: Optional[str] = None
+    icon: Optional[str] = None  # 天气代码
+    description: Optional[str] = None  # 由天气代码得到的天气描述
+    feels_like: Optional[str] = None
+    humidity: Optional[str] = None
+    wind_speed: Optional[str] = None
+    wind_direction: Optional[str] = None
+    visibility: Optional[str] = None
+    pressure: Optional[str] = None
+    aqi: Optional[str] = None
+    air: Dict[str, Optional[str]] = field(default_factory=dict)  # co/no2/o3/pm10/pm25/so2
+    update_time: Optional[str] = None
 
 
 class WeatherDataCache:
@@ -245,12 +294,19 @@ class WeatherDataCache:
 class WeatherManager:
     """天气管理"""
 
+    BUNDLE_MAX_AGE = 300  # 预报直接复用快照的时长(s)
+    BUNDLE_DAILY_DAYS = 5  # 快照中的多天预报天数
+
     def __init__(self):
         self.api_config = self._load_api_config()
         self.cache = WeatherDataCache()
         self.providers = self._initialize_providers()
         self.current_weather_data = None
         self.current_alert_data = None
+        self.bundle: Optional[WeatherBundle] = None
+        self.day_timeline: Optional[DayTimeline] = None
+        self._analysis: Optional[Tuple[Any, WeatherBundle, ForecastAnalysis]] = None  # (键, 快照, 结果)
+        self._executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix='weather')
 
     def _load_api_config(self) -> Dict[str, Any]:
         """加载天气api"""
@@ -337,39 +393,237 @@ class WeatherManager:
         self.cache.clear()
         self.current_weather_data = None
         self.current_alert_data = None
-        if hasattr(self.fetch_weather_data, 'clear_cache'):
-            self.fetch_weather_data.clear_cache()
-        if hasattr(self.get_weather_reminders, 'clear_cache'):
-            self.get_weather_reminders.clear_cache()
+        self.bundle = None
+        self.clear_caches()
+
+    def clear_caches(self) -> None:
+        """清除天气数据、预报与提醒的缓存"""
+        self.fetch_weather_data.clear_cache()
+        self.fetch_forecast.clear_cache()
+        self.get_weather_reminders.clear_cache()
+
+    def cache_stats(self) -> List[Dict[str, Any]]:
+        return [self.fetch_weather_data.stats(), self.fetch_forecast.stats(), self.get_weather_reminders.stats()]
 
     def clear_processor_cache(self, processor):
         """清理数据处理器缓存"""
         if hasattr(processor, 'clear_cache'):
             processor.clear_cache()
 
+    @cached_method(ttl=300, max_entries=4)
     @retry_on_failure(max_retries=3, delay=1.0)
-    @cache_result(expire_seconds=300)
     def fetch_weather_data(self) -> Dict[str, Any]:
-        """获取天气数据"""
+        """获取天气数据（优先使用刷新协调器得到的最新快照）"""
+        bundle = self.get_bundle()
+        if bundle is not None:
+            return bundle.weather_data
+        return self.refresh_bundle().weather_data
+
+    def refresh_bundle(self, force: bool = False) -> WeatherBundle:
+        """
+        并发请求当前天气源的全部接口（实时、预警、空气质量、逐小时与多天预报），
+        生成新的天气快照，总耗时约等于最慢的一个请求。
+        磁盘缓存中仍在有效期内的数据直接复用（force 为 True 时全部重新请求）；
+        网络不可用时退回到过期预算内的缓存数据
+        """
+        start = time.perf_counter()
+        current_api = self.get_current_api()
         provider = self.get_current_provider()
         if not provider:
-            logger.error(f'未找到天气提供源: {self.get_current_api()}')
-            return self._get_fallback_data()
+            logger.error(f'未找到天气提供源: {current_api}')
+            return self._set_bundle(self._error_bundle(current_api, '', self._get_fallback_data(), start))
+
+        validation_result = self._validate_weather_params()
+        if validation_result:
+            return self._set_bundle(self._error_bundle(current_api, '', validation_result, start))
+        location_key = self._get_location_key()
+        api_key = config_center.read_conf('Weather', 'api_key')
 
+        stored = weather_store.load(current_api, location_key)
+        reuse = {} if force else {name: entry.payload for name, entry in stored.items() if entry.fresh}
+
+        def timed(name: str, func, *args):
+            def run():
+                task_start = time.perf_counter()
+                try:
+                    return func(*args)
+                finally:
+                    request_times[name] = time.perf_counter() - task_start
+            return self._executor.submit(run)
+
+        request_times: Dict[str, float] = {}
+        futures = {}
+        if 'current' not in reuse:
+            futures['current'] = timed('current', provider.fetch_current_weather, location_key, api_key)
+        if 'alerts' not in reuse and provider.supports_alerts():
+            futures['alerts'] = timed('alerts', self._fetch_alert_data_safely, provider, location_key, api_key)
+        if 'air' not in reuse and hasattr(provider, 'fetch_air_quality_data'):
+            futures['air'] = timed('air', provider.fetch_air_quality_data, location_key, api_key)
+        if not provider.forecast_in_current:
+            for forecast_type in ('hourly', 'daily'):
+                if forecast_type not in reuse and provider.supports_forecast(forecast_type):
+                    futures[forecast_type] = timed(
+                        forecast_type, self._fetch_forecast_safely, provider, location_key, api_key,
+                        forecast_type, self.BUNDLE_DAILY_DAYS)
+
+        fetched: Dict[str, Any] = {}  # 本次从网络获取、需要写入缓存的数据
+        if 'current' in futures:
+            try:
+                weather_data = fetched['current'] = futures['current'].result()
+            except Exception as e:
+                logger.error(f'获取天气数据失败: {e}')
+                cached_bundle = self._bundle_from_store(provider, current_api, location_key, stored)
+                if cached_bundle is not None:
+                    logger.warning(f'网络不可用，使用 {cached_bundle.age() / 60:.0f} 分钟前缓存的天气数据')
+                    return self._set_bundle(cached_bundle)
+                return self._set_bundle(self._error_bundle(
+                    current_api, location_key, self._get_fallback_data(error_code='NETWORK_ERROR'), start))
+        else:
+            weather_data = reuse['current']
+
+        def result_or_stored(name: str, default: Any, require_data: bool = False) -> Any:
+            """请求失败时退回缓存（预报请求失败时返回空列表，因此以是否有数据判断）"""
+            if name in reuse:
+                return reuse[name]
+            value = None
+            if name in futures:
+                try:
+                    value = futures[name].result()
+                except Exception as e:
+                    logger.warning(f'获取 {name} 数据失败: {e}')
+            if value if require_data else value is not None:
+                fetched[name] = value
+                return value
+            if name in stored:
+                return stored[name].payload
+            return default
+
+        alert_data = result_or_stored('alerts', {}) or {}
+        air_data = result_or_stored('air', None)
+        forecasts: Dict[str, List[Dict[str, Any]]] = {}
+        for forecast_type in ('hourly', 'daily'):
+            if provider.forecast_in_current:
+                forecasts[forecast_type] = self._forecast_from_current(provider, weather_data, forecast_type)
+            else:
+                forecasts[forecast_type] = result_or_stored(forecast_type, [], require_data=True)
+
+        bundle = WeatherBundle(
+            api_name=current_api,
+            location_key=location_key,
+            now=weather_data,
+            alert=alert_data,
+            hourly=tuple(forecasts.get('hourly') or ()),
+            daily=tuple(forecasts.get('daily') or ()),
+            air=air_data,
+            fetched_at=time.time() if 'current' in fetched else stored['current'].fetched_at,
+            elapsed=time.perf_counter() - start,
+            request_times=dict(request_times),
+        )
+        weather_store.save(current_api, location_key, fetched)
+        if config_center.read_conf('Weather', 'city') in ('0', '', None):  # 记住自动定位结果，供离线启动使用
+            weather_store.save(current_api, AUTO_LOCATION_KEY, {'location_key': location_key})
+        logger.debug(f'天气数据刷新完成，用时 {bundle.elapsed:.2f}s，复用缓存: {", ".join(reuse) or "无"}，'
+                     f'各请求: {", ".join(f"{k} {v:.2f}s" for k, v in bundle.request_times.items())}')
+        return self._set_bundle(bundle)
+
+    def _forecast_from_current(self, provider: WeatherapiProvider, weather_data: Dict[str, Any],
+                               forecast_type: str) -> List[Dict[str, Any]]:
         try:
-            validation_result = self._validate_weather_params()
-            if validation_result:
-                return validation_result
-            location_key = self._get_location_key()
-            api_key = config_center.read_conf('Weather', 'api_key')
-            weather_data = provider.fetch_current_weather(location_key, api_key)
-            alert_data = self._fetch_alert_data_safely(provider, location_key, api_key)
-            result = self._build_weather_result(weather_data, alert_data)
-            self.current_weather_data = result
-            return result
+            raw_data = provider.forecast_from_current(weather_data, forecast_type, self.BUNDLE_DAILY_DAYS)
+            return provider.parse_forecast_data(raw_data, forecast_type)
+        except Exception as e:
+            logger.error(f'解析 {forecast_type} 预报失败: {e}')
+            return []
+
+    def _bundle_from_store(self, provider: WeatherapiProvider, api_name: str, location_key: str,
+                           stored: Dict[str, StoredEntry]) -> Optional[WeatherBundle]:
+        """由磁盘缓存构建快照（需要有实时天气数据）"""
+        current = stored.get('current')
+        if current is None:
+            return None
+        forecasts = {}
+        for forecast_type in ('hourly', 'daily'):
+            if provider.forecast_in_current:
+                forecasts[forecast_type] = self._forecast_from_current(provider, current.payload, forecast_type)
+            elif forecast_type in stored:
+                forecasts[forecast_type] = stored[forecast_type].payload
+        return WeatherBundle(
+            api_name=api_name,
+            location_key=location_key,
+            now=current.payload,
+            alert=stored['alerts'].payload if 'alerts' in stored else {},
+            hourly=tuple(forecasts.get('hourly') or ()),
+            daily=tuple(forecasts.get('daily') or ()),
+            air=stored['air'].payload if 'air' in stored else None,
+            fetched_at=current.fetched_at,
+            from_cache=True,
+        )
+
+    def load_cached_bundle(self) -> Optional[WeatherBundle]:
+        """
+        不访问网络，直接读取上次保存的天气数据（用于启动时立即显示），
+        超出过期预算或没有缓存时返回 None
+        """
+        current_api = self.get_current_api()
+        provider = self.get_current_provider()
+        if not provider:
+            return None
+        location_key = config_center.read_conf('Weather', 'city')
+        if location_key in ('0', '', None):
+            entry = weather_store.get(current_api, AUTO_LOCATION_KEY, 'location_key')
+            if entry is None:
+                return None
+            location_key = entry.payload
+        bundle = self._bundle_from_store(provider, current_api, location_key,
+                                         weather_store.load(current_api, location_key))
+        if bundle is not None:
+            logger.info(f'已加载 {bundle.age() / 60:.0f} 分钟前缓存的天气数据')
+            if self.bundle is None:
+                self._set_bundle(bundle)
+        return bundle
+
+    def _set_bundle(self, bundle: WeatherBundle) -> WeatherBundle:
+        self.bundle = bundle
+        self.current_weather_data = bundle.weather_data
+        self.fetch_forecast.clear_cache()  # 预报改为读取新的快照
+        return bundle
+
+    def _error_bundle(self, api_name: str, location_key: str, fallback: Dict[str, Any],
+                      start: float) -> WeatherBundle:
+        return WeatherBundle(api_name=api_name, location_key=location_key, now=fallback.get('now', {}),
+                             alert=fallback.get('alert', {}), fetched_at=time.time(),
+                             elapsed=time.perf_counter() - start, error=fallback.get('error'))
+
+    def _fetch_forecast_safely(self, provider: WeatherapiProvider, location_key: str, api_key: str,
+                               forecast_type: str, days: int) -> List[Dict[str, Any]]:
+        try:
+            raw_data = provider.fetch_forecast_data(location_key, api_key, forecast_type, days)
+            return provider.parse_forecast_data(raw_data, forecast_type)
         except Exception as e:
-            logger.error(f'获取天气数据失败: {e}')
-            return self._get_fallback_data(error_code='NETWORK_ERROR')
+            logger.error(f'获取 {forecast_type} 预报失败: {e}')
+            return []
+
+    def get_bundle(self, max_age: Optional[float] = None) -> Optional[WeatherBundle]:
+        """当前天气源与位置对应的最新快照（过期或不匹配时为 None）"""
+        bundle = self.bundle
+        if max_age is None:
+            max_age = self.BUNDLE_MAX_AGE
+        if bundle is None or bundle.has_error or bundle.age() > max_age:
+            return None
+        if bundle.api_name != self.get_current_api():
+            return None
+        city = config_center.read_conf('Weather', 'city')
+        if city and city != '0' and bundle.location_key != city:
+            return None
+        return bundle
+
+    def current_location_key(self) -> str:
+        """用于显示的位置：手动设置的城市，自动定位时为最近一次刷新实际使用的位置（尚未刷新时为空）"""
+        city = config_center.read_conf('Weather', 'city')
+        if city and city != '0':
+            return city
+        bundle = self.bundle
+        return bundle.location_key if bundle is not None else ''
 
     def _validate_weather_params(self) -> Optional[Dict[str, Any]]:
         """验证天气参数"""
@@ -395,13 +649,6 @@ class WeatherManager:
             logger.warning(f'获取天气预警失败: {e}')
             return None
 
-    def _build_weather_result(self, weather_data: Dict[str, Any], alert_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
-        """构建结果"""
-        return {
-            'now': weather_data,
-            'alert': alert_data or {}
-        }
-
     def _get_location_key(self) -> str:
         """获取位置值"""
         location_key = config_center.read_conf('Weather', 'city')
@@ -410,21 +657,18 @@ class WeatherManager:
         return location_key
 
     def _get_auto_location(self) -> str:
-        """自动获取位置"""
+        """
+        自动获取位置（使用定位缓存，只有从未定位过时才等待定位）
+        结果不写入配置，Weather/city 保持为 '0'，定位过期后仍会在后台重新定位
+        """
         try:
             method = self.get_current_provider().config['method']
             if method == 'coordinates':
                 return self._get_coordinates_location()
-            from network_thread import getCity
-            city_thread = getCity()
-            loop = QEventLoop()
-            city_thread.finished.connect(loop.quit)
-            city_thread.start()
-            loop.exec_()  # 阻塞到完成
-            location_key = config_center.read_conf('Weather', 'city')
-            if location_key == '0' or not location_key:
+            city_data = location_resolver.get(CITY)
+            if not city_data:
                 return '101010100'  # 默认北京
-            return location_key
+            return weather_database.search_code_by_name(*city_data)
         except Exception as e:
             logger.error(f'自动获取位置失败: {e}')
             return '101010100'
@@ -432,20 +676,26 @@ class WeatherManager:
     def _get_coordinates_location(self) -> str:
         """获取坐标位置"""
         try:
-            from network_thread import getCoordinates
-            coordinates_thread = getCoordinates()
-            loop = QEventLoop()
-            coordinates_thread.finished.connect(loop.quit)
-            coordinates_thread.start()
-            loop.exec_()  # 阻塞到完成
-            coordinates_data = config_center.read_conf('Weather', 'city')
-            if coordinates_data and ',' in coordinates_data:
-                return coordinates_data
-            return '116.0,40.0'  # 默认北京
+            coordinates = location_resolver.get(COORDINATES)
+            if not coordinates:
+                return '116.0,40.0'  # 默认北京
+            lat, lon = coordinates
+            return f'{lon},{lat}'
         except Exception as e:
             logger.error(f'获取坐标位置失败: {e}')
             return '116.0,40.0'
 
+    def prefetch_location(self) -> None:
+        """启用自动定位时提前在后台定位，刷新天气时无需等待"""
+        if config_center.read_conf('Weather', 'city') not in ('0', '', None):
+            return
+        try:
+            provider = self.get_current_provider()
+            method = provider.config.get('method') if provider else None
+            location_resolver.prefetch(COORDINATES if method == 'coordinates' else CITY)
+        except Exception as e:
+            logger.warning(f'预先定位失败: {e}')
+
     def _is_api_key_required(self, api_name: str) -> bool:
         """最神经病的一集"""
         return api_name in ['qweather', 'amap_weather', 'qq_weather']
@@ -510,6 +760,7 @@ class WeatherManager:
             logger.error(f'解析天气数据失败 ({data_type}): {e}')
             return None
 
+    @cached_method(ttl=300, max_entries=16)
     def fetch_forecast(self, forecast_type: str, days: int = 5) -> List[Dict[str, Any]]:
         """统一获取天气预报数据
 
@@ -522,6 +773,13 @@ class WeatherManager:
             logger.error(f'未找到天气提供源: {self.get_current_api()}')
             return []
 
+        bundle = self.get_bundle(max_age=ENDPOINT_TTL.get(forecast_type))
+        if bundle is not None:  # 直接使用最近一次刷新的快照
+            if forecast_type == 'hourly' and bundle.hourly:
+                return list(bundle.hourly)
+            if forecast_type == 'daily' and bundle.daily and days <= len(bundle.daily):
+                return list(bundle.daily[:days])
+
         try:
             location_key = self._get_location_key()
             api_key = config_center.read_conf('Weather', 'api_key')
@@ -545,142 +803,65 @@ class WeatherManager:
         """获取多天天气预报"""
         return self.fetch_forecast('daily', days)
 
-    def get_precipitation_info(self) -> Dict[str, Any]:
-        """获取降水信息"""
+    def set_day_timeline(self, timeline: Optional[DayTimeline]) -> None:
+        """设置当日时间线，用于判断上课期间是否降水"""
+        self.day_timeline = timeline
+
+    def get_forecast_analysis(self) -> ForecastAnalysis:
+        """
+        预报分析结果
+        同一份快照与时间线只分析一次；快照不可用时直接获取预报并分析（不缓存）
+        """
         provider = self.get_current_provider()
         if not provider:
-            logger.error(f'未找到天气提供源: {self.get_current_api()}')
-            return {
-                'precipitation': False,
-                'precipitation_time': [],
-                'tomorrow_precipitation': False,
-                'precipitation_day': 0,
-                'first_hour_precip': False,
-                'same_precipitation': True,
-                'temp_change': 0
-            }
+            return ForecastAnalysis()
+        now = datetime.datetime.now()
+        timeline = self.day_timeline
+        bundle = self.get_bundle(max_age=ENDPOINT_TTL['hourly'])
+        key = (id(bundle), id(timeline), now.date(), now.hour) if bundle is not None else None
+        cached = self._analysis
+        if key is not None and cached is not None and cached[0] == key and cached[1] is bundle:
+            return cached[2]
+
+        is_precipitation = getattr(provider, '_is_precipitation', None) or (lambda code: False)
+        if bundle is not None and bundle.hourly and bundle.daily:
+            hourly_data, daily_data = bundle.hourly, bundle.daily
+            fetched = datetime.datetime.fromtimestamp(bundle.fetched_at)
+        else:
+            hourly_data, daily_data = self.fetch_hourly_forecast(), self.fetch_daily_forecast(5)
+            fetched = now
+        if not isinstance(hourly_data, (list, tuple)):
+            logger.warning(f'逐小时预报数据不是列表类型: {type(hourly_data)}')
+            hourly_data = []
+        if not isinstance(daily_data, (list, tuple)):
+            logger.warning(f'多天预报数据不是列表类型: {type(daily_data)}')
+            daily_data = []
+
+        precipitation_now = False
+        if self.current_weather_data and 'now' in self.current_weather_data:
+            current_icon = provider.parse_weather_icon(self.current_weather_data['now'])
+            if current_icon:
+                precipitation_now = bool(is_precipitation(str(current_icon)))
+
+        analysis = analyze(normalize_hourly(hourly_data, is_precipitation, fetched),
+                           normalize_daily(daily_data, is_precipitation),
+                           precipitation_now, now, timeline)
+        if key is not None:
+            self._analysis = (key, bundle, analysis)
+        return analysis
 
+    def get_precipitation_info(self) -> Dict[str, Any]:
+        """获取降水信息"""
+        if not self.get_current_provider():
+            logger.error(f'未找到天气提供源: {self.get_current_api()}')
+            return ForecastAnalysis().as_precipitation_info()
         try:
-            # 使用统一接口获取预报数据
-            hourly_data = self.fetch_hourly_forecast()
-            daily_data = self.fetch_daily_forecast(5)
-
-            # 当前降水状态
-            precipitation_now = False
-            if self.current_weather_data and 'now' in self.current_weather_data:
-                current_icon = provider.parse_weather_icon(self.current_weather_data['now'])
-                if current_icon:
-                    precipitation_now = provider._is_precipitation(str(current_icon))
-                    # logger.debug(f"当前天气图标代码: {current_icon}, 是否降水: {precipitation_now}")
-
-            # 降水信息初始化
-            precipitation_time = []
-            tomorrow_precipitation = False
-            precipitation_day = 0
-            first_hour_precip = False
-            same_precipitation = True
-            temp_change = 0
-
-            # 处理逐小时预报数据
-            if hourly_data:
-                if not isinstance(hourly_data, list):
-                    logger.warning(f"逐小时预报数据不是列表类型: {type(hourly_data)}")
-                    hourly_data = []
-                if len(hourly_data) > 0:
-                    first_hour = hourly_data[0]
-                    # 获取第一个小时的降水状态
-                    if 'precipitation' in first_hour:
-                        precip_value = first_hour['precipitation']
-                        first_hour_precip = bool(precip_value) and float(precip_value) > 0
-                        # logger.debug(f"第一小时降水量: {precip_value}, 是否降水: {first_hour_precip}")
-                    elif 'weather_code' in first_hour:
-                        first_hour_precip = provider._is_precipitation(str(first_hour['weather_code']))
-                        # logger.debug(f"第一小时天气代码: {first_hour['weather_code']}, 是否降水: {first_hour_precip}")
-
-                    same_precipitation = (precipitation_now == first_hour_precip)
-                    # logger.debug(f"当前降水状态: {precipitation_now}, 第一小时降水状态: {first_hour_precip}, 是否相同: {same_precipitation}")
-                    # 降水时间分组
-                    current_precip = None
-                    count = 0
-                    for hour in hourly_data:
-                        is_precip = False
-                        if 'precipitation' in hour:
-                            precip_value = hour['precipitation']
-                            is_precip = bool(precip_value) and float(precip_value) > 0
-                        elif 'weather_code' in hour:
-                            is_precip = provider._is_precipitation(str(hour['weather_code']))
-                        if current_precip is None:
-                            current_precip = is_precip
-                            count = 1
-                        elif current_precip == is_precip:
-                            count += 1
-                        else:
-                            precipitation_time.append(count)
-                            current_precip = is_precip
-                            count = 1
-                    if count > 0:
-                        precipitation_time.append(count)
-
-            # 处理多天预报数据
-            if daily_data:
-                if not isinstance(daily_data, list):
-                    logger.warning(f"多天预报数据不是列表类型: {type(daily_data)}")
-                    daily_data = []
-
-                if len(daily_data) > 1:
-                    tomorrow = daily_data[1]
-                    # 获取明日降水状态
-                    if 'precipitation_day' in tomorrow:
-                        tomorrow_precipitation = tomorrow['precipitation_day']
-                    elif 'weather_day' in tomorrow:
-                        tomorrow_precipitation = provider._is_precipitation(str(tomorrow['weather_day']))
-                    # 降水持续天数
-                    for day in daily_data:
-                        if 'precipitation_day' in day:
-                            if day['precipitation_day']:
-                                precipitation_day += 1
-                            else:
-                                break
-                        elif 'weather_day' in day:
-                            if provider._is_precipitation(str(day['weather_day'])):
-                                precipitation_day += 1
-                            else:
-                                break
-
-                    # 计算最高气温变化
-                    #                                  ! 小米天气api 的 temp_low 才是最高气温 以后可能需要单独处理 !
-                    today = daily_data[0]
-                    tomorrow = daily_data[1]
-                    try:  #                            ↑ ↑ ↑
-                        today_high = float(today.get('temp_low', today.get('tempMax', today.get('daytemp', 0))))
-                        tomorrow_high = float(tomorrow.get('temp_low', tomorrow.get('tempMax', tomorrow.get('daytemp', 0))))
-                        temp_change = tomorrow_high - today_high
-                    except (ValueError, TypeError, KeyError) as e:
-                        logger.error(f"计算温度变化失败: {e}")
-                        temp_change = 0
-
-            return {
-                'precipitation': precipitation_now,  # 当前是否降水
-                'precipitation_time': precipitation_time,  # 降水状态逐小时预报分组列表
-                'tomorrow_precipitation': tomorrow_precipitation,  # 明日是否降水
-                'precipitation_day': precipitation_day,  # 降水持续天数
-                'first_hour_precip': first_hour_precip,  # 预报中第一小时是否降水
-                'same_precipitation': same_precipitation,  # 当前降水和第一小时降水状态是否相同
-                'temp_change': temp_change  # 今明最高温变化值
-            }
+            return self.get_forecast_analysis().as_precipitation_info()
         except Exception as e:
             logger.error(f'获取降水信息失败: {e}')
-            return {
-                'precipitation': False,
-                'precipitation_time': [],
-                'tomorrow_precipitation': False,
-                'precipitation_day': 0,
-                'first_hour_precip': False,
-                'same_precipitation': True,
-                'temp_change': 0
-            }
+            return ForecastAnalysis().as_precipitation_info()
 
-    @cache_result(expire_seconds=600)  # 缓存10分钟
+    @cached_method(ttl=600, max_entries=16)  # 缓存10分钟
     def get_weather_reminders(self, api_name: str = None, location_key: str = None) -> List[Dict[str, Any]]:
         """获取天气提醒信息
 
@@ -744,6 +925,16 @@ class WeatherManager:
                                     ).format(hours),
                                     'icon': 'rain'
                                 })
+                            # 上课期间降水提醒
+                            elif precip_info['class_rain_start']:
+                                reminders.append({
+                                    'type': 'class_precipitation',
+                                    'title': QCoreApplication.translate(
+                                        "WeatherReminder",
+                                        "{} 上课期间有降水"
+                                    ).format(precip_info['class_rain_start']),
+                                    'icon': 'rain'
+                                })
                             # 明日降水提醒
                             elif precip_info['tomorrow_precipitation']:
                                 days = precip_info['precipitation_day']  # 先留着吧
@@ -816,9 +1007,7 @@ class GenericWeatherProvider(WeatherapiProvider):
             from network_thread import proxies
             url = self.base_url.format(location_key=location_key, days=1, key=api_key)
             #logger.debug(f'{self.api_name} 请求URL: {url}')
-            response = requests.get(url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(url, endpoint=f'{self.api_name}/current', proxies=proxies)
         except Exception as e:
             logger.error(f'{self.api_name} 获取天气数据失败: {e}')
             raise
@@ -839,31 +1028,28 @@ class GenericWeatherProvider(WeatherapiProvider):
 
             url = alert_url.format(location_key=location_key, key=api_key)
             # logger.debug(f'{self.api_name} 预警请求URL: {url.replace(api_key, "***" if api_key else "(空)")}')
-            response = requests.get(url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(url, endpoint=f'{self.api_name}/alerts', proxies=proxies)
         except Exception as e:
             logger.warning(f'{self.api_name} 获取预警数据失败: {e}')
             return None
 
     def parse_temperature(self, data: Dict[str, Any]) -> Optional[str]:
         """解析温度数据"""
-        temp_path = self.parameters.get('temp', '')
-        if not temp_path:
+        accessor = self.accessors.get('temp')
+        if accessor is None:
             logger.error(f"温度路径为空: {self.api_name}")
             return None
-        # logger.debug(f"解析温度 - api: {self.api_name}, 路径: {temp_path}")
-        value = self._extract_value_by_path(data, temp_path)
+        value = accessor(data) if data else None
         # logger.debug(f"提取的温度值: {value}")
         return f"{value}°" if value is not None else None
 
     def parse_weather_icon(self, data: Dict[str, Any]) -> Optional[str]:
         """解析天气图标代码"""
-        icon_path = self.parameters.get('icon', '')
-        if not icon_path:
+        accessor = self.accessors.get('icon')
+        if accessor is None:
             logger.error(f"图标路径为空: {self.api_name}")
             return None
-        value = self._extract_value_by_path(data, icon_path)
+        value = accessor(data) if data else None
         # logger.debug(f"提取的图标值: {value}")
         # 神经天气服务商
         if self.config.get('return_desc', False) and value:
@@ -873,9 +1059,9 @@ class GenericWeatherProvider(WeatherapiProvider):
 
     def parse_weather_description(self, data: Dict[str, Any]) -> Optional[str]:
         """解析描述"""
-        desc_path = self.parameters.get('description', '')
-        if desc_path:
-            result = self._extract_value_by_path(data, desc_path)
+        accessor = self.accessors.get('description')
+        if accessor is not None:
+            result = accessor(data) if data else None
             return str(result) if result is not None else None
 
         icon_code = self.parse_weather_icon(data)
@@ -891,12 +1077,7 @@ class GenericWeatherProvider(WeatherapiProvider):
             return None
 
         try:
-            value: Any = data
-            for key in path.split('.'):
-                value = self._extract_single_key(value, key)
-                if value is None:
-                    return None
-            return value
+            return compile_path(path)(data)
         except Exception as e:
             logger.error(f'解析数据路径 {path} 失败: {e}')
             return None
@@ -905,15 +1086,6 @@ class GenericWeatherProvider(WeatherapiProvider):
         """验证输入有效性"""
         return bool(path and data)
 
-    def _extract_single_key(self, value: Any, key: str) -> Optional[Union[str, int, float, Dict[str, Any], List[Any]]]:
-        """提取单键值"""
-        if key == '0' and isinstance(value, list):
-            return value[0] if len(value) > 0 else None
-        elif isinstance(value, dict):
-            return value.get(key)
-        else:
-            return None
-
     def fetch_forecast_data(self, location_key: str, api_key: str, forecast_type: str, days: int = 5) -> Dict[str, Any]:
         """获取预报数据的统一方法"""
         config_key = f"{forecast_type}_forecast"
@@ -939,9 +1111,7 @@ class GenericWeatherProvider(WeatherapiProvider):
                     url = url.format(lon=lon, lat=lat)
 
             # logger.debug(f"获取 {forecast_type} 预报数据: {url}")
-            response = requests.get(url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(url, endpoint=f'{self.api_name}/{forecast_type}_forecast', proxies=proxies)
         except Exception as e:
             logger.error(f"获取 {forecast_type} 预报失败: {e}")
             return {}
@@ -1009,9 +1179,9 @@ class GenericWeatherProvider(WeatherapiProvider):
         """解析更新时间(通用实现)"""
         try:
             # 尝试从配置的路径获取更新时间
-            update_time_path = self.parameters.get('updateTime', '')
-            if update_time_path:
-                value = self._extract_value_by_path(data, update_time_path)
+            accessor = self.accessors.get('updateTime')
+            if accessor is not None:
+                value = accessor(data) if data else None
                 if value:
                     return str(value)
             common_fields = ['updateTime', 'update_time', 'lastUpdate', 'last_update', 'time']
@@ -1410,6 +1580,22 @@ class XiaomiWeatherProvider(GenericWeatherProvider):
 
         return result
 
+    forecast_in_current = True
+
+    def forecast_from_current(self, current_data: Dict[str, Any], forecast_type: str, days: int = 5) -> Dict[str, Any]:
+        """小米天气的预报包含在完整天气数据中"""
+        if forecast_type == 'hourly':
+            return current_data.get("forecastHourly", {})
+        elif forecast_type == 'daily':
+            daily_forecast = dict(current_data.get("forecastDaily", {}))
+            # 根据请求的天数截取数据（不修改原始数据）
+            if days > 0:
+                for key in ["temperature", "weather", "wind", "precipitationProbability"]:
+                    if key in daily_forecast and "value" in daily_forecast[key]:
+                        daily_forecast[key] = dict(daily_forecast[key], value=daily_forecast[key]["value"][:days])
+            return daily_forecast
+        return {}
+
     def fetch_forecast_data(self, location_key: str, api_key: str, forecast_type: str, days: int = 5) -> Dict[str, Any]:
         """小米天气特殊处理"""
         try:
@@ -1417,20 +1603,7 @@ class XiaomiWeatherProvider(GenericWeatherProvider):
             full_data = self.fetch_current_weather(location_key, api_key)
             if not full_data:
                 return {}
-
-            if forecast_type == 'hourly':
-                hourly_forecast = full_data.get("forecastHourly", {})
-                return hourly_forecast
-            elif forecast_type == 'daily':
-                daily_forecast = full_data.get("forecastDaily", {})
-                # 根据请求的天数截取数据
-                if days > 0:
-                    for key in ["temperature", "weather", "wind", "precipitationProbability"]:
-                        if key in daily_forecast and "value" in daily_forecast[key]:
-                            daily_forecast[key]["value"] = daily_forecast[key]["value"][:days]
-                return daily_forecast
-            else:
-                return {}
+            return self.forecast_from_current(full_data, forecast_type, days)
         except Exception as e:
             logger.error(f"获取小米天气{forecast_type}预报失败: {e}")
             return {}
@@ -1464,9 +1637,7 @@ class QWeatherProvider(GenericWeatherProvider):
             else:
                 url = self.base_url.format(location_key=location_key, key=api_key)
             # logger.debug(f'{self.api_name} 请求URL: {url.replace(api_key, "***" if api_key else "(空)")}')
-            response = requests.get(url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            result = response.json()
+            result = weather_http.get_json(url, endpoint=f'{self.api_name}/current', proxies=proxies)
             # logger.debug(f'{self.api_name} API响应: {result}')
             return result
         except Exception as e:
@@ -1654,9 +1825,7 @@ class QWeatherProvider(GenericWeatherProvider):
             else:
                 air_url = f"https://devapi.qweather.com/v7/air/now?location={location_key}&key={api_key}"
 
-            response = requests.get(air_url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(air_url, endpoint=f'{self.api_name}/air', proxies=proxies)
         except Exception as e:
             logger.warning(f'和风天气获取空气质量数据失败: {e}')
             return None
@@ -1734,9 +1903,7 @@ class QWeatherProvider(GenericWeatherProvider):
                 alert_url = f"https://devapi.qweather.com/v7/warning/now?location={location_key}&key={api_key}"
             # logger.debug(f'和风天气预警请求URL: {alert_url.replace(api_key, "***" if api_key else "(空)")}')
 
-            response = requests.get(alert_url, proxies=proxies, timeout=10)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(alert_url, endpoint=f'{self.api_name}/alerts', proxies=proxies)
         except Exception as e:
             logger.warning(f'和风天气获取预警数据失败: {e}')
             return None
@@ -1934,6 +2101,7 @@ class QWeatherProvider(GenericWeatherProvider):
 
 class AmapWeatherProvider(GenericWeatherProvider):
     """高德天气api提供者"""
+    DATA_ROOT = 'lives.0'
 
     def parse_temperature(self, data: Dict[str, Any]) -> Optional[str]:
         """解析温度数据(高德天气)"""
@@ -2006,6 +2174,7 @@ class AmapWeatherProvider(GenericWeatherProvider):
 
 class QQWeatherProvider(GenericWeatherProvider):
     """腾讯天气api提供者"""
+    DATA_ROOT = 'result.realtime.0.infos'
 
     def parse_temperature(self, data: Dict[str, Any]) -> Optional[str]:
         """解析温度数据(腾讯天气)"""
@@ -2078,6 +2247,8 @@ class QQWeatherProvider(GenericWeatherProvider):
 
 
 class OpenMeteoProvider(GenericWeatherProvider):
+    forecast_in_current = True  # 预报与实时数据为同一接口
+
     @retry_on_failure(max_retries=2, delay=0.5)
     def fetch_current_weather(self, location_key, api_key):
         if not location_key:
@@ -2094,14 +2265,12 @@ class OpenMeteoProvider(GenericWeatherProvider):
             headers = {
                 'User-Agent': 'ClassWidgets'
             }
-            weather_response = requests.get(weather_url, proxies=proxies, timeout=10, headers=headers)
-            weather_response.raise_for_status()
-            weather_data = weather_response.json()
+            weather_data = weather_http.get_json(weather_url, endpoint=f'{self.api_name}/current',
+                                                 headers=headers, proxies=proxies)
             try:
                 air_quality_url = f"https://air-quality-api.open-meteo.com/v1/air-quality?latitude={lat}&longitude={lon}&current=carbon_monoxide,nitrogen_dioxide,ozone,pm10,pm2_5,sulphur_dioxide&timezone=auto"
-                air_response = requests.get(air_quality_url, proxies=proxies, timeout=10, headers=headers)
-                air_response.raise_for_status()
-                air_data = air_response.json()
+                air_data = weather_http.get_json(air_quality_url, endpoint=f'{self.api_name}/air',
+                                                 headers=headers, proxies=proxies)
                 weather_data['air_quality'] = air_data
             except Exception as e:
                 logger.warning(f'获取空气质量数据失败: {e}')
@@ -2354,9 +2523,7 @@ class OpenMeteoProvider(GenericWeatherProvider):
             headers = {
                 'User-Agent': f"ClassWidgets/{config_center.read_conf('Version', 'version')} (contact: IsHPDuwu@outlook.com)"
             }
-            response = requests.get(url, proxies=proxies, timeout=10, headers=headers)
-            response.raise_for_status()
-            return response.json()
+            return weather_http.get_json(url, endpoint=f'{self.api_name}/forecast', headers=headers, proxies=proxies)
         except Exception as e:
             logger.error(f'{self.api_name} 获取预报数据失败: {e}')
             raise
@@ -2448,7 +2615,7 @@ class WeatherDatabase:
 
     def __init__(self, weather_manager: WeatherManager):
         self.weather_manager = weather_manager
-        self._update_db_path()
+        city_search.warm_up(self._update_db_path())
 
     def _update_db_path(self) -> str:
         """更新数据库路径"""
@@ -2458,17 +2625,13 @@ class WeatherDatabase:
         self.db_path = os.path.join(base_directory, 'config', 'data', db_name)
         return self.db_path
 
-    def search_city_by_name(self, search_term: str) -> List[str]:
-        """根据城市名称搜索城市"""
-        self._update_db_path()
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM citys WHERE name LIKE ?', ('%' + search_term + '%',))
-            cities_results = cursor.fetchall()
-            conn.close()
+    def _index(self) -> CitySearchIndex:
+        return city_search.index(self._update_db_path())
 
-            return [city[2] for city in cities_results]
+    def search_city_by_name(self, search_term: str, limit: Optional[int] = SEARCH_LIMIT) -> List[str]:
+        """根据城市名称、拼音或首字母搜索城市（按匹配程度排序，搜索词为空时返回全部城市）"""
+        try:
+            return [record.name for record in self._index().search(search_term, limit)]
         except Exception as e:
             logger.error(f'搜索城市失败: {e}')
             return []
@@ -2479,7 +2642,6 @@ class WeatherDatabase:
         if not normalized_city:
             return '101010100'
 
-        self._update_db_path()
         try:
             return self._search_city_in_database(normalized_city, normalized_district)
         except Exception as e:
@@ -2501,58 +2663,45 @@ class WeatherDatabase:
 
     def _search_city_in_database(self, clean_city: str, clean_district: str) -> str:
         """在数据库中搜索城市"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        try:
-            # 先精确匹配
-            exact_result = self._try_exact_match(cursor, clean_city, clean_district)
-            if exact_result:
-                return exact_result
-            # 再模糊匹配
-            fuzzy_result = self._try_fuzzy_match(cursor, clean_city)
-            if fuzzy_result:
-                return fuzzy_result
-            logger.warning(f'未找到城市: {clean_city}, 使用默认城市代码')
-            return '101010100'
-        finally:
-            conn.close()
-
-    def _try_exact_match(self, cursor, clean_city: str, clean_district: str) -> Optional[str]:
+        index = self._index()
+        # 先精确匹配
+        exact_result = self._try_exact_match(index, clean_city, clean_district)
+        if exact_result:
+            return exact_result
+        # 再模糊匹配
+        fuzzy_result = self._try_fuzzy_match(index, clean_city)
+        if fuzzy_result:
+            return fuzzy_result
+        logger.warning(f'未找到城市: {clean_city}, 使用默认城市代码')
+        return '101010100'
+
+    def _try_exact_match(self, index: CitySearchIndex, clean_city: str, clean_district: str) -> Optional[str]:
         """尝试精确匹配"""
         search_name = f"{clean_city}.{clean_district}" if clean_district else clean_city
-        cursor.execute('SELECT * FROM citys WHERE name = ?', (search_name,))
-        exact_results = cursor.fetchall()
-
-        if exact_results:
-            logger.debug(f'找到城市: {exact_results[0][2]}, 代码: {exact_results[0][3]}')
-            return str(exact_results[0][3])
+        record = index.by_name.get(search_name)
+        if record is not None:
+            logger.debug(f'找到城市: {record.name}, 代码: {record.code}')
+            return record.code
         return None
 
-    def _try_fuzzy_match(self, cursor, clean_city: str) -> Optional[str]:
+    def _try_fuzzy_match(self, index: CitySearchIndex, clean_city: str) -> Optional[str]:
         """尝试模糊匹配"""
-        cursor.execute('SELECT * FROM citys WHERE name LIKE ?', ('%' + clean_city + '%',))
-        fuzzy_results = cursor.fetchall()
-
-        if fuzzy_results:
-            logger.debug(f'模糊找到城市: {fuzzy_results[0][2]}, 代码: {fuzzy_results[0][3]}')
-            return str(fuzzy_results[0][3])
+        record = index.first_containing(clean_city)
+        if record is not None:
+            logger.debug(f'模糊找到城市: {record.name}, 代码: {record.code}')
+            return record.code
         return None
 
     def search_city_by_code(self, city_code: str) -> str:
+        """根据城市代码获取城市名称"""
         if len(city_code.split(',')) != 1:
             return 'coordinates'
-        """根据城市代码获取城市名称"""
-        self._update_db_path()
+        if not city_code or city_code == '0':  # 自动定位/未设置
+            return '北京'  # 默认城市
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('SELECT * FROM citys WHERE city_num LIKE ?', ('%' + city_code + '%',))
-            cities_results = cursor.fetchall()
-            conn.close()
-
-            if cities_results:
-                return cities_results[0][2]
+            record = self._index().code_containing(city_code)
+            if record is not None:
+                return record.name
             return '北京'  # 默认城市
 
         except Exception as e:
@@ -2560,21 +2709,105 @@ class WeatherDatabase:
             return '北京'
 
 
+NIGHT_ICON_CODES = ('0', '1', '3', '13')  # 有夜间图标的天气：晴、多云、阵雨、阵雪
+
+
+@dataclass(frozen=True)
+class WeatherStatusIndex:
+    """
+    天气状态表（<api>_status.json）的查询索引
+    加载时一次性建立，之后按代码/描述查询均为字典查找；只读，各线程共用同一份
+    """
+    api_name: str
+    status: Dict[str, Any]
+    descriptions: Dict[str, str]  # 天气代码 -> 描述
+    icon_codes: Dict[str, str]  # 天气代码 -> 图标代码(original_code)
+    codes: Dict[str, str]  # 描述 -> 天气代码
+    day_icons: Dict[str, str]  # 图标代码 -> 日间图标路径
+    night_icons: Dict[str, str]  # 图标代码 -> 夜间图标路径（仅有夜间图标的天气）
+
+    @classmethod
+    def build(cls, api_name: str, status: Dict[str, Any]) -> 'WeatherStatusIndex':
+        descriptions: Dict[str, str] = {}
+        icon_codes: Dict[str, str] = {}
+        codes: Dict[str, str] = {}
+        for weather in status.get('weatherinfo', []):
+            if weather.get('code') is None:
+                continue
+            code = str(weather['code'])
+            original_code = weather.get('original_code')
+            # 与逐项查找一致，重复的代码/描述以第一项为准
+            descriptions.setdefault(code, weather.get('wea', '未知'))
+            icon_codes.setdefault(code, str(original_code) if original_code is not None else code)
+            codes.setdefault(str(weather.get('wea')), code)
+
+        default_icon = os.path.join(base_directory, 'img', 'weather', '99.svg')
+        day_icons: Dict[str, str] = {}
+        night_icons: Dict[str, str] = {}
+        for icon_code in set(icon_codes.values()):
+            icon_path = os.path.join(base_directory, 'img', 'weather', f'{icon_code}.svg')
+            if not os.path.exists(icon_path):
+                logger.warning(f'天气图标文件不存在: {icon_path}')
+                icon_path = default_icon
+            day_icons[icon_code] = icon_path
+            if icon_code in NIGHT_ICON_CODES:
+                night_icons[icon_code] = os.path.join(base_directory, 'img', 'weather', f'{icon_code}d.svg')
+        return cls(api_name, status, descriptions, icon_codes, codes, day_icons, night_icons)
+
+    @classmethod
+    def empty(cls, api_name: str) -> 'WeatherStatusIndex':
+        return cls(api_name, {'weatherinfo': []}, {}, {}, {}, {}, {})
+
+
+# WeatherSnapshot 字段 -> extract_weather_data 的键
+SNAPSHOT_FIELDS: Dict[str, str] = {
+    'temperature': 'temp',
+    'icon': 'icon',
+    'feels_like': 'feels_like',
+    'humidity': 'humidity',
+    'wind_speed': 'wind_speed',
+    'wind_direction': 'wind_direction',
+    'visibility': 'visibility',
+    'pressure': 'pressure',
+    'aqi': 'aqi',
+    'update_time': 'updateTime',
+}
+# 字段对应的天气源解析方法
+FIELD_PARSERS: Dict[str, str] = {
+    'temp': 'parse_temperature',
+    'icon': 'parse_weather_icon',
+    'feels_like': 'parse_feels_like',
+    'humidity': 'parse_humidity',
+    'wind_speed': 'parse_wind_speed',
+    'wind_direction': 'parse_wind_direction',
+    'visibility': 'parse_visibility',
+    'pressure': 'parse_pressure',
+    'aqi': 'parse_aqi',
+    'updateTime': 'parse_update_time',
+}
+
+
 class WeatherDataProcessor:
     """统一天气数据处理"""
 
     def __init__(self, weather_manager: WeatherManager):
         self.weather_manager = weather_manager
-        self._status_cache = {}
+        self._indexes: Dict[str, WeatherStatusIndex] = {}
+        self._last_snapshot: Optional[Tuple[Dict[str, Any], Tuple[str, str], WeatherSnapshot]] = None
 
     def clear_cache(self):
         """清理所有缓存"""
-        self._status_cache.clear()
+        self._indexes = {}
 
     def clear_api_cache(self, api_name: str):
         """清理指定api的缓存"""
-        if api_name in self._status_cache:
-            del self._status_cache[api_name]
+        self._indexes = {name: index for name, index in self._indexes.items() if name != api_name}
+
+    def reload_status(self, api_name: str) -> WeatherStatusIndex:
+        """切换天气源时重建索引，建好后一次性替换，查询方不会读到建了一半的索引"""
+        index = self._build_status_index(api_name)
+        self._indexes = {api_name: index}
+        return index
 
     def _convert_temperature_unit(self, temp_str: str) -> str:
         """根据配置转换温度单位"""
@@ -2609,69 +2842,71 @@ class WeatherDataProcessor:
             logger.error(f"温度单位转换失败: {e}")
             return temp_str
 
-    def _load_weather_status(self, api_name: Optional[str] = None) -> Dict[str, Any]:
-        """加载天气状态配置"""
-        if not api_name:
-            api_name = self.weather_manager.get_current_api()
-        if api_name in self._status_cache:
-            return self._status_cache[api_name]
-
+    def _build_status_index(self, api_name: str) -> Optional[WeatherStatusIndex]:
         try:
             with open(os.path.join(base_directory, 'config', 'data', f'{api_name}_status.json'), 'r', encoding='utf-8') as f:
-                status_data = json.load(f)
-                self._status_cache[api_name] = status_data
-                return status_data
+                return WeatherStatusIndex.build(api_name, json.load(f))
         except Exception as e:
             logger.error(f'加载天气状态配置失败: {e}')
-            return {'weatherinfo': []}
+            return None
+
+    def _status_index(self, api_name: Optional[str] = None) -> WeatherStatusIndex:
+        """天气状态索引（每个天气源只建立一次）"""
+        if not api_name:
+            api_name = self.weather_manager.get_current_api()
+        index = self._indexes.get(api_name)
+        if index is None:
+            index = self._build_status_index(api_name)
+            if index is None:  # 加载失败不缓存，下次重试
+                return WeatherStatusIndex.empty(api_name)
+            self._indexes = {**self._indexes, api_name: index}
+        return index
+
+    def _load_weather_status(self, api_name: Optional[str] = None) -> Dict[str, Any]:
+        """加载天气状态配置"""
+        return self._status_index(api_name).status
 
     def get_weather_by_code(self, code: str, api_name: Optional[str] = None) -> str:
         """根据天气代码获取天气描述"""
-        weather_status = self._load_weather_status(api_name)
-        for weather in weather_status.get('weatherinfo', []):
-            if str(weather.get('code')) == str(code):
-                # logger.debug(f'天气代码 {code} 对应的天气描述为: {weather.get("wea", "未知")}')
-                return weather.get('wea', '未知')
-        return '未知'
+        return self._status_index(api_name).descriptions.get(str(code), '未知')
 
     def get_weather_icon_by_code(self, code: str, api_name: Optional[str] = None) -> str:
         """根据天气代码获取图标路径"""
-        weather_status = self._load_weather_status(api_name)
-        weather_code = self._find_weather_code(weather_status, code, api_name)
+        index = self._status_index(api_name)
+        weather_code = self._find_weather_code(index, code, api_name)
 
         if not weather_code:
             return self._get_default_weather_icon()
 
-        return self._build_weather_icon_path(weather_code)
+        return self._build_weather_icon_path(weather_code, index)
 
-    def _find_weather_code(self, weather_status: Dict[str, Any], code: str, api_name: Optional[str]) -> Optional[str]:
+    def _find_weather_code(self, index: WeatherStatusIndex, code: str, api_name: Optional[str]) -> Optional[str]:
         """查找代码"""
         if code is None or str(code).strip() == '' or str(code) == 'None':
             logger.error(f'天气代码为空或无效({api_name}): {code}')
             return None
 
-        if not weather_status or 'weatherinfo' not in weather_status:
-            logger.error(f'天气状态数据无效({api_name}): {weather_status}')
+        if not index.icon_codes:
+            logger.error(f'天气状态数据无效({api_name}): {index.status}')
             return None
 
-        for weather in weather_status.get('weatherinfo', []):
-            weather_code = weather.get('code')
-            if weather_code is not None and str(weather_code) == str(code):
-                original_code = weather.get('original_code')
-                if original_code is not None:
-                    return str(original_code)
-                else:
-                    return str(weather.get('code'))
-
-        logger.error(f'未找到天气代码({api_name}) {code}')
-        return None
+        weather_code = index.icon_codes.get(str(code))
+        if weather_code is None:
+            logger.error(f'未找到天气代码({api_name}) {code}')
+        return weather_code
 
     def _get_default_weather_icon(self) -> str:
         """获取默认图标"""
         return os.path.join(base_directory, 'img', 'weather', '99.svg')
 
-    def _build_weather_icon_path(self, weather_code: str) -> str:
+    def _build_weather_icon_path(self, weather_code: str, index: Optional[WeatherStatusIndex] = None) -> str:
         """构建图标路径"""
+        if index is not None:
+            if weather_code in index.night_icons and self._is_night_time():
+                return index.night_icons[weather_code]
+            if weather_code in index.day_icons:
+                return index.day_icons[weather_code]
+
         if self._is_night_weather_type(weather_code) and self._is_night_time():
             return os.path.join(base_directory, 'img', 'weather', f'{weather_code}d.svg')
 
@@ -2684,7 +2919,7 @@ class WeatherDataProcessor:
 
     def _is_night_weather_type(self, weather_code: str) -> bool:
         """夜间天气类型判断"""
-        return weather_code in ('0', '1', '3', '13')  # 晴、多云、阵雨、阵雪
+        return weather_code in NIGHT_ICON_CODES
 
     def _is_night_time(self) -> bool:
         """夜间时间判断"""
@@ -2694,14 +2929,7 @@ class WeatherDataProcessor:
     def get_weather_stylesheet(self, code: str, api_name: Optional[str] = None) -> str:
         """获取天气背景样式"""
         current_time = datetime.datetime.now()
-        weather_status = self._load_weather_status(api_name)
-        weather_code = '99'
-
-        for weather in weather_status.get('weatherinfo', []):
-            if str(weather.get('code')) == str(code):
-                original_code = weather.get('original_code')
-                weather_code = str(original_code) if original_code is not None else str(weather.get('code'))
-                break
+        weather_code = self._status_index(api_name).icon_codes.get(str(code), '99')
 
         if weather_code in ('0', '1', '3', '99', '900'):  # 晴、多云、阵雨、未知
             if 6 <= current_time.hour < 18:  # 日间
@@ -2713,11 +2941,7 @@ class WeatherDataProcessor:
 
     def get_weather_code_by_description(self, description: str, api_name: Optional[str] = None) -> str:
         """根据天气描述获取天气代码"""
-        weather_status = self._load_weather_status(api_name)
-        for weather in weather_status.get('weatherinfo', []):
-            if str(weather.get('wea')) == description:
-                return str(weather.get('code'))
-        return '99'
+        return self._status_index(api_name).codes.get(description, '99')
 
     def get_alert_image_path(self, alert_type: str) -> str:
         """获取天气预警图标路径"""
@@ -2746,15 +2970,61 @@ class WeatherDataProcessor:
         provider = self.weather_manager.get_current_provider()
         return provider.supports_alerts() if provider else False
 
+    def extract_all(self, weather_data: Dict[str, Any]) -> WeatherSnapshot:
+        """
+        一次提取全部显示字段
+        同一份数据（同一对象、天气源与温度单位）只提取一次，多个组件与设置页共用结果
+        """
+        current_api = self.weather_manager.get_current_api()
+        if not weather_data:
+            return WeatherSnapshot(api_name=current_api)
+        variant = (current_api, config_center.read_conf('Weather', 'temperature_unit', 'celsius'))
+        cached = self._last_snapshot
+        if cached is not None and cached[0] is weather_data and cached[1] == variant:
+            return cached[2]
+
+        provider = self.weather_manager.get_current_provider()
+        values: Dict[str, Any] = {}
+        for name, key in SNAPSHOT_FIELDS.items():
+            if provider is not None and not self._has_field(provider, key):
+                values[name] = None
+                continue
+            value = self._extract_with_provider(provider, key, weather_data)
+            values[name] = None if value is None or str(value).lower() == 'none' else value
+
+        air: Dict[str, Optional[str]] = {}
+        if provider is not None and hasattr(provider, 'parse_aqi_data'):
+            try:
+                air = provider.parse_aqi_data(weather_data) or {}
+            except Exception as e:
+                logger.error(f'提取空气质量数据失败: {e}')
+        icon = values.get('icon')
+        snapshot = WeatherSnapshot(
+            api_name=current_api,
+            description=self.get_weather_by_code(icon, current_api) if icon else None,
+            air=air,
+            **values,
+        )
+        self._last_snapshot = (weather_data, variant, snapshot)
+        return snapshot
+
+    @staticmethod
+    def _has_field(provider: WeatherapiProvider, key: str) -> bool:
+        """天气源能否提供该字段（没有解析方法也没有配置路径时跳过，避免回退路径记录错误）"""
+        parser = FIELD_PARSERS.get(key)
+        return (parser is not None and hasattr(provider, parser)) or key in provider.accessors
+
     def extract_weather_data(self, key: str, weather_data: Dict[str, Any]) -> Optional[str]:
         """从天气数据中提取指定字段的值(兼容旧接口)"""
         if not weather_data:
             logger.error('weather_data is None!')
             return None
+        return self._extract_with_provider(self.weather_manager.get_current_provider(), key, weather_data)
 
-        provider = self.weather_manager.get_current_provider()
+    def _extract_with_provider(self, provider: Optional[WeatherapiProvider], key: str,
+                               weather_data: Dict[str, Any]) -> Optional[str]:
         if not provider:
-            return self._legacy_extract_weather_data(key, weather_data)
+            return None
 
         try:
             if key == 'temp':
@@ -2773,19 +3043,19 @@ class WeatherDataProcessor:
             elif key == 'wind_speed':
                 if hasattr(provider, 'parse_wind_speed'):
                     return provider.parse_wind_speed(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'humidity':
                 if hasattr(provider, 'parse_humidity'):
                     return provider.parse_humidity(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'visibility':
                 if hasattr(provider, 'parse_visibility'):
                     return provider.parse_visibility(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'pressure':
                 if hasattr(provider, 'parse_pressure'):
                     return provider.parse_pressure(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'feels_like':
                 if hasattr(provider, 'parse_feels_like'):
                     feels_like_result = provider.parse_feels_like(weather_data)
@@ -2793,31 +3063,31 @@ class WeatherDataProcessor:
                     if feels_like_result:
                         return self._convert_temperature_unit(feels_like_result)
                     return feels_like_result
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'wind_direction':
                 if hasattr(provider, 'parse_wind_direction'):
                     return provider.parse_wind_direction(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'aqi':
                 if hasattr(provider, 'parse_aqi'):
                     return provider.parse_aqi(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key in ('co', 'no2', 'o3', 'pm10', 'pm25', 'so2'):
                 if hasattr(provider, 'parse_aqi_data'):
                     aqi_data = provider.parse_aqi_data(weather_data)
                     return aqi_data.get(key)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             elif key == 'updateTime':
                 # 提取天气数据的更新时间
                 if hasattr(provider, 'parse_update_time'):
                     return provider.parse_update_time(weather_data)
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
             else:
                 # 回退到旧方法
-                return self._legacy_extract_weather_data(key, weather_data)
+                return self._extract_by_path(provider, key, weather_data)
         except Exception as e:
             logger.error(f'提取天气数据失败 ({key}): {e}')
-            return self._legacy_extract_weather_data(key, weather_data)
+            return self._extract_by_path(provider, key, weather_data)
 
     def _extract_alert_data(self, key: str, weather_data: Dict[str, Any]) -> Optional[str]:
         """提取预警数据"""
@@ -2830,21 +3100,7 @@ class WeatherDataProcessor:
         elif isinstance(provider, XiaomiWeatherProvider):
             return self._extract_xiaomi_alert_data(key, weather_data)
 
-        alerts_config = provider.config.get('alerts', {})
-        if key == 'alert':
-            path = alerts_config.get('type', '')
-        elif key == 'alert_title':
-            path = alerts_config.get('title', '')
-        elif key == 'alert_desc':
-            path = alerts_config.get('description', '')
-        else:
-            return None
-        if not path:
-            return None
-        if hasattr(provider, '_extract_value_by_path'):
-            return provider._extract_value_by_path(weather_data, path)
-
-        return None
+        return provider.extract(key, weather_data)
 
     def _extract_qweather_alert_data(self, key: str, weather_data: Dict[str, Any]) -> Optional[str]:
         """提取和风天气预警数据"""
@@ -3189,150 +3445,197 @@ class WeatherDataProcessor:
 
         return None, None
 
-    def _legacy_extract_weather_data(self, key: str, weather_data: Dict[str, Any]) -> Optional[str]:
-        """数据提取(向后兼容)"""
-        current_api = self.weather_manager.get_current_api()
-        api_params = self.weather_manager.api_config.get('weather_api_parameters', {})
-        current_params = api_params.get(current_api, {})
-
-        parameter_path = self._get_parameter_path(key, current_params)
-        if not parameter_path:
-            logger.error(f'未找到参数路径: {key}')
-            return None
-
-        value = self._extract_value_by_api(current_api, current_params, key, parameter_path, weather_data)
-        return self._format_extracted_value(key, value, current_params)
-
-    def _get_parameter_path(self, key: str, current_params: Dict[str, Any]) -> str:
-        """获取参数路径"""
-        if key == 'alert':
-            alerts_config = current_params.get('alerts', {})
-            return alerts_config.get('type', '')
-        elif key == 'alert_title':
-            alerts_config = current_params.get('alerts', {})
-            return alerts_config.get('title', '')
-        else:
-            return current_params.get(key, '')
-
-    def _extract_value_by_api(self, current_api: str, current_params: Dict[str, Any],
-                             key: str, parameter_path: str, weather_data: Dict[str, Any]) -> Any:
-        """根据API类型提取值"""
-        context = WeatherExtractionContext(
-            current_params=current_params,
-            key=key,
-            weather_data=weather_data,
-            current_api=current_api,
-            parameter_path=parameter_path
-        )
-
-        if current_api == 'amap_weather':
-            return self._extract_amap_value(context)
-        elif current_api == 'qq_weather':
-            return self._extract_qq_value(context)
-        else:
-            return self._extract_generic_value(context)
-
-    def _extract_amap_value(self, context: WeatherExtractionContext) -> str:
-        """提取高德天气值"""
-        return context.weather_data.get('lives', [{}])[0].get(
-            context.current_params.get(context.key, ''), ''
-        )
-
-    def _extract_qq_value(self, context: WeatherExtractionContext) -> str:
-        """提取QQ天气值"""
-        realtime_data = context.weather_data.get('result', {}).get('realtime', [{}])
-        if realtime_data:
-            return str(realtime_data[0].get('infos', {}).get(
-                context.current_params.get(context.key, ''), ''
-            ))
-        return ''
-
-    def _extract_generic_value(self, context: WeatherExtractionContext) -> Any:
-        """提取通用天气值"""
-        value = context.weather_data
-        parameters = context.parameter_path.split('.')
-
-        for param in parameters:
-            value = self._process_single_parameter(value, param, context.current_api, context.key)
-            if value is None or value == '错误':
-                return value
-        return value
-
-    def _process_single_parameter(self, value: Any, param: str, current_api: str, key: str) -> Any:
-        """处理单个参数"""
-        if not value:
-            logger.warning(f'天气信息值{key}为空')
-            return None
-
-        if param == '0':
-            if isinstance(value, list) and len(value) > 0:
-                return value[0]
-            else:
-                logger.error(f'无法获取数组第一个元素: {param}')
-                return None
-        elif isinstance(value, dict) and param in value:
-            return value[param]
-        else:
-            logger.error(f'获取天气参数失败, {param}不存在于{current_api}中')
-            return '错误'
-
-    def _format_extracted_value(self, key: str, value: Any, current_params: Dict[str, Any]) -> Optional[str]:
-        """格式化提取值"""
+    def _extract_by_path(self, provider: WeatherapiProvider, key: str,
+                         weather_data: Dict[str, Any]) -> Optional[str]:
+        """天气源没有对应的解析方法时，按配置的字段路径取值"""
+        value = provider.extract(key, weather_data)
         if value is None:
             return None
-
         if key == 'temp' and value:
             return str(value) + '°'
-        elif key == 'icon' and current_params.get('return_desc', False):
-            return self.get_weather_code_by_description(str(value))
-
+        elif key == 'icon' and provider.config.get('return_desc', False):
+            return self.get_weather_code_by_description(str(value), provider.api_name)
         return str(value)
 
 
-class WeatherReportThread(QThread):
-    """天气数据获取"""
-    weather_signal = pyqtSignal(dict)
+class WeatherRefreshThread(QThread):
+    """刷新协调器使用的后台刷新线程"""
+    bundle_ready = pyqtSignal(object)  # WeatherBundle，失败时为 None
 
-    def __init__(self):
+    def __init__(self, weather_manager: 'WeatherManager', force: bool = False):
         super().__init__()
-        self.weather_manager = WeatherManager()
-        self._is_running = False
+        self.weather_manager = weather_manager
+        self.force = force
 
     def run(self):
-        """线程运行方法"""
+        bundle = None
         try:
-            self._is_running = True
-            weather_data = self.weather_manager.fetch_weather_data()
-            if self._is_running:
-                if weather_data:
-                    self.weather_signal.emit(weather_data)
-                else:
-                    logger.error('获取天气数据返回None')
-                    self.weather_signal.emit({'error': {'info': {'value': '错误', 'unit': ''}}})
+            self.weather_manager.clear_caches()
+            bundle = self.weather_manager.refresh_bundle(force=self.force)
         except Exception as e:
-            if self._is_running:
-                logger.error(f'触发天气信息失败: {e}')
-                self.weather_signal.emit({'error': {'info': {'value': '错误', 'unit': ''}}})
-        finally:
-            self._is_running = False
+            logger.error(f'刷新天气数据失败: {e}')
+        self.bundle_ready.emit(bundle)
 
-    def stop(self):
-        """停止线程"""
-        self._is_running = False
-        if self.isRunning():
-            self.quit()
-            self.wait(3000)
+
+class WeatherRefreshCoordinator(QObject):
+    """
+    天气刷新协调器
+    全局唯一的刷新定时器与进行中的请求，并发的刷新请求合并为一次，
+    结果通过信号广播给所有订阅者（天气组件、设置页等）；天气源出错时按源指数退避重试
+    """
+    weather_updated = pyqtSignal(dict)  # 格式同 fetch_weather_data，失败时包含 error
+    weather_failed = pyqtSignal(str)  # 错误信息
+    refresh_finished = pyqtSignal()
+
+    REUSE_AGE = 60  # 非强制刷新时直接广播该时长内的快照(s)
+    BACKOFF_BASE = 30  # 首次失败后的重试间隔(s)
+    BACKOFF_MAX = 30 * 60  # 重试间隔上限(s)
+    NO_BACKOFF_ERRORS = ('LOCATION', 'API_KEY')  # 配置错误，重试无意义
+
+    def __init__(self, weather_manager: WeatherManager):
+        super().__init__()
+        self.weather_manager = weather_manager
+        self.last_weather_data: Optional[Dict[str, Any]] = None
+        self._timer: Optional[QTimer] = None
+        self._retry_timer: Optional[QTimer] = None
+        self._thread: Optional[WeatherRefreshThread] = None
+        self._in_flight = False
+        self._in_flight_force = False
+        self._pending_force = False  # 非强制请求进行中又收到强制刷新，结束后再刷新一次
+        self._backoff: Dict[str, Tuple[int, float]] = {}  # 天气源 -> (连续失败次数, 允许再次请求的时刻)
+        self.requests = 0
+        self.coalesced = 0
+        self.fetches = 0
+        app = QCoreApplication.instance()
+        if app is not None and self.thread() is not app.thread():
+            self.moveToThread(app.thread())
+
+    @property
+    def refreshing(self) -> bool:
+        return self._in_flight
+
+    def start(self) -> None:
+        """启动刷新定时器（重复调用无副作用，需在主线程调用）"""
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.timeout.connect(lambda: self.request_refresh())
+            self._retry_timer = QTimer(self)
+            self._retry_timer.setSingleShot(True)
+            self._retry_timer.timeout.connect(lambda: self.request_refresh())
+        if not self._timer.isActive():
+            self.set_interval(config_center.snapshot.get_int('Weather', 'refresh_interval', 15))
+        self.weather_manager.prefetch_location()
+
+    def set_interval(self, minutes: int) -> None:
+        """更新刷新间隔(分钟)"""
+        if self._timer is not None:
+            self._timer.start(max(1, int(minutes)) * 60 * 1000)
+
+    def stop(self) -> None:
+        for timer in (self._timer, self._retry_timer):
+            if timer is not None:
+                timer.stop()
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.wait(3000)
+
+    def request_refresh(self, force: bool = False) -> None:
+        """
+        请求刷新天气数据
+        已有请求进行中时合并到该请求；非强制刷新时，刚获取的快照直接广播，退避期内不请求
+        """
+        self.requests += 1
+        if self._in_flight:
+            self.coalesced += 1
+            self._pending_force = self._pending_force or (force and not self._in_flight_force)
+            return
+        if not force:
+            bundle = self.weather_manager.get_bundle(max_age=self.REUSE_AGE)
+            if bundle is not None:
+                self._broadcast(bundle.weather_data)
+                return
+            api_name = self.weather_manager.get_current_api()
+            remaining = self.backoff_remaining(api_name)
+            if remaining > 0:
+                logger.debug(f'天气源 {api_name} 处于退避期，{remaining:.0f}s 后再请求')
+                self.refresh_finished.emit()
+                return
+
+        if self._thread is not None and self._thread.isRunning():
+            self._thread.wait()  # 上一个线程已发出结果，正在退出
+        self._in_flight = True
+        self._in_flight_force = force
+        self.fetches += 1
+        self._thread = WeatherRefreshThread(self.weather_manager, force)
+        self._thread.bundle_ready.connect(self._on_bundle_ready)
+        self._thread.start()
+
+    def _on_bundle_ready(self, bundle: Optional[WeatherBundle]) -> None:
+        self._in_flight = False
+        api_name = bundle.api_name if bundle is not None else self.weather_manager.get_current_api()
+        error_code = (bundle.error or {}).get('code') if bundle is not None else None
+        if bundle is None or bundle.from_cache or (bundle.error is not None and error_code not in self.NO_BACKOFF_ERRORS):
+            self._record_failure(api_name)
+        elif self._backoff.pop(api_name, None) is not None:
+            logger.info(f'天气源 {api_name} 已恢复')
+            if self._retry_timer is not None:
+                self._retry_timer.stop()
+
+        if bundle is None:
+            self._broadcast({'error': {'info': {'value': '错误', 'unit': '未知错误'}}})
+        else:
+            self._broadcast(bundle.weather_data)
+        if self._pending_force:
+            self._pending_force = False
+            self.request_refresh(force=True)
+
+    def _broadcast(self, weather_data: Dict[str, Any]) -> None:
+        self.last_weather_data = weather_data
+        self.weather_updated.emit(weather_data)
+        if 'error' in weather_data:
+            info = weather_data['error'].get('info', {})
+            self.weather_failed.emit(str(info.get('unit') or info.get('value') or '未知错误'))
+        self.refresh_finished.emit()
+
+    def _record_failure(self, api_name: str) -> None:
+        failures = self._backoff.get(api_name, (0, 0.0))[0] + 1
+        delay = min(self.BACKOFF_BASE * 2 ** (failures - 1), self.BACKOFF_MAX)
+        self._backoff[api_name] = (failures, time.monotonic() + delay)
+        logger.warning(f'天气源 {api_name} 连续失败 {failures} 次，{delay}s 后重试')
+        if self._retry_timer is not None:
+            self._retry_timer.start(delay * 1000)
+
+    def backoff_remaining(self, api_name: str) -> float:
+        """天气源剩余的退避时长(s)"""
+        entry = self._backoff.get(api_name)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[1] - time.monotonic())
+
+    def reset_backoff(self, api_name: Optional[str] = None) -> None:
+        if api_name is None:
+            self._backoff.clear()
+        else:
+            self._backoff.pop(api_name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'coalesced': self.coalesced,
+            'fetches': self.fetches,
+            'backoff': {api: failures for api, (failures, _) in self._backoff.items()},
+        }
 
 
 weather_manager = WeatherManager()
 weather_database = WeatherDatabase(weather_manager)
 weather_processor = WeatherDataProcessor(weather_manager)
+weather_coordinator = WeatherRefreshCoordinator(weather_manager)
 
 
 def on_weather_api_changed(new_api: str):
     global weather_manager, weather_processor
     weather_manager.on_api_changed(new_api)
-    weather_processor.clear_cache()
+    weather_processor.reload_status(new_api)
 
 # 兼容性用
 def search_by_name(search_term: str) -> List[str]:
@@ -3350,6 +3653,11 @@ def search_by_num(city_code: str) -> str:
     return weather_database.search_city_by_code(city_code)
 
 
+def get_location_key() -> str:
+    """当前显示的位置代码（自动定位时为实际定位结果）"""
+    return weather_manager.current_location_key()
+
+
 def get_weather_by_code(code: str) -> str:
     """根据代码获取天气描述"""
     return weather_processor.get_weather_by_code(code)
@@ -3364,6 +3672,35 @@ def get_weather_stylesheet(code: str) -> str:
     return weather_processor.get_weather_stylesheet(code)
 
 
+def benchmark_status_lookup(api_name: Optional[str] = None, rounds: int = 20000) -> Dict[str, float]:
+    """对比逐项查找与索引查找天气代码的耗时(µs/次)"""
+    index = weather_processor._status_index(api_name)
+    weatherinfo = index.status.get('weatherinfo', [])
+    codes = list(index.descriptions) or ['99']
+
+    def linear_lookup(code: str) -> str:
+        for weather in weatherinfo:
+            if str(weather.get('code')) == code:
+                return weather.get('wea', '未知')
+        return '未知'
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        linear_lookup(codes[i % len(codes)])
+    linear = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    for i in range(rounds):
+        weather_processor.get_weather_by_code(codes[i % len(codes)], index.api_name)
+    indexed = (time.perf_counter() - start) / rounds * 1e6
+    return {'entries': len(weatherinfo), 'linear_us': linear, 'indexed_us': indexed}
+
+
+def get_weather_snapshot(weather_data: Dict[str, Any]) -> WeatherSnapshot:
+    """一次提取实时天气的全部显示字段"""
+    return weather_processor.extract_all(weather_data)
+
+
 def get_weather_data(key: str = 'temp', weather_data: Optional[Dict[str, Any]] = None) -> Optional[str]:
     """获取天气数据"""
     return weather_processor.extract_weather_data(key, weather_data)
@@ -3668,6 +4005,11 @@ if __name__ == '__main__':
         print(f"北京的城市代码: {code}")
         city_name = search_by_num(code)
         print(f"代码{code}对应的城市: {city_name}")
+        print("\n天气代码查询")
+        for api in weather_manager.get_api_list():
+            result = benchmark_status_lookup(api)
+            print(f"{api}: {result['entries']} 项，逐项查找 {result['linear_us']:.2f} µs/次，"
+                  f"索引查找 {result['indexed_us']:.2f} µs/次")
         print("\n数据获取")
         current_api = weather_manager.get_current_api()
         print(f"当前使用的天气API: {current_api}")
@@ -0,0 +1,212 @@
+"""
+天气请求客户端
+所有天气源共用一个带连接池的 Session（保持连接、显式的连接/读取超时），
+遵循 ETag / Last-Modified / Cache-Control，内容未变化时不再下载和解析，并按接口统计耗时与流量。
+"""
+import copy
+import email.utils
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from loguru import logger
+
+DEFAULT_TIMEOUT = (5.0, 10.0)  # (连接, 读取) 超时(s)
+_MAX_AGE_PATTERN = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+@dataclass
+class EndpointStats:
+    """单个接口的请求统计"""
+    requests: int = 0  # 实际发出的请求
+    fresh_hits: int = 0  # 缓存仍新鲜，未发请求
+    not_modified: int = 0  # 304
+    errors: int = 0
+    bytes: int = 0  # 下载的响应体字节数
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'fresh_hits': self.fresh_hits,
+            'not_modified': self.not_modified,
+            'errors': self.errors,
+            'bytes': self.bytes,
+            'avg_latency_ms': self.total_latency / self.requests * 1000 if self.requests else 0.0,
+            'max_latency_ms': self.max_latency * 1000,
+        }
+
+
+@dataclass
+class CachedResponse:
+    payload: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fresh_until: float = 0.0  # time.monotonic()
+    size: int = 0
+
+
+def _freshness(headers: Any) -> Tuple[bool, float]:
+    """
+    根据 Cache-Control / Expires 计算可直接复用的秒数
+    返回 (是否允许缓存, 新鲜时长)
+    """
+    cache_control = headers.get('Cache-Control', '') or ''
+    directives = cache_control.lower()
+    if 'no-store' in directives:
+        return False, 0.0
+    if 'no-cache' in directives:
+        return True, 0.0
+    if match := _MAX_AGE_PATTERN.search(cache_control):
+        age = float(headers.get('Age', 0) or 0)
+        return True, max(0.0, int(match.group(1)) - age)
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires)
+            date = email.utils.parsedate_to_datetime(headers['Date']) if headers.get('Date') else None
+            now = date.timestamp() if date else time.time()
+            return True, max(0.0, expires_at.timestamp() - now)
+        except (TypeError, ValueError, IndexError):
+            return True, 0.0
+    return True, 0.0
+
+
+class WeatherHttpClient:
+    """线程安全的天气请求客户端"""
+
+    def __init__(self, timeout: Tuple[float, float] = DEFAULT_TIMEOUT, pool_size: int = 8,
+                 max_entries: int = 64, session: Optional[requests.Session] = None) -> None:
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.session = session or self._create_session(pool_size)
+        self._lock = threading.Lock()
+        self._responses: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._stats: Dict[str, EndpointStats] = {}
+
+    @staticmethod
+    def _create_session(pool_size: int) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @staticmethod
+    def endpoint_name(url: str) -> str:
+        """默认的统计名称：主机 + 路径（不含查询参数，避免记录密钥）"""
+        parts = urlsplit(url)
+        return f'{parts.netloc}{parts.path}'
+
+    def _endpoint_stats(self, endpoint: str) -> EndpointStats:
+        stats = self._stats.get(endpoint)
+        if stats is None:
+            stats = self._stats[endpoint] = EndpointStats()
+        return stats
+
+    def get_json(self, url: str, endpoint: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 proxies: Optional[Dict[str, Optional[str]]] = None,
+                 timeout: Optional[Tuple[float, float]] = None) -> Any:
+        """
+        GET 并解析 JSON，HTTP 错误时抛出 requests.HTTPError
+        返回值为副本，调用方可以随意修改
+        """
+        endpoint = endpoint or self.endpoint_name(url)
+        with self._lock:
+            cached = self._responses.get(url)
+            if cached is not None:
+                self._responses.move_to_end(url)
+                if cached.fresh_until > time.monotonic():
+                    self._endpoint_stats(endpoint).fresh_hits += 1
+                    return copy.deepcopy(cached.payload)
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                request_headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                request_headers['If-Modified-Since'] = cached.last_modified
+
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=request_headers, proxies=proxies, timeout=timeout or self.timeout)
+            latency = time.perf_counter() - start
+            size = len(response.content)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except Exception:
+            with self._lock:
+                stats = self._endpoint_stats(endpoint)
+                stats.requests += 1
+                stats.errors += 1
+                stats.total_latency += time.perf_counter() - start
+            raise
+
+        cacheable, max_age = _freshness(response.headers)
+        with self._lock:
+            stats = self._endpoint_stats(endpoint)
+            stats.requests += 1
+            stats.bytes += size
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+
+            if response.status_code == 304:
+                if cached is None:  # 未发送条件请求却返回 304，服务器或代理异常
+                    stats.errors += 1
+                    raise requests.HTTPError(f'{endpoint} 对非条件请求返回了 304', response=response)
+                stats.not_modified += 1
+                cached.fresh_until = time.monotonic() + max_age
+                cached.etag = response.headers.get('ETag', cached.etag)
+                cached.last_modified = response.headers.get('Last-Modified', cached.last_modified)
+                return copy.deepcopy(cached.payload)
+
+        payload = response.json()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        with self._lock:
+            if cacheable and (etag or last_modified or max_age > 0):
+                self._responses[url] = CachedResponse(
+                    payload=payload, etag=etag, last_modified=last_modified,
+                    fresh_until=time.monotonic() + max_age, size=size,
+                )
+                self._responses.move_to_end(url)
+                while len(self._responses) > self.max_entries:
+                    self._responses.popitem(last=False)
+                return copy.deepcopy(payload)
+            self._responses.pop(url, None)
+        return payload
+
+    def invalidate(self, url: Optional[str] = None) -> None:
+        """清除条件请求缓存（url 为空时清除全部）"""
+        with self._lock:
+            if url is None:
+                self._responses.clear()
+            else:
+                self._responses.pop(url, None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats().items():
+            logger.debug(f'天气接口 {name}: 请求 {stats["requests"]} 次，304 {stats["not_modified"]} 次，'
+                         f'缓存命中 {stats["fresh_hits"]} 次，{stats["bytes"]} 字节，'
+                         f'平均 {stats["avg_latency_ms"]:.0f} ms')
+
+    def close(self) -> None:
+        self.session.close()
+
+
+weather_http = WeatherHttpClient()
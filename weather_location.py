@@ -0,0 +1,162 @@
+"""
+自动定位
+IP 定位得到的城市与经纬度保存到磁盘并设有效期。天气刷新时直接使用已有结果，过期后在后台重新定位；
+只有从未定位过时才需要等待（在刷新线程中等待 Future，不再嵌套事件循环）。
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from file import base_directory, config_center
+from weather_http import weather_http
+
+LOCATION_CACHE_PATH = base_directory / 'cache' / 'location.json'
+CITY_URL = 'https://qifu-api.baidubce.com/ip/local/geo/v1/district'
+COORDINATES_URL = 'http://ip-api.com/json/?fields=status,lat,lon'
+DEFAULT_TTL = 6 * 3600  # 定位结果有效期(s)
+RESOLVE_TIMEOUT = 15.0  # 没有缓存时等待定位的最长时间(s)
+
+CITY = 'city'
+COORDINATES = 'coordinates'
+
+
+@dataclass(frozen=True)
+class GeoLocation:
+    """最近一次定位结果"""
+    city: str = ''
+    district: str = ''
+    city_at: float = 0.0  # time.time()
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    coordinates_at: float = 0.0
+
+    def value(self, kind: str) -> Optional[Any]:
+        if kind == CITY:
+            return (self.city, self.district) if self.city else None
+        return (self.lat, self.lon) if self.lat is not None and self.lon is not None else None
+
+    def age(self, kind: str) -> float:
+        return time.time() - (self.city_at if kind == CITY else self.coordinates_at)
+
+
+class LocationResolver:
+    """IP 定位（线程安全，同类定位同时只有一个请求）"""
+
+    def __init__(self, cache_path: Path) -> None:
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._location = self._load()
+        self._futures: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='location')
+
+    @property
+    def ttl(self) -> int:
+        return config_center.snapshot.get_int('Weather', 'location_ttl', DEFAULT_TTL)
+
+    @property
+    def location(self) -> GeoLocation:
+        return self._location
+
+    def _load(self) -> GeoLocation:
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return GeoLocation(**{k: v for k, v in data.items() if k in GeoLocation.__dataclass_fields__})
+        except FileNotFoundError:
+            return GeoLocation()
+        except Exception as e:
+            logger.warning(f'读取定位缓存失败: {e}')
+            return GeoLocation()
+
+    def _save(self, location: GeoLocation) -> None:
+        tmp_path = None
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_path.parent), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(asdict(location), f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f'保存定位缓存失败: {e}')
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def _update(self, **changes: Any) -> None:
+        with self._lock:
+            self._location = replace(self._location, **changes)
+            location = self._location
+        self._save(location)
+
+    def _resolve(self, kind: str) -> Tuple[Any, Any]:
+        from network_thread import proxies
+        if kind == CITY:
+            data = weather_http.get_json(CITY_URL, endpoint='location/city', proxies=proxies)
+            if data.get('code') != 'Success':
+                raise ValueError(data.get('message', data.get('code')))
+            city, district = data['data']['city'], data['data']['district']
+            logger.info(f'获取城市成功：{city}, {district}')
+            self._update(city=city, district=district, city_at=time.time())
+            return city, district
+
+        data = weather_http.get_json(COORDINATES_URL, endpoint='location/coordinates', proxies=proxies)
+        if data.get('status') != 'success':
+            raise ValueError(data.get('message', data.get('status')))
+        lat, lon = float(data['lat']), float(data['lon'])
+        logger.info(f'获取坐标成功：{lat}, {lon}')
+        self._update(lat=lat, lon=lon, coordinates_at=time.time())
+        return lat, lon
+
+    def resolve_async(self, kind: str) -> Future:
+        """开始定位（已在进行中时返回同一个 Future）"""
+        with self._lock:
+            future = self._futures.get(kind)
+            if future is None or future.done():
+                future = self._futures[kind] = self._executor.submit(self._resolve, kind)
+                future.add_done_callback(lambda f: f.exception() and logger.error(f'自动定位失败: {f.exception()}'))
+            return future
+
+    def is_fresh(self, kind: str) -> bool:
+        location = self._location
+        return location.value(kind) is not None and location.age(kind) < self.ttl
+
+    def prefetch(self, kind: str) -> None:
+        """结果不存在或已过期时在后台定位"""
+        if not self.is_fresh(kind):
+            self.resolve_async(kind)
+
+    def get(self, kind: str, timeout: float = RESOLVE_TIMEOUT) -> Optional[Tuple[Any, Any]]:
+        """
+        返回定位结果：城市为 (城市, 区县)，坐标为 (纬度, 经度)
+        有缓存时立即返回（过期则同时在后台刷新）；从未定位过时等待定位完成，失败返回 None
+        """
+        value = self._location.value(kind)
+        if value is not None:
+            self.prefetch(kind)
+            return value
+        try:
+            return self.resolve_async(kind).result(timeout)
+        except Exception as e:
+            logger.error(f'自动定位失败: {e}')
+            return None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._location = GeoLocation()
+        try:
+            self.cache_path.unlink()
+        except OSError:
+            pass
+
+
+location_resolver = LocationResolver(LOCATION_CACHE_PATH)
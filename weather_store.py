@@ -0,0 +1,166 @@
+"""
+天气数据持久化缓存
+以 (天气源, 位置, 数据类型) 为键保存最近一次获取的天气数据（SQLite），
+启动时可立即显示上次的数据，网络恢复前也能继续使用，超过过期预算或容量上限的数据会被清理。
+"""
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from file import base_directory, config_center
+
+WEATHER_STORE_PATH = base_directory / 'cache' / 'weather_cache.db'
+
+# 各类数据的有效期(s)，有效期内刷新时直接使用缓存，不再请求
+ENDPOINT_TTL: Dict[str, int] = {
+    'current': 300,
+    'alerts': 300,
+    'air': 1800,
+    'hourly': 1800,
+    'daily': 3 * 3600,
+}
+DEFAULT_TTL = 300
+DEFAULT_STALE_BUDGET = 24 * 3600  # 过期数据最多保留/使用的时长(s)
+DEFAULT_MAX_SIZE = 2048  # 缓存总大小上限(KB)
+
+
+@dataclass(frozen=True)
+class StoredEntry:
+    endpoint: str
+    payload: Any
+    fetched_at: float  # time.time()
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < ENDPOINT_TTL.get(self.endpoint, DEFAULT_TTL)
+
+
+class WeatherStore:
+    """SQLite 天气缓存（线程安全）"""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def stale_budget(self) -> int:
+        return config_center.snapshot.get_int('Weather', 'cache_stale_budget', DEFAULT_STALE_BUDGET)
+
+    @property
+    def max_bytes(self) -> int:
+        return config_center.snapshot.get_int('Weather', 'cache_max_size', DEFAULT_MAX_SIZE) * 1024
+
+    def _connection(self) -> sqlite3.Connection:
+        """(需持有锁)"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS weather_cache ('
+                ' api TEXT NOT NULL, location TEXT NOT NULL, endpoint TEXT NOT NULL,'
+                ' payload TEXT NOT NULL, fetched_at REAL NOT NULL, size INTEGER NOT NULL,'
+                ' PRIMARY KEY (api, location, endpoint))'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_weather_cache_fetched ON weather_cache (fetched_at)')
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def load(self, api: str, location: str) -> Dict[str, StoredEntry]:
+        """读取 (api, location) 下未超出过期预算的全部数据"""
+        if not api or not location:
+            return {}
+        oldest = time.time() - self.stale_budget
+        try:
+            with self._lock:
+                rows = self._connection().execute(
+                    'SELECT endpoint, payload, fetched_at FROM weather_cache '
+                    'WHERE api = ? AND location = ? AND fetched_at >= ?',
+                    (api, location, oldest)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f'读取天气缓存失败: {e}')
+            return {}
+
+        entries = {}
+        for endpoint, payload, fetched_at in rows:
+            try:
+                entries[endpoint] = StoredEntry(endpoint, json.loads(payload), fetched_at)
+            except ValueError as e:
+                logger.warning(f'天气缓存 {api}/{endpoint} 已损坏: {e}')
+        return entries
+
+    def get(self, api: str, location: str, endpoint: str) -> Optional[StoredEntry]:
+        return self.load(api, location).get(endpoint)
+
+    def save(self, api: str, location: str, payloads: Dict[str, Any], fetched_at: Optional[float] = None) -> None:
+        """保存多类数据（同一事务），随后按预算与容量清理"""
+        if not api or not location or not payloads:
+            return
+        fetched_at = fetched_at or time.time()
+        rows = []
+        for endpoint, payload in payloads.items():
+            try:
+                text = json.dumps(payload, ensure_ascii=False)
+            except (TypeError, ValueError) as e:
+                logger.warning(f'天气数据 {endpoint} 无法缓存: {e}')
+                continue
+            rows.append((api, location, endpoint, text, fetched_at, len(text.encode('utf-8'))))
+        try:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO weather_cache '
+                        '(api, location, endpoint, payload, fetched_at, size) VALUES (?, ?, ?, ?, ?, ?)', rows)
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.error(f'写入天气缓存失败: {e}')
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """(需持有锁) 删除超出过期预算的数据，总大小超限时从最旧的开始删除"""
+        with conn:
+            conn.execute('DELETE FROM weather_cache WHERE fetched_at < ?', (time.time() - self.stale_budget,))
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM weather_cache').fetchone()[0]
+            limit = self.max_bytes
+            if total <= limit:
+                return
+            removed = 0
+            for api, location, endpoint, size in conn.execute(
+                    'SELECT api, location, endpoint, size FROM weather_cache ORDER BY fetched_at').fetchall():
+                if total <= limit:
+                    break
+                conn.execute('DELETE FROM weather_cache WHERE api = ? AND location = ? AND endpoint = ?',
+                             (api, location, endpoint))
+                total -= size
+                removed += 1
+            logger.debug(f'天气缓存超出容量，已清理 {removed} 条')
+
+    def clear(self) -> None:
+        try:
+            with self._lock:
+                conn = self._connection()
+                with conn:
+                    conn.execute('DELETE FROM weather_cache')
+        except sqlite3.Error as e:
+            logger.error(f'清空天气缓存失败: {e}')
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+weather_store = WeatherStore(WEATHER_STORE_PATH)